@@ -0,0 +1,45 @@
+"""Shared helpers for the blenderless benchmarks."""
+import concurrent.futures
+import time
+
+import numpy as np
+
+
+def synthetic_mesh(num_faces):
+    """Return vertices and faces of a triangulated square grid with (at least) num_faces faces."""
+    n = max(1, int(np.ceil(np.sqrt(num_faces / 2))))
+    x, y = np.meshgrid(np.linspace(0, 1, n + 1), np.linspace(0, 1, n + 1))
+    z = 0.1 * np.sin(8 * x) * np.cos(8 * y)
+    vertices = np.stack((x.ravel(), y.ravel(), z.ravel()), axis=1)
+
+    corners = (np.arange(n)[:, None] * (n + 1) + np.arange(n)[None, :]).ravel()
+    quads = np.stack((corners, corners + 1, corners + n + 2, corners + n + 1), axis=1)
+    faces = np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]), axis=0)
+    return vertices, faces[:num_faces]
+
+
+def timed(fn, *args, **kwargs):
+    """Return the result of fn and the wall time it took in seconds."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_isolated(fn, *args):
+    """Run fn(*args) in a fresh process, so peak memory of one case does not leak into the next."""
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned table."""
+    widths = [max(len(col), *(len(_format(row[col])) for row in rows)) for col in columns]
+    print('  '.join(col.ljust(width) for col, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(_format(row[col]).ljust(width) for col, width in zip(columns, widths)))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    return str(value)
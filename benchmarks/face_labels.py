@@ -0,0 +1,48 @@
+"""Benchmark assigning per-face labels to material slots: per-face Python loop vs a single foreach_set.
+
+Usage: python benchmarks/face_labels.py [--faces 1000000] [--num-labels 20]
+"""
+import argparse
+
+import bpy
+import common
+import numpy as np
+
+from blenderless.geometry import Mesh
+from blenderless.geometry import set_mesh_data
+
+
+def python_loop(mesh):
+    for f in mesh._object_data.polygons:
+        f.material_index = mesh.labels[f.index]
+
+
+def bulk(mesh):
+    mesh._set_face_material_indices()
+
+
+METHODS = {'python_loop': python_loop, 'foreach_set': bulk}
+
+
+def run_case(method, num_faces, num_labels):
+    vertices, faces = common.synthetic_mesh(num_faces)
+    rng = np.random.default_rng(0)
+    mesh = Mesh(labels=rng.integers(num_labels, size=len(faces)), colormap=rng.integers(256, size=(num_labels, 3)))
+    mesh._object_data = set_mesh_data(bpy.data.meshes.new(name='benchmark'), vertices, faces)
+
+    _, seconds = common.timed(METHODS[method], mesh)
+    return {'method': method, 'faces': len(faces), 'seconds': seconds, 'faces/s': len(faces) / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--faces', type=int, default=1_000_000)
+    parser.add_argument('--num-labels', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [common.run_isolated(run_case, method, args.faces, args.num_labels) for method in METHODS]
+    common.print_table(rows, ['method', 'faces', 'seconds', 'faces/s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark preview throughput of the Workbench engine (fast_preview=True) against Cycles on the test meshes.
+
+Usage: python benchmarks/fast_preview.py [--renders 10] [--resolution 256] [--faces 1000000]
+"""
+import argparse
+import pathlib
+import tempfile
+
+import common
+import trimesh
+
+from blenderless.geometry import Mesh
+from blenderless.profiling import peak_rss_mb
+from blenderless.scene import RenderSession
+from blenderless.scene import Scene
+
+MODES = {
+    'cycles': {},
+    'cycles_draft': {
+        'quality': 'draft'
+    },
+    'workbench': {
+        'fast_preview': True
+    },
+}
+
+
+def run_case(mode, mesh_name, mesh, num_renders, resolution):
+    session = RenderSession()
+
+    def render_all(tmp_dir):
+        for n in range(num_renders):
+            scene = Scene(resolution=(resolution, resolution), **MODES[mode])
+            scene.add_object(Mesh(mesh=mesh))
+            scene.render(tmp_dir / f'{n}.png', session=session)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _, seconds = common.timed(render_all, pathlib.Path(tmp_dir))
+
+    return {
+        'mode': mode,
+        'mesh': mesh_name,
+        'faces': len(mesh.faces),
+        'renders': num_renders,
+        'seconds': seconds,
+        'renders/s': num_renders / seconds,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=10)
+    parser.add_argument('--resolution', type=int, default=256)
+    parser.add_argument('--meshes',
+                        type=pathlib.Path,
+                        nargs='+',
+                        default=sorted(pathlib.Path('tests/test_data/mesh').glob('*')))
+    parser.add_argument('--faces', type=int, default=1_000_000, help='Faces of an additional synthetic mesh')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    meshes = {path.name: trimesh.load(path) for path in args.meshes}
+    vertices, faces = common.synthetic_mesh(args.faces)
+    meshes[f'synthetic_{args.faces}'] = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+    rows = [
+        common.run_isolated(run_case, mode, mesh_name, mesh, args.renders, args.resolution)
+        for mesh_name, mesh in meshes.items()
+        for mode in args.modes
+    ]
+    common.print_table(rows, ['mode', 'mesh', 'faces', 'renders', 'seconds', 'renders/s', 'peak_rss_mb'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark loading mesh files with their file handler against memory mapping them from a GeometryCache.
+
+The cold case loads the file and stores it in an empty cache, the warm case memory maps the stored arrays and reads
+all vertices and faces once.
+
+Usage: python benchmarks/geometry_cache.py [--faces 1000000] [--formats stl ply obj]
+"""
+import argparse
+import pathlib
+import tempfile
+
+import common
+import trimesh
+
+from blenderless.cache import GeometryCache
+from blenderless.io import FileHandlerFactory
+from blenderless.profiling import peak_rss_mb
+
+
+def load_handler(path, cache_dir):
+    return FileHandlerFactory.get_loader(path).load(path)
+
+
+def load_cold(path, cache_dir):
+    return GeometryCache(cache_dir).load_mesh(path)
+
+
+def load_warm(path, cache_dir):
+    cache = GeometryCache(cache_dir)
+    mesh = cache.load_mesh(path)
+    assert cache.hits == 1
+    return mesh
+
+
+METHODS = {'handler': load_handler, 'cache_cold': load_cold, 'cache_warm': load_warm}
+
+
+def fill_cache(path, cache_dir):
+    load_cold(path, cache_dir)
+
+
+def run_case(method, path, cache_dir):
+    baseline_rss = peak_rss_mb()
+    mesh, seconds = common.timed(METHODS[method], path, cache_dir)
+    _, read_seconds = common.timed(lambda: (mesh.vertices.sum(), mesh.faces.sum()))
+    return {
+        'method': method,
+        'format': path.suffix[1:],
+        'faces': len(mesh.faces),
+        'seconds': seconds,
+        'read_seconds': read_seconds,
+        'peak_rss_delta_mb': peak_rss_mb() - baseline_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--faces', type=int, default=1_000_000)
+    parser.add_argument('--formats', nargs='+', default=['stl', 'ply', 'obj'])
+    args = parser.parse_args()
+
+    vertices, faces = common.synthetic_mesh(args.faces)
+    mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = pathlib.Path(tmp_dir)
+        for file_format in args.formats:
+            path = tmp_dir / f'mesh.{file_format}'
+            mesh.export(path)
+            common.run_isolated(fill_cache, path, tmp_dir / f'cache_warm_{file_format}')
+            for method in METHODS:
+                rows.append(common.run_isolated(run_case, method, path, tmp_dir / f'{method}_{file_format}'))
+    common.print_table(rows, ['method', 'format', 'faces', 'seconds', 'read_seconds', 'peak_rss_delta_mb'])
+
+
+if __name__ == '__main__':
+    main()
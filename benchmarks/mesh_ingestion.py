@@ -0,0 +1,49 @@
+"""Benchmark copying trimesh arrays into a blender mesh: from_pydata(tolist()) vs bulk foreach_set.
+
+Usage: python benchmarks/mesh_ingestion.py [--sizes 10000 1000000 10000000]
+"""
+import argparse
+
+import bpy
+import common
+
+from blenderless.geometry import set_mesh_data
+from blenderless.profiling import peak_rss_mb
+
+
+def from_pydata(mesh_data, vertices, faces):
+    mesh_data.from_pydata(vertices.tolist(), [], faces.tolist())
+
+
+def bulk(mesh_data, vertices, faces):
+    set_mesh_data(mesh_data, vertices, faces)
+
+
+METHODS = {'from_pydata': from_pydata, 'foreach_set': bulk}
+
+
+def run_case(method, num_faces):
+    vertices, faces = common.synthetic_mesh(num_faces)
+    baseline_rss = peak_rss_mb()
+    mesh_data = bpy.data.meshes.new(name='benchmark')
+    _, seconds = common.timed(METHODS[method], mesh_data, vertices, faces)
+    return {
+        'method': method,
+        'faces': len(mesh_data.polygons),
+        'seconds': seconds,
+        'faces/s': len(mesh_data.polygons) / seconds,
+        'peak_rss_delta_mb': peak_rss_mb() - baseline_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    rows = [common.run_isolated(run_case, method, size) for size in args.sizes for method in METHODS]
+    common.print_table(rows, ['method', 'faces', 'seconds', 'faces/s', 'peak_rss_delta_mb'])
+
+
+if __name__ == '__main__':
+    main()
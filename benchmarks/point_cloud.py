@@ -0,0 +1,52 @@
+"""Benchmark rendering labeled point clouds as octahedron meshes vs native point clouds (mode='points').
+
+Usage: python benchmarks/point_cloud.py [--points 1000000 5000000]
+"""
+import argparse
+import pathlib
+import tempfile
+
+import common
+import numpy as np
+
+from blenderless.geometry import PointCloud
+from blenderless.profiling import peak_rss_mb
+from blenderless.scene import Scene
+
+MODES = ('octahedron', 'points')
+
+
+def run_case(mode, num_points):
+    rng = np.random.default_rng(0)
+    point_cloud = PointCloud(points=rng.random((num_points, 3)),
+                             point_size=0.01,
+                             labels=rng.integers(10, size=num_points),
+                             colormap=rng.random((10, 3)),
+                             mode=mode)
+    baseline_rss = peak_rss_mb()
+
+    scene = Scene(resolution=(64, 64), num_samples=1)
+    scene.add_object(point_cloud)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _, seconds = common.timed(scene.render, pathlib.Path(tmp_dir) / 'render.png')
+
+    return {
+        'mode': mode,
+        'points': num_points,
+        'seconds': seconds,
+        'points/s': num_points / seconds,
+        'peak_rss_delta_mb': peak_rss_mb() - baseline_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    args = parser.parse_args()
+
+    rows = [common.run_isolated(run_case, mode, num_points) for num_points in args.points for mode in MODES]
+    common.print_table(rows, ['mode', 'points', 'seconds', 'points/s', 'peak_rss_delta_mb'])
+
+
+if __name__ == '__main__':
+    main()
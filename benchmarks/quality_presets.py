@@ -0,0 +1,77 @@
+"""Benchmark the render time and SSIM against the reference images of the test configs for every quality preset.
+
+The SSIM threshold matches tests/test_config.py, so the cheapest preset that passes can be picked per scene.
+
+Usage: python benchmarks/quality_presets.py [--configs tests/test_data/configs/*] [--qualities draft thumbnail]
+"""
+import argparse
+import pathlib
+import tempfile
+
+import common
+import numpy as np
+from omegaconf import OmegaConf
+from PIL import Image
+from skimage.metrics import structural_similarity
+
+from blenderless.scene import QUALITY_PRESETS
+from blenderless.scene import Scene
+
+SSIM_THRESHOLD = 0.995
+
+
+def run_case(config_dir, quality):
+    config = OmegaConf.load(config_dir / 'scene.yaml')
+    if quality != 'preset':
+        config.scene.quality = quality
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = pathlib.Path(tmp_dir) / 'scene.yaml'
+        OmegaConf.save(config, config_path)
+        scene = Scene.from_config(config_path, root_dir=config_dir)
+        try:
+            render_paths, seconds = common.timed(scene.render, pathlib.Path(tmp_dir) / 'render.png')
+        except Exception as exc:  # pylint: disable=broad-except
+            return {
+                'config': config_dir.name,
+                'quality': quality,
+                'seconds': float('nan'),
+                'ssim': float('nan'),
+                'passes': f'{type(exc).__name__}: {exc}'
+            }
+        render = np.asarray(Image.open(render_paths[0]))
+
+    reference = np.asarray(Image.open(config_dir / 'reference.png'))
+    ssim = structural_similarity(render, reference, channel_axis=2)
+    return {
+        'config': config_dir.name,
+        'quality': quality,
+        'seconds': seconds,
+        'ssim': ssim,
+        'passes': ssim > SSIM_THRESHOLD
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--configs',
+                        type=pathlib.Path,
+                        nargs='+',
+                        default=sorted(pathlib.Path('tests/test_data/configs').glob('*')))
+    parser.add_argument('--qualities',
+                        nargs='+',
+                        choices=['preset', *QUALITY_PRESETS],
+                        default=['preset', *QUALITY_PRESETS],
+                        help="Quality presets to compare, 'preset' keeps the settings of the preset .blend file")
+    args = parser.parse_args()
+
+    rows = [
+        common.run_isolated(run_case, config_dir.absolute(), quality)
+        for config_dir in args.configs
+        for quality in args.qualities
+    ]
+    common.print_table(rows, ['config', 'quality', 'seconds', 'ssim', 'passes'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark rendering many parts with the same scene: a Scene per part, a RenderSession and Scene.render_many.
+
+Usage: python benchmarks/render_many.py [--parts 20] [--faces 200000] [--resolution 128] [--samples 4]
+"""
+import argparse
+import pathlib
+import tempfile
+
+import common
+import trimesh
+
+from blenderless.camera import SphericalCoordinateCamera
+from blenderless.geometry import Mesh
+from blenderless.light import SphericalCoordinateLight
+from blenderless.profiling import peak_rss_mb
+from blenderless.profiling import RenderProfile
+from blenderless.scene import RenderSession
+from blenderless.scene import Scene
+
+PRESET_PATH = pathlib.Path('tests/test_data/preset.blend').absolute()
+
+
+def write_parts(tmp_dir, num_parts, num_faces):
+    vertices, faces = common.synthetic_mesh(num_faces)
+    paths = []
+    for n in range(num_parts):
+        path = tmp_dir / f'part_{n}.stl'
+        trimesh.Trimesh(vertices=vertices * (1 + n / num_parts), faces=faces, process=False).export(path)
+        paths.append(path)
+    return paths
+
+
+def new_scene(resolution, num_samples):
+    scene = Scene(preset_path=PRESET_PATH,
+                  preset_scene='dark',
+                  resolution=(resolution, resolution),
+                  num_samples=num_samples,
+                  shadow_plane=True)
+    scene.add_object(SphericalCoordinateCamera(azimuth=45, elevation=30))
+    scene.add_object(SphericalCoordinateLight(type='SUN', energy=2, azimuth=30, elevation=60))
+    return scene
+
+
+def render_scenes(paths, out_dir, resolution, num_samples, session=None):
+    for path in paths:
+        scene = new_scene(resolution, num_samples)
+        scene.add_object(Mesh(mesh_path=path))
+        scene.render(out_dir / f'{path.stem}.png', session=session)
+
+
+def run_case(mode, num_parts, num_faces, resolution, num_samples):
+    profile = RenderProfile()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = pathlib.Path(tmp_dir)
+        paths = write_parts(tmp_dir, num_parts, num_faces)
+        if mode == 'scene_per_part':
+            _, seconds = common.timed(render_scenes, paths, tmp_dir, resolution, num_samples)
+        elif mode == 'session':
+            _, seconds = common.timed(render_scenes, paths, tmp_dir, resolution, num_samples, RenderSession())
+        else:
+            scene = new_scene(resolution, num_samples)
+            renders = scene.render_many(paths, str(tmp_dir / '{stem}.png'), profile=profile)
+            _, seconds = common.timed(lambda: list(renders))
+
+    totals = profile.report()['totals']
+    return {
+        'mode': mode,
+        'parts': num_parts,
+        'seconds': seconds,
+        'parts/s': num_parts / seconds,
+        'wait_for_mesh': totals.get('wait_for_mesh', float('nan')),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts', type=int, default=20)
+    parser.add_argument('--faces', type=int, default=200_000)
+    parser.add_argument('--resolution', type=int, default=128)
+    parser.add_argument('--samples', type=int, default=4)
+    args = parser.parse_args()
+
+    rows = [
+        common.run_isolated(run_case, mode, args.parts, args.faces, args.resolution, args.samples)
+        for mode in ('scene_per_part', 'session', 'render_many')
+    ]
+    common.print_table(rows, ['mode', 'parts', 'seconds', 'parts/s', 'wait_for_mesh', 'peak_rss_mb'])
+
+
+if __name__ == '__main__':
+    main()
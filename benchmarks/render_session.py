@@ -0,0 +1,58 @@
+"""Benchmark consecutive small renders with and without a persistent RenderSession.
+
+Usage: python benchmarks/render_session.py [--renders 100] [--preset tests/test_data/preset.blend]
+"""
+import argparse
+import pathlib
+import tempfile
+
+import bpy
+import common
+import trimesh
+
+from blenderless.geometry import Mesh
+from blenderless.profiling import peak_rss_mb
+from blenderless.scene import RenderSession
+from blenderless.scene import Scene
+
+
+def run_case(use_session, num_renders, preset_path, preset_scene):
+    session = RenderSession() if use_session else None
+    vertices, faces = common.synthetic_mesh(10_000)
+    mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+    def render_all(tmp_dir):
+        for n in range(num_renders):
+            scene = Scene(preset_path=preset_path, preset_scene=preset_scene, resolution=(64, 64), num_samples=1)
+            scene.add_object(Mesh(mesh=mesh))
+            scene.render(tmp_dir / f'{n}.png', session=session)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _, seconds = common.timed(render_all, pathlib.Path(tmp_dir))
+
+    return {
+        'mode': 'session' if use_session else 'fresh',
+        'renders': num_renders,
+        'seconds': seconds,
+        'renders/s': num_renders / seconds,
+        'meshes_left': len(bpy.data.meshes),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=100)
+    parser.add_argument('--preset', type=pathlib.Path, default=pathlib.Path('tests/test_data/preset.blend'))
+    parser.add_argument('--preset-scene', default='dark')
+    args = parser.parse_args()
+
+    rows = [
+        common.run_isolated(run_case, use_session, args.renders, args.preset.absolute(), args.preset_scene)
+        for use_session in (False, True)
+    ]
+    common.print_table(rows, ['mode', 'renders', 'seconds', 'renders/s', 'meshes_left', 'peak_rss_mb'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""End-to-end benchmark suite of the render pipeline, compared against a stored baseline to catch regressions.
+
+Every case renders synthetic meshes in a fresh process on CPU and reports the wall time, throughput and peak memory,
+together with the time per render stage from blenderless.profiling.
+
+Usage:
+    python benchmarks/suite.py [--cases mesh_1m gif_turntable] [--repeat 3]
+    python benchmarks/suite.py --save-baseline  # Store the results as the baseline of this machine.
+"""
+import argparse
+import json
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+
+import common
+import numpy as np
+import trimesh
+from omegaconf import OmegaConf
+
+from blenderless import batch
+from blenderless.camera import SphericalCoordinateCamera
+from blenderless.geometry import Mesh
+from blenderless.geometry import PointCloud
+from blenderless.profiling import peak_rss_mb
+from blenderless.profiling import RenderProfile
+from blenderless.scene import Scene
+
+# The baseline holds timings of a single machine and is not checked in. Under bazel run it is kept in the workspace.
+BASELINE_PATH = pathlib.Path(os.environ.get('BUILD_WORKSPACE_DIRECTORY',
+                                            pathlib.Path(__file__).parent.parent), 'benchmarks', 'baseline.json')
+PRESET_PATH = pathlib.Path('tests/test_data/preset.blend')
+RESOLUTION = (128, 128)
+NUM_SAMPLES = 4
+
+
+def write_mesh(path, num_faces):
+    vertices, faces = common.synthetic_mesh(num_faces)
+    trimesh.Trimesh(vertices=vertices, faces=faces, process=False).export(path)
+    return path
+
+
+def render_scene(scene, tmp_dir):
+    profile = RenderProfile()
+    _, seconds = common.timed(scene.render, tmp_dir / 'render.png', profile=profile)
+    return seconds, profile
+
+
+def mesh_ingestion(tmp_dir, num_faces):
+    scene = Scene(resolution=RESOLUTION, num_samples=NUM_SAMPLES)
+    scene.add_object(Mesh(mesh_path=write_mesh(tmp_dir / 'mesh.stl', num_faces)))
+    seconds, profile = render_scene(scene, tmp_dir)
+    return {'renders': 1, 'faces': num_faces, 'seconds': seconds, 'profile': profile}
+
+
+def point_cloud(tmp_dir, num_points):
+    rng = np.random.default_rng(0)
+    scene = Scene(resolution=RESOLUTION, num_samples=NUM_SAMPLES)
+    scene.add_object(
+        PointCloud(points=rng.random((num_points, 3)),
+                   point_size=0.01,
+                   labels=rng.integers(10, size=num_points),
+                   colormap=rng.random((10, 3)),
+                   mode='points'))
+    seconds, profile = render_scene(scene, tmp_dir)
+    return {'renders': 1, 'points': num_points, 'seconds': seconds, 'profile': profile}
+
+
+def labeled_mesh(tmp_dir, num_faces, num_labels=20):
+    vertices, faces = common.synthetic_mesh(num_faces)
+    rng = np.random.default_rng(0)
+    scene = Scene(resolution=RESOLUTION, num_samples=NUM_SAMPLES)
+    scene.add_object(
+        Mesh(mesh=trimesh.Trimesh(vertices=vertices, faces=faces, process=False),
+             labels=rng.integers(num_labels, size=len(faces)),
+             colormap=rng.integers(256, size=(num_labels, 3))))
+    seconds, profile = render_scene(scene, tmp_dir)
+    return {'renders': 1, 'faces': num_faces, 'seconds': seconds, 'profile': profile}
+
+
+def multi_camera(tmp_dir, num_faces, num_cameras):
+    scene = Scene(resolution=RESOLUTION, num_samples=NUM_SAMPLES)
+    scene.add_object(Mesh(mesh_path=write_mesh(tmp_dir / 'mesh.stl', num_faces)))
+    for azimuth in np.linspace(0, 360, num_cameras, endpoint=False):
+        scene.add_object(SphericalCoordinateCamera(azimuth=azimuth, elevation=30))
+    seconds, profile = render_scene(scene, tmp_dir)
+    return {'renders': num_cameras, 'faces': num_faces * num_cameras, 'seconds': seconds, 'profile': profile}
+
+
+def gif_turntable(tmp_dir, num_faces, num_frames):
+    scene = Scene(resolution=RESOLUTION, num_samples=NUM_SAMPLES)
+    scene.add_object(Mesh(mesh_path=write_mesh(tmp_dir / 'mesh.stl', num_faces)))
+    for azimuth in np.linspace(0, 360, num_frames, endpoint=False):
+        scene.add_object(SphericalCoordinateCamera(azimuth=azimuth, elevation=30))
+    profile = RenderProfile()
+    _, seconds = common.timed(scene.render_gif, tmp_dir / 'render.gif', profile=profile)
+    return {'renders': num_frames, 'faces': num_faces * num_frames, 'seconds': seconds, 'profile': profile}
+
+
+def config_preset(tmp_dir, num_faces):
+    config = {
+        'scene': {
+            'preset_path': str(PRESET_PATH.absolute()),
+            'preset_scene': 'dark',
+            'resolution': list(RESOLUTION),
+            'num_samples': NUM_SAMPLES
+        },
+        'cameras': [{
+            '_target_': 'blenderless.camera.SphericalCoordinateCamera',
+            'azimuth': 45,
+            'elevation': 30
+        }],
+        'objects': [{
+            '_target_': 'blenderless.geometry.Mesh',
+            'mesh_path': str(write_mesh(tmp_dir / 'mesh.stl', num_faces)),
+            'material': {
+                '_target_': 'blenderless.material.MaterialFromName',
+                'material_name': 'test_material'
+            }
+        }],
+    }
+    config_path = tmp_dir / 'scene.yaml'
+    OmegaConf.save(config, config_path)
+    seconds, profile = render_scene(Scene.from_config(config_path), tmp_dir)
+    return {'renders': 1, 'faces': num_faces, 'seconds': seconds, 'profile': profile}
+
+
+def cli_batch(tmp_dir, num_faces, num_files, jobs):
+    """Render files like the image command of the cli, i.e. with the default resolution and samples."""
+    geometry_files = [write_mesh(tmp_dir / f'mesh_{n}.stl', num_faces) for n in range(num_files)]
+    results, seconds = common.timed(lambda: list(batch.render_files(geometry_files, 'image', jobs, profile=True)))
+    failed = [result.error for result in results if not result.ok]
+    if failed:
+        raise RuntimeError(f'batch render failed: {failed}')
+    # The renders run in worker processes, so their stage totals are summed from the reports.
+    totals = {}
+    for result in results:
+        for name, stage_seconds in result.profile['totals'].items():
+            totals[name] = totals.get(name, 0) + stage_seconds
+    return {'renders': num_files, 'faces': num_faces * num_files, 'seconds': seconds, 'stages': totals}
+
+
+CASES = {
+    'mesh_10k': (mesh_ingestion, 10_000),
+    'mesh_100k': (mesh_ingestion, 100_000),
+    'mesh_1m': (mesh_ingestion, 1_000_000),
+    'point_cloud_100k': (point_cloud, 100_000),
+    'labeled_mesh_100k': (labeled_mesh, 100_000),
+    'multi_camera_8': (multi_camera, 100_000, 8),
+    'gif_turntable_12': (gif_turntable, 100_000, 12),
+    'config_preset': (config_preset, 100_000),
+    'cli_batch_2': (cli_batch, 10_000, 2, 2),
+}
+
+
+def run_case(name):
+    fn, *args = CASES[name]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = fn(pathlib.Path(tmp_dir), *args)
+
+    seconds = result.pop('seconds')
+    row = {'case': name, 'seconds': seconds, 'renders/s': result.pop('renders') / seconds}
+    if 'faces' in result:
+        row['faces/s'] = result.pop('faces') / seconds
+    if 'points' in result:
+        row['points/s'] = result.pop('points') / seconds
+    row['peak_rss_mb'] = peak_rss_mb()
+    profile = result.pop('profile', None)
+    row['stages'] = profile.report()['totals'] if profile is not None else result.pop('stages')
+    return row
+
+
+def run_repeated(name, repeat):
+    """Run a case repeat times in fresh processes and keep the fastest run."""
+    rows = [common.run_isolated(run_case, name) for _ in range(repeat)]
+    return min(rows, key=lambda row: row['seconds'])
+
+
+def compare(rows, baseline, tolerance):
+    """Return the regressions of rows with respect to the baseline results, as readable strings."""
+    baseline_rows = {row['case']: row for row in baseline['results']}
+    regressions = []
+    for row in rows:
+        baseline_row = baseline_rows.get(row['case'])
+        if baseline_row is None:
+            continue
+        row['vs_baseline'] = row['seconds'] / baseline_row['seconds']
+        for metric in ('seconds', 'peak_rss_mb'):
+            ratio = row[metric] / baseline_row[metric]
+            if ratio > 1 + tolerance:
+                regressions.append(f'{row["case"]}: {metric} {baseline_row[metric]:.3f} -> {row[metric]:.3f} '
+                                   f'({ratio:.2f}x)')
+    return regressions
+
+
+def machine_info():
+    return {'platform': platform.platform(), 'python': sys.version.split()[0], 'cpu_count': os.cpu_count()}
+
+
+def write_results(path, results):
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case, the fastest run is reported')
+    parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE_PATH)
+    parser.add_argument('--tolerance',
+                        type=float,
+                        default=0.25,
+                        help='Relative slowdown or memory increase that is reported as a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--output', type=pathlib.Path, default=None, help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.cases:
+        rows.append(run_repeated(name, args.repeat))
+        print(f'{name}: {rows[-1]["seconds"]:.3f}s', flush=True)
+
+    results = {'machine': machine_info(), 'results': rows}
+    regressions = []
+    if args.save_baseline:
+        write_results(args.baseline, results)
+    elif not args.baseline.exists():
+        print(f'No baseline at {args.baseline}, record one on this machine with --save-baseline')
+    else:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline['machine'] != results['machine']:
+            print(f'Warning: baseline was recorded on {baseline["machine"]}, timings may not be comparable')
+        regressions = compare(rows, baseline, args.tolerance)
+    if args.output is not None:
+        write_results(args.output, results)
+
+    columns = ['case', 'seconds', 'renders/s', 'faces/s', 'points/s', 'peak_rss_mb', 'vs_baseline']
+    common.print_table([{col: row.get(col, '') for col in columns} for row in rows], columns)
+    for regression in regressions:
+        print(f'Regression: {regression}')
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,2 @@
 from blenderless.main import Blenderless  # noqa
+from blenderless.main import RenderOptions  # noqa
@@ -0,0 +1,155 @@
+import collections
+import concurrent.futures
+import logging
+import os
+import pathlib
+import time
+from dataclasses import dataclass
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from blenderless.main import Blenderless
+from blenderless.main import RenderOptions
+from blenderless.profiling import RenderProfile
+from blenderless.scene import RenderSession
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_SUFFIXES = {'image': '.png', 'gif': '.gif'}
+
+# Each worker process keeps its own blender session alive for all files it renders, stored by _init_worker.
+_worker_state = {}
+
+
+@dataclass
+class BatchResult:
+    """Outcome of rendering a single geometry file."""
+    geometry_file: pathlib.Path
+    output_file: Optional[pathlib.Path]
+    seconds: float
+    error: Optional[str] = None
+    profile: Optional[dict] = None
+    """RenderProfile report, when profiling."""
+    cache_stats: Optional[dict] = None
+    """(hits, misses) of this render per enabled cache, 'render' and 'geometry'."""
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def output_path(geometry_file: pathlib.Path, mode: str) -> pathlib.Path:
+    return geometry_file.parent / f'{geometry_file.stem}{OUTPUT_SUFFIXES[mode]}'
+
+
+def _cache_counts() -> dict:
+    caches = {'render': Blenderless.cache, 'geometry': Blenderless.geometry_cache}
+    return {name: (cache.hits, cache.misses) for name, cache in caches.items() if cache is not None}
+
+
+def render_file(geometry_file: pathlib.Path,
+                mode: str = 'image',
+                num_threads: int = 0,
+                profile: bool = False,
+                session: Optional[RenderSession] = None) -> BatchResult:
+    """Render a single geometry file next to the input, errors are returned instead of raised.
+
+    With session set, the file is rendered in that RenderSession instead of a newly reset blender.
+    """
+    start = time.perf_counter()
+    output_file = output_path(geometry_file, mode)
+    render = Blenderless.render if mode == 'image' else Blenderless.gif
+    render_profile = RenderProfile(str(geometry_file)) if profile else None
+    options = RenderOptions(session=session, profile=render_profile)
+    counts = _cache_counts()
+    error = None
+    try:
+        render(geometry_file, output_file, options=options, num_threads=num_threads)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.debug(f'render failed: {geometry_file}', exc_info=True)
+        output_file, error = None, f'{type(exc).__name__}: {exc}'
+    cache_stats = {
+        name: (hits - counts[name][0], misses - counts[name][1]) for name, (hits, misses) in _cache_counts().items()
+    }
+    return BatchResult(geometry_file,
+                       output_file,
+                       time.perf_counter() - start,
+                       error=error,
+                       profile=render_profile and render_profile.report(),
+                       cache_stats=cache_stats)
+
+
+def _init_worker(verbose, export_blend_path, cache, geometry_cache):
+    _worker_state['session'] = RenderSession()
+    Blenderless.verbose = verbose
+    Blenderless.export_blend_path = export_blend_path
+    Blenderless.cache = cache
+    Blenderless.geometry_cache = geometry_cache
+
+
+def _render_in_worker(geometry_file: pathlib.Path, mode: str, num_threads: int, profile: bool) -> BatchResult:
+    return render_file(geometry_file, mode, num_threads, profile, session=_worker_state['session'])
+
+
+def _new_executor(jobs: int) -> concurrent.futures.ProcessPoolExecutor:
+    return concurrent.futures.ProcessPoolExecutor(jobs,
+                                                  initializer=_init_worker,
+                                                  initargs=(Blenderless.verbose, Blenderless.export_blend_path,
+                                                            Blenderless.cache, Blenderless.geometry_cache))
+
+
+def _render_isolated(geometry_file: pathlib.Path, mode: str, num_threads: int, profile: bool) -> BatchResult:
+    """Render a single file in a worker process of its own, reporting a crash of the worker as its error."""
+    with _new_executor(1) as executor:
+        try:
+            return executor.submit(_render_in_worker, geometry_file, mode, num_threads, profile).result()
+        except Exception as exc:  # pylint: disable=broad-except
+            return BatchResult(geometry_file, None, 0., error=f'{type(exc).__name__}: {exc}')
+
+
+def render_files(geometry_files: List[pathlib.Path],
+                 mode: str = 'image',
+                 jobs: int = 1,
+                 profile: bool = False) -> Iterator[BatchResult]:
+    """Render geometry files, yielding a BatchResult per file as soon as it is done.
+
+    With jobs > 1 the files are fanned out to a pool of worker processes, each with its own blender session and
+    an equal share of the available cpu cores as render threads. With profile set, every result holds the
+    RenderProfile report of its render.
+
+    When a worker process dies, e.g. because blender crashed, the pool is replaced. The files that were rendering at
+    that moment are rendered again one at a time, so only the file that crashes blender is reported as failed.
+    """
+    if jobs <= 1:
+        session = RenderSession()
+        for geometry_file in geometry_files:
+            yield render_file(geometry_file, mode, profile=profile, session=session)
+        return
+
+    num_threads = max(1, (os.cpu_count() or 1) // jobs)
+    queue = collections.deque(geometry_files)
+    while queue:
+        crashed = []
+        with _new_executor(jobs) as executor:
+            # At most one file per worker is submitted, so a crash only affects the files that are rendering.
+            futures = {}
+            while futures or (queue and not crashed):
+                while queue and len(futures) < jobs and not crashed:
+                    geometry_file = queue.popleft()
+                    future = executor.submit(_render_in_worker, geometry_file, mode, num_threads, profile)
+                    futures[future] = geometry_file
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    geometry_file = futures.pop(future)
+                    try:
+                        yield future.result()
+                    except concurrent.futures.process.BrokenProcessPool:
+                        crashed.append(geometry_file)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        yield BatchResult(geometry_file, None, 0., error=f'{type(exc).__name__}: {exc}')
+
+        if crashed:
+            logger.warning(f'a worker process died, rendering {len(crashed)} files again one at a time')
+        for geometry_file in crashed:
+            yield _render_isolated(geometry_file, mode, num_threads, profile)
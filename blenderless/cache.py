@@ -0,0 +1,290 @@
+import dataclasses
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+import trimesh
+
+from blenderless.io import FileHandlerFactory
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+"""Bump to invalidate existing cache entries when the rendering output changes."""
+GEOMETRY_CACHE_VERSION = 1
+"""Bump to invalidate existing geometry cache entries when their layout changes."""
+
+STALE_TMP_SECONDS = 3600
+"""Staging directories older than this are left behind by a crashed process and removed on eviction."""
+RESCAN_FRACTION = 1 / 16
+"""Fraction of max_size a process stores before it rescans the cache, to account for entries of other processes."""
+
+
+class DiskCache:
+    """Base of on-disk caches whose entries are directories of files, named after their key.
+
+    Writes are atomic (an entry is renamed into place) and so is eviction (an entry is renamed away before it is
+    removed), so the cache can be shared by several processes, which never see a partially written or removed entry.
+    When the cache grows beyond max_size bytes, the least recently used entries are evicted.
+
+    Every process keeps a running total of the cache size and only scans the cache directory to evict entries when
+    its own stores would exceed max_size, or after storing RESCAN_FRACTION of max_size. Processes sharing the cache
+    can therefore exceed max_size by up to RESCAN_FRACTION of it each.
+    """
+
+    def __init__(self, cache_dir, max_size=1 << 30):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._file_digests = {}
+        self._scanned_size = None
+        self._stored_size = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_files(self, key: str) -> Optional[List[pathlib.Path]]:
+        """Return the files of the entry of key and mark it as recently used, or None if there is no such entry."""
+        entry = self.cache_dir / key
+        try:
+            files = sorted(entry.iterdir())
+            self._touch(entry)  # Mark as recently used.
+        except FileNotFoundError:
+            return None
+        return files or None
+
+    def _count(self, key: str, hit: bool):
+        if hit:
+            self.hits += 1
+            logger.debug(f'{type(self).__name__} hit: {key}')
+        else:
+            self.misses += 1
+
+    def _store_entry(self, key: str, write):
+        """Store the files that write(directory) writes under key and evict old entries if needed."""
+        tmp_dir = pathlib.Path(tempfile.mkdtemp(prefix='.', dir=self.cache_dir))
+        try:
+            write(tmp_dir)
+            size = sum(file.stat().st_size for file in tmp_dir.iterdir())
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._touch(tmp_dir)
+        try:
+            os.rename(tmp_dir, self.cache_dir / key)
+        except OSError:  # Entry was already stored by another process.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        self._stored_size += size
+        if (self._scanned_size is None or self._scanned_size + self._stored_size > self.max_size or
+                self._stored_size > RESCAN_FRACTION * self.max_size):
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size, and stale temporary directories."""
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            try:
+                if entry.name.startswith('.'):
+                    self._remove_if_stale(entry)
+                    continue
+                size = sum(file.stat().st_size for file in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except FileNotFoundError:
+                continue
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            removed = self.cache_dir / f'.removed-{uuid.uuid4().hex}'
+            try:
+                os.rename(entry, removed)
+            except FileNotFoundError:  # Evicted by another process.
+                continue
+            shutil.rmtree(removed, ignore_errors=True)
+            total_size -= size
+        self._scanned_size, self._stored_size = total_size, 0
+
+    @staticmethod
+    def _remove_if_stale(path: pathlib.Path):
+        """Remove an evicted entry that was not removed or a staging directory of a crashed process."""
+        if path.name.startswith('.removed-') or time.time() - path.stat().st_mtime > STALE_TMP_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _touch(path: pathlib.Path):
+        # Explicit fine-grained timestamps, file system timestamps can be too coarse to order entries.
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def _file_digest(self, path: pathlib.Path) -> bytes:
+        path = path.absolute()
+        if not path.is_file():
+            return str(path).encode()
+        stat = path.stat()
+
+        memo_key = (path, stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._file_digests:
+            file_digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    file_digest.update(chunk)
+            self._file_digests[memo_key] = file_digest.digest()
+        return self._file_digests[memo_key]
+
+
+class RenderCache(DiskCache):
+    """Content addressed on-disk cache for rendered images.
+
+    Entries are keyed on a hash of everything that affects the rendered image: scene settings, the preset file
+    contents, objects, cameras, materials and the contents of all mesh files. Each entry is a directory holding the
+    rendered files.
+    """
+
+    def key(self, *values, root_dir=None) -> str:
+        """Hash values into a cache key.
+
+        Values can be (nested) dataclasses, dicts, sequences, arrays and trimesh meshes. Paths, and string values of
+        fields or dict keys ending with '_path', are hashed by file contents, relative to root_dir.
+        """
+        digest = hashlib.sha256(f'blenderless-render-cache-v{CACHE_VERSION}'.encode())
+        root_dir = pathlib.Path() if root_dir is None else pathlib.Path(root_dir)
+        for value in values:
+            self._update(digest, value, root_dir)
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[List[pathlib.Path]]:
+        """Return the files stored for key, or None on a cache miss.
+
+        Another process can evict the entry before the files are read, use read to handle that as a miss.
+        """
+        files = self._entry_files(key)
+        self._count(key, files is not None)
+        return files
+
+    def read(self, key: str, read_files: Callable[[List[pathlib.Path]], Any]) -> Any:
+        """Return read_files(files) for the files stored for key, or None on a cache miss.
+
+        An entry that is evicted by another process while its files are read counts as a miss.
+        """
+        files = self._entry_files(key)
+        result = None
+        if files is not None:
+            try:
+                result = read_files(files)
+            except FileNotFoundError:  # Evicted by another process.
+                pass
+        self._count(key, result is not None)
+        return result
+
+    def store(self, key: str, paths: List[pathlib.Path]):
+        """Store copies of the rendered files under key and evict old entries if needed."""
+
+        def write(entry: pathlib.Path):
+            for n, path in enumerate(paths):
+                shutil.copyfile(path, entry / f'{n:03d}{pathlib.Path(path).suffix}')
+
+        self._store_entry(key, write)
+
+    def _update(self, digest, value, root_dir: pathlib.Path, name: str = ''):
+        digest.update(f'<{type(value).__qualname__}:{name}>'.encode())
+        if name.endswith('_path') and isinstance(value, (str, os.PathLike)):
+            value = root_dir / value
+
+        if isinstance(value, os.PathLike):
+            digest.update(self._file_digest(pathlib.Path(value)))
+        elif isinstance(value, trimesh.Trimesh):
+            self._update(digest, value.vertices, root_dir)
+            self._update(digest, value.faces, root_dir)
+        elif isinstance(value, np.ndarray):
+            digest.update(f'{value.dtype.str}{value.shape}'.encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        elif dataclasses.is_dataclass(value):
+            for field in dataclasses.fields(value):
+                self._update(digest, getattr(value, field.name), root_dir, field.name)
+        elif isinstance(value, dict):
+            for key in sorted(value, key=str):
+                self._update(digest, value[key], root_dir, str(key))
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self._update(digest, item, root_dir)
+        else:
+            digest.update(repr(value).encode())
+
+
+class GeometryCache(DiskCache):
+    """On-disk cache of the vertex and face arrays of mesh files, which later loads memory map instead of parsing.
+
+    Entries are keyed on a hash of the file contents and the file handler that loads it, including its version and the
+    trimesh version. Each entry is a directory with one .npy file per array, e.g. vertices.npy and faces.npy, which
+    may include other arrays such as labels. Loaded arrays are read only views of these files, so processes that load
+    the same mesh share its pages in the page cache. An evicted entry that is still mapped keeps using disk space until
+    it is unmapped.
+    """
+
+    def __init__(self, cache_dir, max_size=4 << 30):
+        super().__init__(cache_dir, max_size)
+
+    def key(self, path, handler=None) -> str:
+        """Hash the contents of the mesh file at path and its file handler, by default that of FileHandlerFactory."""
+        path = pathlib.Path(path)
+        handler = FileHandlerFactory.get_loader(path) if handler is None else handler
+        digest = hashlib.sha256(f'blenderless-geometry-cache-v{GEOMETRY_CACHE_VERSION}'.encode())
+        digest.update(f'{handler.__module__}.{handler.__qualname__}-v{handler.version}'.encode())
+        digest.update(f'trimesh-{trimesh.__version__}'.encode())
+        digest.update(self._file_digest(path))
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Return the arrays stored for key by name as read only memory maps, or None on a cache miss."""
+        files = self._entry_files(key)
+        arrays = None
+        if files is not None:
+            try:
+                arrays = {file.stem: np.load(file, mmap_mode='r') for file in files}
+            except FileNotFoundError:  # Evicted by another process.
+                pass
+        self._count(key, arrays is not None)
+        return arrays
+
+    def store(self, key: str, arrays: Dict[str, np.ndarray]):
+        """Store arrays by name under key and evict old entries if needed."""
+
+        def write(entry: pathlib.Path):
+            for name, array in arrays.items():
+                np.save(entry / f'{name}.npy', np.asarray(array))
+
+        self._store_entry(key, write)
+
+    def get_mesh(self, path, handler=None) -> Optional[trimesh.Trimesh]:
+        """Return the cached mesh of the file at path, wrapping the memory mapped arrays, or None on a cache miss."""
+        arrays = self.load(self.key(path, handler))
+        if arrays is None:
+            return None
+        return trimesh.Trimesh(vertices=arrays['vertices'], faces=arrays['faces'], process=False)
+
+    def load_mesh(self, path, handler=None):
+        """Load the mesh file at path from the cache, or load it with handler and store it in the cache.
+
+        Files that do not load as a single trimesh, e.g. point clouds, are loaded without the cache.
+        """
+        path = pathlib.Path(path)
+        handler = FileHandlerFactory.get_loader(path) if handler is None else handler
+        mesh = self.get_mesh(path, handler)
+        if mesh is None:
+            mesh = handler.load(path)
+            if isinstance(mesh, trimesh.Trimesh):
+                self.store(self.key(path, handler), {'vertices': mesh.vertices, 'faces': mesh.faces})
+        return mesh
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 from dataclasses import field
+from typing import List
 
 import bpy
+import numpy as np
 
 from blenderless import utils
 from blenderless.blender_object import BlenderObject
@@ -36,3 +38,17 @@ class SphericalCoordinateCamera(BlenderCamera):
         q2 = utils.camRotQuaternion(x, y, z, float(self.theta))
         self.quaternion = utils.quaternionProduct(q2, q1)
         self.xyz = x, y, z
+
+
+def cameras_from_poses(positions, quaternions, **kwargs) -> List[BlenderCamera]:
+    """Cameras at the poses of blenderless.poses, kwargs are passed to every BlenderCamera.
+
+    Example:
+        for camera in cameras_from_poses(*poses.fibonacci_sphere(100), camera_type='PERSP'):
+            scene.add_object(camera)
+    """
+    return [
+        BlenderCamera(xyz=tuple(position), quaternion=tuple(quaternion), **kwargs)
+        for position, quaternion in zip(np.asarray(positions).tolist(),
+                                        np.asarray(quaternions).tolist())
+    ]
@@ -1,17 +1,52 @@
 import logging
 import pathlib
+import time
 
 import click
 
+from blenderless import batch
 from blenderless import Blenderless
+from blenderless import profiling
+from blenderless.cache import GeometryCache
+from blenderless.cache import RenderCache
 
 logger = logging.getLogger(__name__)
 
 
+def store_option(ctx, param, value):
+    """Click callback that keeps the value of an option in ctx.obj instead of passing it to the command."""
+    ctx.ensure_object(dict)[param.name] = value
+
+
+def cache_option(*param_decls, **kwargs):
+    """Option of the caches, which is collected in ctx.obj and applied by setup_caches()."""
+    return click.option(*param_decls, expose_value=False, callback=store_option, **kwargs)
+
+
+def setup_caches(options):
+    """Set the render and geometry cache of Blenderless from the cache options."""
+    if options['cache_dir']:
+        Blenderless.cache = RenderCache(options['cache_dir'], max_size=options['cache_size'] * 1024 * 1024)
+    if options['geometry_cache_dir']:
+        Blenderless.geometry_cache = GeometryCache(options['geometry_cache_dir'],
+                                                   max_size=options['geometry_cache_size'] * 1024 * 1024)
+
+
 @click.group()
 @click.option('--verbose/--no-verbose', '-v', default=None, help="Verbose output")
 @click.option('--export-blend-path', '-b', default=None, help="Path to export the generated .blend file to")
-def main(verbose: bool | None, export_blend_path):
+@cache_option('--cache-dir', default=None, help="Directory of the render cache, renders are not cached if omitted")
+@cache_option('--cache-size', default=1024, type=int, help="Maximum size of the render cache in MB")
+@cache_option('--geometry-cache-dir',
+              default=None,
+              help="Directory of the cache of loaded mesh files, meshes are parsed on every render if omitted")
+@cache_option('--geometry-cache-size', default=4096, type=int, help="Maximum size of the geometry cache in MB")
+@click.option('--profile',
+              'profile_path',
+              default=None,
+              help="Write the time and memory of every render stage to this Chrome trace JSON file")
+@click.pass_context
+def main(ctx, verbose: bool | None, export_blend_path, profile_path):
     """Rendering geometries from the cli using blender"""
     level = logging.DEBUG if verbose else logging.INFO
     logging.basicConfig(level=level, format='%(processName)s %(message)s')
@@ -22,33 +57,68 @@ def main(verbose: bool | None, export_blend_path):
     Blenderless.verbose = verbose
     if export_blend_path:
         logging.info(f'Generated .blend file will be exported to: {export_blend_path}')
+    setup_caches(ctx.ensure_object(dict))
+    ctx.obj['profile_path'] = profile_path
+
+
+def get_profile_path():
+    return (click.get_current_context().find_root().obj or {}).get('profile_path')
+
+
+def save_profile(profile_path, reports):
+    profiling.save_chrome_trace(profile_path, reports)
+    logger.info(f'profile written to {pathlib.Path(profile_path).absolute()}')
+
+
+def render_batch(file_path, root, mode, jobs):
+    geometry_files = list(pathlib.Path(root).glob(file_path))
+    logger.info(f'found {len(geometry_files)} geometry files')
+    profile_path = get_profile_path()
+    start = time.perf_counter()
+    failed = []
+    reports = []
+    cache_stats = {}
+    for result in batch.render_files(geometry_files, mode, jobs, profile=profile_path is not None):
+        if result.profile is not None:
+            reports.append(result.profile)
+        for name, (hits, misses) in (result.cache_stats or {}).items():
+            total_hits, total_misses = cache_stats.get(name, (0, 0))
+            cache_stats[name] = (total_hits + hits, total_misses + misses)
+        if result.ok:
+            logger.info(result.output_file.absolute())
+            logger.debug(f'render successful in {result.seconds:.2f}s')
+        else:
+            logger.error(f'render failed: {result.geometry_file}: {result.error}')
+            failed.append(result.geometry_file)
+
+    seconds = time.perf_counter() - start
+    num_rendered = len(geometry_files) - len(failed)
+    logger.info(f'rendered {num_rendered}/{len(geometry_files)} files in {seconds:.1f}s '
+                f'({num_rendered / max(seconds, 1e-9):.2f} files/s, {jobs} jobs), {len(failed)} failed')
+    for name, (hits, misses) in cache_stats.items():
+        logger.info(f'{name} cache: {hits} hits, {misses} misses')
+    if profile_path is not None:
+        save_profile(profile_path, reports)
+    if failed:
+        raise SystemExit(1)
 
 
 @main.command()
 @click.argument("file_path", required=True, type=str)
 @click.argument("root", default=".", required=False, type=str)
-def image(file_path, root):
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help="Number of parallel render processes")
+def image(file_path, root, jobs):
     """Render geometries to image"""
-    geometry_files = list(pathlib.Path(root).glob(file_path))
-    logger.info(f'found {len(geometry_files)} geometry files')
-    for geometry_file in geometry_files:
-        logger.debug(f'render: {geometry_file}')
-        Blenderless.render(geometry_file, geometry_file.parent / f'{geometry_file.stem}.png')
-        logger.info((geometry_file.parent / f'{geometry_file.stem}.png').absolute())
-        logger.debug('render successful')
+    render_batch(file_path, root, 'image', jobs)
 
 
 @main.command()
 @click.argument("file_path", required=True, type=str)
 @click.argument("root", default=".", required=False, type=str)
-def gif(file_path, root):
+@click.option('--jobs', '-j', default=1, type=click.IntRange(min=1), help="Number of parallel render processes")
+def gif(file_path, root, jobs):
     """Render geometries to gif"""
-    geometry_files = list(pathlib.Path(root).glob(file_path))
-    logger.info(f'found {len(geometry_files)} geometry files')
-    for geometry_file in geometry_files:
-        logger.debug(f'render: {geometry_file}')
-        Blenderless.gif(geometry_file, geometry_file.parent / f'{geometry_file.stem}.gif')
-        logger.debug('render successful')
+    render_batch(file_path, root, 'gif', jobs)
 
 
 @main.command()
@@ -56,7 +126,11 @@ def gif(file_path, root):
 @click.argument("output_file", default="render.png", required=False, type=str)
 def config(config_path, output_file):
     """Render scene from config file"""
-    Blenderless.render_from_config(config_path, output_file)
+    profile_path = get_profile_path()
+    profile = None if profile_path is None else profiling.RenderProfile(str(config_path))
+    Blenderless.render_from_config(config_path, output_file, profile=profile)
+    if profile is not None:
+        save_profile(profile_path, [profile.report()])
     logger.info(pathlib.Path(output_file).absolute())
     logger.debug('render successful')
 
@@ -8,11 +8,25 @@ import bpy
 import numpy as np
 import trimesh
 
+from blenderless import lod
 from blenderless.blender_object import BlenderObject
+from blenderless.io import FileHandlerFactory
 from blenderless.material import add_material
+from blenderless.material import add_materials
 from blenderless.material import Material
+from blenderless.material import MaterialFromAttribute
 from blenderless.material import MaterialFromName
 from blenderless.material import MaterialRGBA
+from blenderless.material import rgba_colors
+
+COLOR_ATTRIBUTE = 'rgba'
+"""Name of the color attribute that is read by MaterialFromAttribute materials."""
+LABEL_MODES = ('materials', 'attribute')
+
+
+def color_attribute_material() -> MaterialFromAttribute:
+    """Material shared by all geometry that is colored by its COLOR_ATTRIBUTE attribute."""
+    return MaterialFromAttribute(material_name='color_attribute', attribute_name=COLOR_ATTRIBUTE)
 
 
 @dataclass
@@ -20,6 +34,11 @@ class Geometry(BlenderObject):
     """Geometry Blender Object.
 
     This class allows a material to be added to the object.
+
+    Faces are colored by looking up their labels in the colormap. With label_mode='materials' every colormap entry
+    becomes a material slot. With label_mode='attribute' the colors are written to one color attribute instead, which a
+    single shared material reads, so thousands of labels cost no more than one. Workbench previews only show the color
+    of materials, not of attributes.
     """
     material: Material = field(default_factory=MaterialRGBA)
     material_list: List[Material] = None
@@ -28,37 +47,80 @@ class Geometry(BlenderObject):
     labels: np.ndarray = None
     is_shadow_catcher: bool = False
     thickness: Optional[float] = None
+    label_mode: str = 'materials'
+    _shares_object_data = False
 
     def blender_object(self):
         super().blender_object()
+        link = 'OBJECT' if self._shares_object_data else 'DATA'
+        add_materials(self._blender_object, self._blender_materials(), link=link)
+
+        # Settings are applied idempotently, so Scene.render_many can reuse the object for another geometry.
+        self._blender_object.is_shadow_catcher = self.is_shadow_catcher
+
+        solidify = self._blender_object.modifiers.get('Solidify')
+        if self.thickness is None:
+            if solidify is not None:
+                self._blender_object.modifiers.remove(solidify)
+        else:
+            if solidify is None:
+                solidify = self._blender_object.modifiers.new('Solidify', 'SOLIDIFY')
+            solidify.offset = 0
+            solidify.thickness = 5e-4
+
+        return self._blender_object
+
+    def _labels_as_attribute(self) -> bool:
+        """Whether the labels are colored by a color attribute instead of material slots."""
+        if self.label_mode not in LABEL_MODES:
+            raise ValueError(f'label_mode must be one of {LABEL_MODES}, got: {self.label_mode}')
+        return self.label_mode == 'attribute' and self.labels is not None and self.colormap is not None
+
+    def _label_colors(self, labels) -> np.ndarray:
+        """RGBA color of every label, labels outside the colormap get the color of the nearest entry."""
+        colormap = rgba_colors(self.colormap)
+        return colormap[np.clip(np.asarray(labels), 0, len(colormap) - 1)]
+
+    def _blender_materials(self):
+        if self._labels_as_attribute():
+            return [color_attribute_material().blender_material()]
+
         if self.colormap is not None:
             self.material_list = MaterialRGBA.material_list_from_colormap(self.colormap)
 
         if self.material_list:
-            for material in self.material_list:
-                add_material(self._blender_object, material.blender_material())
-        else:
-            add_material(self._blender_object, self.material.blender_material())
+            return [material.blender_material() for material in self.material_list]
+        return [self.material.blender_material()]
 
-        if self.is_shadow_catcher:
-            self._blender_object.cycles.is_shadow_catcher = True
+    def _num_materials(self):
+        """Number of material slots that blender_object() will create."""
+        if self._labels_as_attribute():
+            return 1
+        if self.colormap is not None:
+            return len(self.colormap)
+        if self.material_list:
+            return len(self.material_list)
+        return 1
 
-        if self.thickness is not None:
-            self._blender_object.modifiers.new('Solidify', 'SOLIDIFY')
-            self._blender_object.modifiers["Solidify"].offset = 0
-            self._blender_object.modifiers["Solidify"].thickness = 5e-4
+    def _set_face_material_indices(self, face_index=None):
+        """Should be run at the end of object_data() if labeling is desired.
 
-        return self._blender_object
+        With label_mode='attribute' the label colors are written to the COLOR_ATTRIBUTE face attribute instead.
 
-    def _set_face_material_indices(self):
-        """Should be run at the end of object_data() if labeling is desired."""
-        if self.labels is not None:
+        Args:
+            face_index (np.ndarray): optional index of the label of every face, for simplified meshes.
+        """
+        if self._labels_as_attribute():
+            labels = np.asarray(self.labels) if face_index is None else np.asarray(self.labels)[face_index]
+            set_attribute(self._object_data, COLOR_ATTRIBUTE, 'FLOAT_COLOR', self._label_colors(labels), domain='FACE')
+        elif self.labels is not None:
             # Map each face to a material depending on their label
             # Note that materials are not loaded yet as object_data() is executed during the construction
             # blender_object(). Labels that are greater than the largest material index, will receive the
             # last material index.
-            for f in self._object_data.polygons:
-                f.material_index = self.labels[f.index]  # material slot index
+            labels = np.asarray(self.labels) if face_index is None else np.asarray(self.labels)[face_index]
+            material_indices = np.clip(labels, 0, self._num_materials() - 1).astype(np.int32)
+            self._object_data.polygons.foreach_set('material_index', material_indices)
 
 
 @dataclass
@@ -66,24 +128,80 @@ class Mesh(Geometry):
     mesh_path: str = None
     mesh: trimesh.Trimesh = None
     transformation: np.ndarray = field(default_factory=lambda: np.identity(4))
-
-    def load(self):
-        if self.mesh is None and self.mesh_path is not None:
-            self.mesh = trimesh.load(self.root_dir / self.mesh_path, process=False)
+    max_faces: Optional[int] = None
+    use_lod: bool = True
+    _instance_of = None
+    _lod = None
+
+    def load(self, cache=None):
+        """Load the mesh file, optionally through a blenderless.cache.GeometryCache."""
+        if self._instance_of is not None:
+            self._instance_of.load(cache)
+            self.mesh = self._instance_of.mesh
+        elif self.mesh is None and self.mesh_path is not None:
+            path = self.root_dir / self.mesh_path
+            handler = FileHandlerFactory.get_loader(path)
+            self.mesh = handler.load(path) if cache is None else cache.load_mesh(path, handler)
+
+    def instance_key(self):
+        """Meshes with the same key result in the same mesh data, None if the mesh has no source."""
+        if self.mesh is not None:
+            source = id(self.mesh)
+        elif self.mesh_path is not None:
+            source = str((self.root_dir / self.mesh_path).resolve())
+        else:
+            return None
+        labels = None if self.labels is None else np.asarray(self.labels).tobytes()
+        colors = np.asarray(self.colormap).tobytes() if self._labels_as_attribute() else None
+        return (source, np.asarray(self.transformation, dtype=float).tobytes(), labels, self._num_materials(), colors,
+                self.max_faces, self.use_lod)
 
     def object_data(self):
         if self._object_data is None:
+            if self._instance_of is not None:
+                self._object_data = self._instance_of.object_data()
+                return self._object_data
+
             self._object_data = bpy.data.meshes.new(name=self.name)
             self.load()
-            if np.array_equal(np.identity(4), self.transformation):
-                vertices = trimesh.transformations.transform_points(self.mesh.vertices, self.transformation)
-            else:
-                vertices = self.mesh.vertices
-            faces = self.mesh.faces
-            self._object_data.from_pydata(vertices.tolist(), [], faces.tolist())
-            self._set_face_material_indices()
+            vertices, faces, face_index = self.mesh.vertices, self.mesh.faces, None
+            if self._lod is not None:
+                vertices, faces, face_index = self._lod
+            if not np.array_equal(np.identity(4), self.transformation):
+                vertices = trimesh.transformations.transform_points(vertices, self.transformation)
+            set_mesh_data(self._object_data, vertices, faces)
+            self._set_face_material_indices(face_index)
         return self._object_data
 
+    def simplify(self, max_faces: int) -> int:
+        """Render a simplified version of the mesh with at most max_faces faces, see blenderless.lod.simplify.
+
+        Returns:
+            number of faces after simplification.
+        """
+        self.load()
+        self._lod = lod.simplify(self.mesh.vertices, self.mesh.faces, max_faces)
+        return len(self._lod[1])
+
+
+def link_mesh_instances(meshes: List[Mesh]) -> List[Mesh]:
+    """Let meshes with the same source and transformation share one mesh datablock.
+
+    Only the first mesh of every group loads and converts the geometry, the others become instances that link its mesh
+    data and use object linked materials. Returns the meshes that are not an instance.
+    """
+    unique_meshes = {}
+    for mesh in meshes:
+        key = mesh.instance_key()
+        if key is None:
+            unique_meshes[id(mesh)] = mesh
+            continue
+        unique_mesh = unique_meshes.setdefault(key, mesh)
+        if unique_mesh is not mesh:
+            mesh._instance_of = unique_mesh
+            mesh._shares_object_data = unique_mesh._shares_object_data = True
+    return list(unique_meshes.values())
+
 
 @dataclass
 class HorizontalPlane(Geometry):
@@ -116,10 +234,27 @@ class PointCloud(Geometry):
     there is no way of populating the points attribute as it is read-only. Other options are
     to use ther particle representation, however, for the application of this library, it is
     easier if the point cloud is converted into a mesh object.
+
+    With mode='points' the mesh only holds one vertex per point instead, and a geometry nodes modifier turns the
+    vertices into a point cloud that Cycles renders as spheres. Labels and colors are stored as 'label' and 'rgba'
+    point attributes. As blender point clouds only support a single material, points are colored by the 'rgba'
+    attribute, which is taken from the colors or by looking up the labels in the colormap.
+
+    Octahedrons are colored by the 'rgba' attribute as well when colors are given or with label_mode='attribute'.
     """
     points: np.ndarray = None
     point_size: float = 0.3
     transformation: np.ndarray = field(default_factory=lambda: np.identity(4))
+    mode: str = 'octahedron'
+    colors: np.ndarray = None
+
+    def blender_object(self):
+        super().blender_object()
+        if self.mode == 'points' and 'Points' not in self._blender_object.modifiers:
+            modifier = self._blender_object.modifiers.new('Points', 'NODES')
+            modifier.node_group = points_node_group(self.name, self.point_size / 2,
+                                                    self._blender_object.data.materials[0])
+        return self._blender_object
 
     def object_data(self):
         if self._object_data is None:
@@ -127,16 +262,44 @@ class PointCloud(Geometry):
 
             points = trimesh.transformations.transform_points(self.points, self.transformation)
 
-            # Convert to octahedrons and repeat corresponding labels 8 times.
-            verts, faces = self._convert_points_to_octahedrons(points, self.point_size)
-            if self.labels is not None:
-                self.labels = np.repeat(self.labels, 8, axis=0)
+            if self.mode == 'points':
+                set_mesh_data(self._object_data, points, np.empty((0, 3), dtype=np.int32))
+                if self.labels is not None:
+                    set_attribute(self._object_data, 'label', 'INT', self.labels)
+                colors = self._point_colors()
+                if colors is not None:
+                    set_attribute(self._object_data, COLOR_ATTRIBUTE, 'FLOAT_COLOR', colors)
+                return self._object_data
 
-            self._object_data.from_pydata(verts.tolist(), [], faces.tolist())
-            self._set_face_material_indices()
+            verts, faces = self._convert_points_to_octahedrons(points, self.point_size)
+            set_mesh_data(self._object_data, verts, faces)
+            colors = self._point_colors()
+            if colors is not None:  # The 6 vertices of each octahedron take the color of its point.
+                set_attribute(self._object_data, COLOR_ATTRIBUTE, 'FLOAT_COLOR', np.repeat(colors, 6, axis=0))
+            else:
+                # Repeat corresponding labels for the 8 faces of each octahedron.
+                if self.labels is not None:
+                    self.labels = np.repeat(self.labels, 8, axis=0)
+                self._set_face_material_indices()
 
         return self._object_data
 
+    def _point_colors(self):
+        """RGBA color per point, None if the points are colored by their materials."""
+        if self.colors is not None:
+            return rgba_colors(self.colors)
+        use_labels = self.mode == 'points' or self.label_mode == 'attribute'
+        if use_labels and self.labels is not None and self.colormap is not None:
+            return self._label_colors(self.labels)
+        return None
+
+    def _blender_materials(self):
+        if self._point_colors() is not None:
+            return [color_attribute_material().blender_material()]
+        if self.mode == 'points':
+            return [self.material.blender_material()]
+        return super()._blender_materials()
+
     @staticmethod
     def _convert_points_to_octahedrons(points, point_size=0.3):
         """Return vertices and faces for octahedrons centered around the given points."""
@@ -195,6 +358,86 @@ class BlenderLabel(Geometry):
         return self._blender_collection
 
 
+def set_mesh_data(mesh_data, vertices, faces):
+    """Fill an empty blender mesh with vertices and faces directly from NumPy arrays.
+
+    Equivalent to ``mesh_data.from_pydata(vertices.tolist(), [], faces.tolist())``, but the data is copied into
+    blender using bulk ``foreach_set`` calls on contiguous float32/int32 buffers, which avoids building Python lists.
+
+    Args:
+        mesh_data (bpy.types.Mesh): empty mesh datablock.
+        vertices (np.ndarray): vertex coordinates, Shape (?, 3)
+        faces (np.ndarray): vertex indices per face, all faces have the same number of corners, Shape (?, k)
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.ascontiguousarray(faces, dtype=np.int32)
+    num_faces, face_size = faces.shape if faces.ndim == 2 else (0, 3)
+
+    mesh_data.vertices.add(len(vertices))
+    mesh_data.loops.add(faces.size)
+    mesh_data.polygons.add(num_faces)
+
+    attributes = mesh_data.attributes
+    if '.corner_vert' in attributes:  # Blender >= 4.0, the generic attributes skip the per element RNA access.
+        attributes['position'].data.foreach_set('vector', vertices.ravel())
+        attributes['.corner_vert'].data.foreach_set('value', faces.ravel())
+        mesh_data.polygons.foreach_set('loop_start', np.arange(0, faces.size, face_size, dtype=np.int32))
+    else:
+        mesh_data.vertices.foreach_set('co', vertices.ravel())
+        mesh_data.loops.foreach_set('vertex_index', faces.ravel())
+        mesh_data.polygons.foreach_set('loop_start', np.arange(0, faces.size, face_size, dtype=np.int32))
+        mesh_data.polygons.foreach_set('loop_total', np.full(num_faces, face_size, dtype=np.int32))
+    mesh_data.polygons.foreach_set('use_smooth', np.zeros(num_faces, dtype=bool))
+
+    mesh_data.update(calc_edges=num_faces > 0)
+    return mesh_data
+
+
+def set_attribute(mesh_data, name, data_type, values, domain='POINT'):
+    """Add a generic attribute to a blender mesh and fill it in bulk from a NumPy array."""
+    attribute = mesh_data.attributes.new(name=name, type=data_type, domain=domain)
+    if data_type in ('FLOAT_COLOR', 'BYTE_COLOR'):
+        attribute.data.foreach_set('color', np.ascontiguousarray(values, dtype=np.float32).ravel())
+    else:
+        dtype = np.int32 if data_type == 'INT' else np.float32
+        attribute.data.foreach_set('value', np.ascontiguousarray(values, dtype=dtype).ravel())
+    return attribute
+
+
+def points_node_group(name, radius, material):
+    """Geometry nodes that convert the vertices of a mesh into a point cloud of spheres with the given material."""
+    node_group = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+    if hasattr(node_group, 'interface'):  # Blender >= 4.0
+        node_group.interface.new_socket('Geometry', in_out='INPUT', socket_type='NodeSocketGeometry')
+        node_group.interface.new_socket('Geometry', in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    else:
+        node_group.inputs.new('NodeSocketGeometry', 'Geometry')
+        node_group.outputs.new('NodeSocketGeometry', 'Geometry')
+
+    group_input = node_group.nodes.new('NodeGroupInput')
+    mesh_to_points = node_group.nodes.new('GeometryNodeMeshToPoints')
+    mesh_to_points.inputs['Radius'].default_value = radius
+    set_material = node_group.nodes.new('GeometryNodeSetMaterial')
+    set_material.inputs['Material'].default_value = material
+    group_output = node_group.nodes.new('NodeGroupOutput')
+
+    node_group.links.new(group_input.outputs[0], mesh_to_points.inputs['Mesh'])
+    node_group.links.new(mesh_to_points.outputs['Points'], set_material.inputs['Geometry'])
+    node_group.links.new(set_material.outputs['Geometry'], group_output.inputs[0])
+    return node_group
+
+
+def points_node_radius(blender_object) -> float:
+    """Radius of the spheres that points_node_group makes of the vertices of blender_object, 0 without it."""
+    modifier = blender_object.modifiers.get('Points')
+    if modifier is None or modifier.type != 'NODES' or modifier.node_group is None:
+        return 0.
+    for node in modifier.node_group.nodes:
+        if node.bl_idname == 'GeometryNodeMeshToPoints':
+            return node.inputs['Radius'].default_value
+    return 0.
+
+
 def duplicate_object(source_object):
     new_object = source_object.copy()
     new_object.data = source_object.data.copy()
@@ -1,10 +1,227 @@
 import abc
+import importlib.metadata
+import logging
+import mmap
+import threading
 from pathlib import Path
 
+import numpy as np
 import trimesh
 
+logger = logging.getLogger(__name__)
+
+STL_HEADER_SIZE = 84
+STL_TRIANGLE_DTYPE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+PLY_TYPES = {
+    'char': 'i1',
+    'int8': 'i1',
+    'uchar': 'u1',
+    'uint8': 'u1',
+    'short': 'i2',
+    'int16': 'i2',
+    'ushort': 'u2',
+    'uint16': 'u2',
+    'int': 'i4',
+    'int32': 'i4',
+    'uint': 'u4',
+    'uint32': 'u4',
+    'float': 'f4',
+    'float32': 'f4',
+    'double': 'f8',
+    'float64': 'f8',
+}
+PLY_BYTE_ORDERS = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+
+def weld_vertices(vertices: np.ndarray):
+    """Merge bitwise identical vertices.
+
+    Vertices are sorted on a 64 bit hash of their coordinates and neighbours are compared on all coordinates, so hash
+    collisions never merge different vertices. Identical vertices that are separated by a collision in the sorted
+    order stay separate, which leaves a duplicate vertex but does not change the geometry.
+
+    Args:
+        vertices (np.ndarray): float32 positions with -0 replaced by 0, Shape (?, 3)
+
+    Returns:
+        (unique vertices as float64, index of the unique vertex of every input vertex as int64)
+    """
+    keys = vertices.view(np.uint32)
+    hashes = keys[:, 0].astype(np.uint64)
+    hashes *= np.uint64(0x9E3779B97F4A7C15)
+    column = np.empty_like(hashes)
+    for axis, factor in ((1, 0xC2B2AE3D27D4EB4F), (2, 0x165667B19E3779F9)):
+        column[:] = keys[:, axis]
+        column *= np.uint64(factor)
+        hashes ^= column
+    del column
+
+    order = np.argsort(hashes)
+    is_first = np.empty(len(order), dtype=bool)
+    is_first[:1] = True
+    sorted_hashes = hashes[order]
+    np.not_equal(sorted_hashes[1:], sorted_hashes[:-1], out=is_first[1:])
+    del sorted_hashes
+    for axis in range(3):
+        sorted_keys = keys[order, axis]
+        is_first[1:] |= sorted_keys[1:] != sorted_keys[:-1]
+    del sorted_keys
+
+    # Number the unique vertices in order of their first occurrence, which keeps the locality of the input.
+    starts = np.flatnonzero(is_first)
+    first_occurrences = np.minimum.reduceat(order, starts)
+    ranks = np.empty(len(starts), dtype=np.int64)
+    ranks[np.argsort(first_occurrences)] = np.arange(len(starts))
+    ids = np.cumsum(is_first, out=hashes.view(np.int64))
+    ids -= 1
+    inverse = np.empty(len(order), dtype=np.int64)
+    inverse[order] = ids
+    del ids, hashes, order
+    np.take(ranks, inverse, out=inverse, mode='clip')  # In place, every element only reads its own index.
+    return vertices[np.sort(first_occurrences)].astype(np.float64), inverse
+
+
+def _release_pages(buffer: mmap.mmap, end: int):
+    """Drop the pages of a read only file mapping up to end from memory, they are reread from the file if needed."""
+    if hasattr(mmap, 'MADV_DONTNEED'):
+        buffer.madvise(mmap.MADV_DONTNEED, 0, end - end % mmap.PAGESIZE)
+
+
+def load_binary_stl(path, chunk_size=1 << 20):
+    """Memory map a binary STL file and return its welded (vertices, faces), or None if the file is not binary.
+
+    The triangles are copied in chunks of chunk_size triangles, releasing the pages of the file that were read.
+    """
+    path = Path(path)
+    file_size = path.stat().st_size
+    if file_size < STL_HEADER_SIZE:
+        return None
+    num_triangles = int(np.fromfile(path, dtype='<u4', count=1, offset=80)[0])
+    if file_size != STL_HEADER_SIZE + num_triangles * STL_TRIANGLE_DTYPE.itemsize:
+        return None  # ASCII STL.
+    if num_triangles == 0:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+
+    corners = np.empty((num_triangles, 3, 3), dtype=np.float32)
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        triangles = np.frombuffer(buffer, dtype=STL_TRIANGLE_DTYPE, count=num_triangles, offset=STL_HEADER_SIZE)
+        for start in range(0, num_triangles, chunk_size):
+            end = min(start + chunk_size, num_triangles)
+            # Adding 0 turns -0 into 0, so both are welded.
+            np.add(triangles['vertices'][start:end], np.float32(0), out=corners[start:end])
+            _release_pages(buffer, STL_HEADER_SIZE + end * STL_TRIANGLE_DTYPE.itemsize)
+        del triangles
+
+    return _weld_triangles(corners)
+
+
+def _weld_triangles(corners: np.ndarray):
+    """Return the welded (vertices, faces) of float32 triangle corners with -0 replaced by 0, Shape (?, 3, 3)."""
+    vertices, inverse = weld_vertices(corners.reshape(-1, 3))
+    return vertices, inverse.reshape(-1, 3)
+
+
+def load_stl(path):
+    """Return the welded (vertices, faces) of a binary or ASCII STL file.
+
+    ASCII files are parsed with trimesh and welded on float32 positions like binary files, so both encodings of a mesh
+    load into the same vertices and faces.
+    """
+    data = load_binary_stl(path)
+    if data is not None:
+        return data
+    mesh = trimesh.load(path, file_type='stl', process=False)
+    return _weld_triangles(np.asarray(mesh.vertices, dtype=np.float32)[mesh.faces] + np.float32(0))
+
+
+def _read_ply_header(file):
+    """Return (byte order, [(element name, count, [(property name, type or (count type, item type))])])."""
+    if file.readline().strip() != b'ply':
+        return None, []
+    byte_order, elements = None, []
+    for line in file:
+        words = line.decode('ascii', errors='replace').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'end_header':
+            break
+        if words[0] == 'format':
+            byte_order = PLY_BYTE_ORDERS.get(words[1])
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property' and elements:
+            if words[1] == 'list':
+                elements[-1][2].append((words[4], (words[2], words[3])))
+            else:
+                elements[-1][2].append((words[2], words[1]))
+    return byte_order, elements
+
+
+def _ply_dtype(properties, byte_order, list_size=None):
+    """Numpy dtype of the records of a PLY element, lists are read as fixed size list_size arrays."""
+    fields = []
+    for name, ply_type in properties:
+        if isinstance(ply_type, tuple):
+            count_type, item_type = ply_type
+            fields.append((f'{name}_count', byte_order + PLY_TYPES[count_type]))
+            fields.append((name, byte_order + PLY_TYPES[item_type], (list_size,)))
+        else:
+            fields.append((name, byte_order + PLY_TYPES[ply_type]))
+    return np.dtype(fields)
+
+
+def load_binary_ply(path):
+    """Memory map a binary triangle PLY file and return its (vertices, faces).
+
+    Returns None for files that are not supported, e.g. ASCII files, polygons with more than three corners or extra
+    elements between the vertices and faces.
+    """
+    with open(path, 'rb') as file:
+        byte_order, elements = _read_ply_header(file)
+        offset = file.tell()
+    names = [element[0] for element in elements]
+    if byte_order is None or names[:2] != ['vertex', 'face']:
+        return None
+    (_, num_vertices, vertex_properties), (_, num_faces, face_properties) = elements[:2]
+    vertex_names = [name for name, _ in vertex_properties]
+    list_properties = [name for name, ply_type in face_properties if isinstance(ply_type, tuple)]
+    if vertex_names[:3] != ['x', 'y', 'z'] or list_properties not in (['vertex_indices'], ['vertex_index']):
+        return None
+    try:
+        vertex_dtype = _ply_dtype(vertex_properties, byte_order)
+        face_dtype = _ply_dtype(face_properties, byte_order, list_size=3)
+    except KeyError:  # Unknown property type.
+        return None
+    if Path(path).stat().st_size < offset + num_vertices * vertex_dtype.itemsize + num_faces * face_dtype.itemsize:
+        return None
+    vertex_records = np.memmap(path, dtype=vertex_dtype, mode='r', offset=offset, shape=(num_vertices,))
+    face_records = np.memmap(path,
+                             dtype=face_dtype,
+                             mode='r',
+                             offset=offset + num_vertices * vertex_dtype.itemsize,
+                             shape=(num_faces,))
+    if np.any(face_records[f'{list_properties[0]}_count'] != 3):
+        return None  # Not a triangle mesh, faces are not fixed size records.
+
+    vertices = np.empty((num_vertices, 3))
+    for axis, name in enumerate('xyz'):
+        vertices[:, axis] = vertex_records[name]
+    faces = face_records[list_properties[0]].astype(np.int64)
+    return vertices, faces
+
 
 class FileHandler():
+    """Loads a mesh file into a trimesh.
+
+    thread_safe: load may run in several threads at once, otherwise the mesh loader uses worker processes.
+    releases_gil: the file is decoded outside the Python interpreter, e.g. in bulk numpy operations, so threads load
+        it faster than worker processes regardless of its size.
+    version: bump when the loaded geometry changes, which invalidates the entries of the handler in a GeometryCache.
+    """
+    thread_safe = True
+    releases_gil = False
+    version = 1
 
     @abc.abstractstaticmethod
     def load(path: Path) -> trimesh.Trimesh:
@@ -22,18 +239,101 @@ class TrimeshFileHandler(FileHandler):
 
     @staticmethod
     def load(path: Path) -> trimesh.Trimesh:
-        return trimesh.load(path)
+        return trimesh.load(path, process=False)
+
+
+class SceneFileHandler(FileHandler):
+    """Loads formats that hold a scene of meshes, e.g. glTF and 3MF, as a single mesh with all transforms applied."""
+
+    @staticmethod
+    def load(path: Path) -> trimesh.Trimesh:
+        return trimesh.load(path, force='mesh', process=False)
+
+
+class MemoryMappedFileHandler(TrimeshFileHandler):
+    """Memory maps binary files and converts them to vertex and face arrays in bulk, without building Python objects.
+
+    The peak memory stays close to the size of the vertex and face arrays, which the mesh wraps without copying.
+    Files that cannot be memory mapped, e.g. ASCII files, are loaded with trimesh.
+    """
+    releases_gil = True
+    read_arrays = None
+
+    @classmethod
+    def load(cls, path: Path) -> trimesh.Trimesh:
+        data = cls.read_arrays(path)
+        if data is None:
+            return super().load(path)
+        vertices, faces = data
+        return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+
+class StlFileHandler(MemoryMappedFileHandler):
+    version = 2
+    read_arrays = staticmethod(load_stl)
+
+
+class PlyFileHandler(MemoryMappedFileHandler):
+    read_arrays = staticmethod(load_binary_ply)
 
 
 class FileHandlerFactory():
+    """Registry of the file handler of every file suffix.
 
-    _loaders = {'.drc': DracoFileHandler}
+    Other packages add or replace handlers with an entry point in the ENTRY_POINT_GROUP group, named after the suffix
+    and pointing to a FileHandler subclass, e.g. `drc = fast_draco.blenderless:DracoFileHandler`.
+    """
+    ENTRY_POINT_GROUP = 'blenderless.file_handlers'
+
+    _loaders = {
+        '.drc': DracoFileHandler,
+        '.stl': StlFileHandler,
+        '.ply': PlyFileHandler,
+        '.glb': SceneFileHandler,
+        '.gltf': SceneFileHandler,
+        '.3mf': SceneFileHandler,
+    }
+    _entry_points_loaded = False
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _normalize_suffix(suffix: str) -> str:
+        return '.' + suffix.lstrip('.').lower()
+
+    @staticmethod
+    def _check_handler(suffix: str, handler: type):
+        if not (isinstance(handler, type) and issubclass(handler, FileHandler)):
+            raise TypeError(f'file handler of {suffix} must be a FileHandler subclass, got: {handler!r}')
+
+    @classmethod
+    def register(cls, suffix: str, handler: type):
+        """Load files with suffix, e.g. '.stl', with handler, replacing the handler of the suffix if there is one."""
+        cls._check_handler(suffix, handler)
+        cls._load_entry_points()
+        with cls._lock:
+            cls._loaders[cls._normalize_suffix(suffix)] = handler
+
+    @classmethod
+    def _load_entry_points(cls):
+        with cls._lock:
+            if cls._entry_points_loaded:
+                return
+            for entry_point in importlib.metadata.entry_points(group=cls.ENTRY_POINT_GROUP):
+                try:
+                    handler = entry_point.load()
+                    cls._check_handler(entry_point.name, handler)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.warning(f'Could not load file handler {entry_point.name} = {entry_point.value}: {exc}')
+                    continue
+                cls._loaders[cls._normalize_suffix(entry_point.name)] = handler
+            cls._entry_points_loaded = True
 
     @classmethod
     def get_loader(cls, path: Path):
         if isinstance(path, str):
             path = Path(path)
 
-        suffix = path.suffix
+        suffix = path.suffix.lower()
 
+        cls._load_entry_points()
         return cls._loaders.get(suffix, TrimeshFileHandler)
@@ -0,0 +1,183 @@
+import atexit
+import concurrent.futures
+import dataclasses
+import os
+import threading
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+import numpy as np
+import trimesh
+
+from blenderless.io import FileHandlerFactory
+
+PROCESS_POOL_MIN_BYTES = 32 << 20
+"""Load meshes in worker processes instead of threads once the mesh files are at least this large in total."""
+
+
+@dataclasses.dataclass
+class SharedMesh:
+    """Vertices and faces of a mesh loaded by a worker process, stored back to back in a shared memory block."""
+    name: str
+    vertices_shape: tuple
+    faces_shape: tuple
+
+    def views(self, buffer):
+        """Return (vertices, faces) arrays viewing the shared memory buffer."""
+        num_vertex_bytes = int(np.prod(self.vertices_shape)) * 8
+        num_face_bytes = int(np.prod(self.faces_shape)) * 8
+        vertices = buffer[:num_vertex_bytes].view(np.float64).reshape(self.vertices_shape)
+        faces = buffer[num_vertex_bytes:num_vertex_bytes + num_face_bytes].view(np.int64).reshape(self.faces_shape)
+        return vertices, faces
+
+
+def file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:  # Reported when loading the mesh.
+        return 0
+
+
+def preload_shared_mesh(mesh, cache=None):
+    """Load mesh in a worker process and return a SharedMesh instead of pickling the full trimesh."""
+    mesh.load(cache)
+    if not isinstance(mesh.mesh, trimesh.Trimesh):
+        return mesh.mesh
+
+    shared_mesh = SharedMesh(None, mesh.mesh.vertices.shape, mesh.mesh.faces.shape)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, (mesh.mesh.vertices.size + mesh.mesh.faces.size) * 8))
+    shared_mesh.name = shm.name
+    vertices, faces = shared_mesh.views(np.frombuffer(shm.buf, dtype=np.uint8))
+    vertices[:] = mesh.mesh.vertices
+    faces[:] = mesh.mesh.faces
+    del vertices, faces
+    shm.close()
+    return shared_mesh
+
+
+_unclosed_shared_memory = []
+
+
+def close_shared_memory(shm: shared_memory.SharedMemory):
+    try:
+        shm.close()
+    except BufferError:  # Arrays viewing the block are collected in the same garbage cycle, retry later.
+        _unclosed_shared_memory.append(shm)
+
+
+def attach_shared_mesh(shared_mesh: SharedMesh) -> trimesh.Trimesh:
+    """Wrap the shared memory block of a SharedMesh in a trimesh without copying it.
+
+    The block is unlinked right away, its memory is released once the arrays are no longer referenced.
+    """
+    unclosed_shared_memory = list(_unclosed_shared_memory)
+    _unclosed_shared_memory.clear()
+    for shm in unclosed_shared_memory:
+        close_shared_memory(shm)
+
+    shm = shared_memory.SharedMemory(name=shared_mesh.name)
+    shm.unlink()
+    buffer = np.frombuffer(shm.buf, dtype=np.uint8)
+    weakref.finalize(buffer, close_shared_memory, shm)
+    vertices, faces = shared_mesh.views(buffer)
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+
+class MeshLoader:
+    """Loads the meshes of a scene in parallel, using a process pool that is kept alive across renders.
+
+    Small files are loaded in a thread pool, as starting work in other processes costs more than parsing them.
+    """
+
+    def __init__(self):
+        self._process_pool = None
+        self._num_processes = 0
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def _get_process_pool(self, num_processes: int) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._process_pool is None or self._num_processes != num_processes:
+                if self._process_pool is not None:
+                    self._process_pool.shutdown()
+                # Share the resource tracker with the workers, so shared memory unlinked here is not reported as leaked.
+                resource_tracker.ensure_running()
+                self._process_pool = concurrent.futures.ProcessPoolExecutor(num_processes)
+                self._num_processes = num_processes
+            return self._process_pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
+
+    @staticmethod
+    def use_processes(meshes: list) -> bool:
+        """Whether meshes load faster in worker processes, as their files are large and decoded in Python."""
+        file_sizes = [
+            file_size(mesh.root_dir / mesh.mesh_path)
+            for mesh in meshes
+            if not FileHandlerFactory.get_loader(mesh.mesh_path).releases_gil
+        ]
+        return len(file_sizes) > 1 and sum(file_sizes) >= PROCESS_POOL_MIN_BYTES
+
+    def load(self, meshes: list, num_threads: int = 0, cache=None):
+        """Set the mesh attribute of all blenderless.geometry.Mesh objects that were not loaded yet.
+
+        Meshes of file handlers that are not thread safe are always loaded in worker processes when loading in
+        parallel, the other meshes are loaded in threads unless use_processes prefers worker processes.
+        With a blenderless.cache.GeometryCache, cached meshes are memory mapped right away and the others are stored in
+        the cache once loaded.
+        """
+        meshes = [mesh for mesh in meshes if mesh.mesh is None and mesh.mesh_path is not None]
+        if cache is not None:
+            # Memory mapping is cheaper than handing a mesh to another thread or process.
+            for mesh in meshes:
+                mesh.mesh = cache.get_mesh(mesh.root_dir / mesh.mesh_path)
+            meshes = [mesh for mesh in meshes if mesh.mesh is None]
+
+        if num_threads <= 1 or len(meshes) <= 1:
+            for mesh in meshes:
+                mesh.load(cache)
+            return
+
+        thread_safe = [FileHandlerFactory.get_loader(mesh.mesh_path).thread_safe for mesh in meshes]
+        process_meshes = [mesh for mesh, safe in zip(meshes, thread_safe) if not safe]
+        thread_meshes = [mesh for mesh, safe in zip(meshes, thread_safe) if safe]
+        if self.use_processes(thread_meshes):
+            process_meshes, thread_meshes = meshes, []
+
+        futures = []
+        if process_meshes:
+            process_pool = self._get_process_pool(num_threads)
+            futures = [process_pool.submit(preload_shared_mesh, mesh, cache) for mesh in process_meshes]
+        try:
+            if thread_meshes:
+                with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+                    list(executor.map(lambda mesh: mesh.load(cache), thread_meshes))
+        finally:
+            self._attach_results(process_meshes, futures)
+
+    def _attach_results(self, meshes: list, futures: list):
+        """Set the meshes loaded by worker processes, raising the first error after all shared memory is attached.
+
+        Attaching unlinks the shared memory blocks, so blocks of meshes that loaded are not leaked when another fails.
+        """
+        error = None
+        for mesh, future in zip(meshes, futures):
+            try:
+                result = future.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                error = error or exc
+                continue
+            mesh.mesh = attach_shared_mesh(result) if isinstance(result, SharedMesh) else result
+        if isinstance(error, concurrent.futures.process.BrokenProcessPool):
+            self.shutdown()
+        if error is not None:
+            raise error
+
+
+mesh_loader = MeshLoader()
+"""Loader shared by all scenes, so worker processes are reused between renders."""
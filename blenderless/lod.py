@@ -0,0 +1,212 @@
+import logging
+import time
+
+import numpy as np
+import trimesh
+
+logger = logging.getLogger(__name__)
+
+# Upper triangle of a symmetric 4x4 quadric, stored as 10 values.
+_QUADRIC_ROWS, _QUADRIC_COLS = np.triu_indices(4)
+# Weight of the boundary edge quadrics relative to the face quadrics.
+_BOUNDARY_WEIGHT = 10
+
+
+def _unique_rows(rows, max_value, **kwargs):
+    """np.unique over the rows of a non-negative integer array, packing rows into a single int64 when they fit."""
+    base = int(max_value) + 1
+    if base**rows.shape[1] >= 1 << 63:
+        return np.unique(rows, axis=0, **kwargs)
+    keys = np.zeros(len(rows), dtype=np.int64)
+    for column in rows.T:
+        keys = keys * base + column
+    return np.unique(keys, **kwargs)
+
+
+def _cluster_faces(vertices, faces, cell_size):
+    """Cluster vertices on a grid and return (cluster per vertex, number of clusters, simplified faces, face index)."""
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    _, clusters = _unique_rows(cells, cells.max(initial=0), return_inverse=True)
+    clusters = clusters.reshape(-1)
+    num_clusters = int(clusters.max()) + 1 if len(clusters) else 0
+
+    cluster_faces = clusters[faces]
+    face_index = np.flatnonzero((cluster_faces[:, 0] != cluster_faces[:, 1]) &
+                                (cluster_faces[:, 1] != cluster_faces[:, 2]) &
+                                (cluster_faces[:, 0] != cluster_faces[:, 2]))
+    # Keep one face per cluster triangle, faces of both orientations collapse into one.
+    _, unique_index = _unique_rows(np.sort(cluster_faces[face_index], axis=1), num_clusters, return_index=True)
+    face_index = face_index[np.sort(unique_index)]
+    return clusters, num_clusters, cluster_faces[face_index], face_index
+
+
+def _face_planes(vertices, faces):
+    """Return the planes of all faces as unit normal and offset, Shape (?, 4), and twice the face areas."""
+    origins = vertices[faces[:, 0]]
+    normals = np.cross(vertices[faces[:, 1]] - origins, vertices[faces[:, 2]] - origins)
+    double_areas = np.linalg.norm(normals, axis=1)
+    valid = double_areas > 0
+    normals[valid] /= double_areas[valid, None]
+    planes = np.concatenate((normals, -np.einsum('ij,ij->i', normals, origins)[:, None]), axis=1)
+    return planes, double_areas
+
+
+def _boundary_planes(vertices, faces, planes, double_areas):
+    """Return the boundary edges, Shape (?, 2), with planes through them perpendicular to their face and weights.
+
+    Boundary edges belong to a single face. Their planes keep clusters on open borders from moving inwards.
+    """
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    _, inverse, counts = _unique_rows(np.sort(edges, axis=1),
+                                      len(vertices) - 1,
+                                      return_inverse=True,
+                                      return_counts=True)
+    boundary = np.flatnonzero(counts[inverse.reshape(-1)] == 1)
+    edges = edges[boundary]
+    edge_faces = boundary // 3
+
+    origins = vertices[edges[:, 0]]
+    directions = vertices[edges[:, 1]] - origins
+    normals = np.cross(directions, planes[edge_faces, :3])
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    normals[valid] /= lengths[valid, None]
+    boundary_planes = np.concatenate((normals, -np.einsum('ij,ij->i', normals, origins)[:, None]), axis=1)
+    # The squared edge length has the scale of the face areas that weigh the face quadrics.
+    return edges, boundary_planes, _BOUNDARY_WEIGHT * lengths**2 * (double_areas[edge_faces] > 0)
+
+
+def _accumulate_quadrics(matrices, planes, weights, plane_clusters):
+    """Add the weighted quadric of every plane to each of its clusters, plane_clusters has Shape (len(planes), ?)."""
+    num_clusters = len(matrices)
+    for row, col in zip(_QUADRIC_ROWS, _QUADRIC_COLS):
+        quadric = planes[:, row] * planes[:, col] * weights
+        accumulated = sum(
+            np.bincount(plane_clusters[:, n], weights=quadric, minlength=num_clusters)
+            for n in range(plane_clusters.shape[1]))
+        matrices[:, row, col] += accumulated
+        if row != col:
+            matrices[:, col, row] += accumulated
+
+
+def _cluster_positions(vertices, faces, planes, double_areas, clusters, num_clusters):
+    """Place every cluster at the position that minimizes the quadric error of the planes of its faces and borders."""
+    # Area weighted plane quadrics, accumulated on the clusters of all three corners.
+    matrices = np.zeros((num_clusters, 4, 4))
+    _accumulate_quadrics(matrices, planes, double_areas, clusters[faces])
+    boundary_edges, boundary_planes, boundary_weights = _boundary_planes(vertices, faces, planes, double_areas)
+    _accumulate_quadrics(matrices, boundary_planes, boundary_weights, clusters[boundary_edges])
+
+    counts = np.bincount(clusters, minlength=num_clusters)
+    centroids = np.zeros((num_clusters, 3))
+    for axis in range(3):
+        centroids[:, axis] = np.bincount(clusters, weights=vertices[:, axis], minlength=num_clusters)
+    centroids /= np.maximum(counts, 1)[:, None]
+
+    # Regularize towards the centroid, which fixes the position along directions in which the quadric is flat.
+    a = matrices[:, :3, :3]
+    regularization = 1e-3 * np.trace(a, axis1=1, axis2=2) / 3 + 1e-12
+    a = a + regularization[:, None, None] * np.identity(3)
+    b = regularization[:, None] * centroids - matrices[:, :3, 3]
+    return np.linalg.solve(a, b[:, :, None])[:, :, 0]
+
+
+def simplify(vertices, faces, max_faces):
+    """Simplify a triangle mesh to at most max_faces faces with quadric based vertex clustering.
+
+    Vertices are clustered on a regular grid whose cell size follows from the surface area and the face budget. Every
+    cluster is collapsed into the position that minimizes the quadric error of the surrounding faces, which preserves
+    sharp features better than averaging. The cell size is increased until the budget is met.
+
+    Args:
+        vertices (np.ndarray): Shape (?, 3)
+        faces (np.ndarray): Shape (?, 3)
+        max_faces (int): face budget.
+
+    Returns:
+        (vertices, faces, face_index) of the simplified mesh, where face_index holds the index of the original face
+        every simplified face originates from, e.g. to look up labels.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    if len(faces) <= max_faces:
+        return vertices, faces, np.arange(len(faces))
+
+    planes, double_areas = _face_planes(vertices, faces)
+    cell_size = np.sqrt(double_areas.sum() / max(max_faces, 1))
+    if cell_size <= 0:  # Degenerate mesh, fall back to the bounding box.
+        cell_size = np.ptp(vertices, axis=0).max() / np.sqrt(max(max_faces, 1)) + 1e-12
+
+    # Terminates, as every step grows the cells by at least 5% until all vertices share a cluster and no face is left.
+    clusters, num_clusters, cluster_faces, face_index = _cluster_faces(vertices, faces, cell_size)
+    while len(cluster_faces) > max_faces:
+        cell_size *= 1.05 * np.sqrt(len(cluster_faces) / max(max_faces, 1))
+        clusters, num_clusters, cluster_faces, face_index = _cluster_faces(vertices, faces, cell_size)
+
+    positions = _cluster_positions(vertices, faces, planes, double_areas, clusters, num_clusters)
+
+    # Drop clusters that are not referenced by any face.
+    used, cluster_faces = np.unique(cluster_faces, return_inverse=True)
+    return positions[used], cluster_faces.reshape(-1, 3), face_index
+
+
+def screen_fractions(meshes) -> np.ndarray:
+    """Estimate the fraction of the image each mesh covers, assuming the cameras frame all meshes.
+
+    Args:
+        meshes (List[blenderless.geometry.Mesh]): loaded meshes.
+    """
+    corners = []
+    for mesh in meshes:
+        box = trimesh.bounds.corners(mesh.mesh.bounds)
+        placement = trimesh.transformations.quaternion_matrix(mesh.quaternion)
+        placement[:3, 3] = mesh.xyz
+        corners.append(trimesh.transformations.transform_points(box, placement @ mesh.transformation))
+    corners = np.asarray(corners).reshape(len(meshes), -1, 3)
+
+    sizes = np.linalg.norm(np.ptp(corners, axis=1), axis=1)
+    scene_size = np.linalg.norm(np.ptp(corners.reshape(-1, 3), axis=0))
+    if scene_size == 0:
+        return np.ones(len(meshes))
+    return np.clip((sizes / scene_size)**2, 0, 1)
+
+
+def face_budgets(meshes, resolution, faces_per_pixel=None) -> list:
+    """Face budget of every mesh, None if the mesh should not be simplified.
+
+    The budget is the smallest of the max_faces of the mesh and, if faces_per_pixel is set and the mesh has
+    use_lod enabled, faces_per_pixel times the number of pixels the mesh is estimated to cover.
+    """
+    budgets = [mesh.max_faces for mesh in meshes]
+    if faces_per_pixel is not None and meshes:
+        num_pixels = resolution[0] * resolution[1]
+        for n, (mesh, fraction) in enumerate(zip(meshes, screen_fractions(meshes))):
+            if mesh.use_lod:
+                pixel_budget = max(int(faces_per_pixel * num_pixels * fraction), 1)
+                budgets[n] = pixel_budget if budgets[n] is None else min(budgets[n], pixel_budget)
+    return budgets
+
+
+def simplify_meshes(meshes, resolution, faces_per_pixel=None):
+    """Simplify the loaded meshes that exceed their face budget, see face_budgets.
+
+    Instances, see blenderless.geometry.link_mesh_instances, share the simplified mesh of the mesh they link to, which
+    gets the largest budget of all its placements.
+    """
+    meshes = [mesh for mesh in meshes if isinstance(mesh.mesh, trimesh.Trimesh)]
+    unique_budgets = {}
+    for mesh, max_faces in zip(meshes, face_budgets(meshes, resolution, faces_per_pixel)):
+        unique_mesh = mesh if mesh._instance_of is None else mesh._instance_of
+        if id(unique_mesh) in unique_budgets:
+            budget = unique_budgets[id(unique_mesh)][1]
+            max_faces = None if budget is None or max_faces is None else max(budget, max_faces)
+        unique_budgets[id(unique_mesh)] = (unique_mesh, max_faces)
+
+    for mesh, max_faces in unique_budgets.values():
+        num_faces = len(mesh.mesh.faces)
+        if max_faces is None or num_faces <= max_faces:
+            continue
+        start = time.perf_counter()
+        num_simplified_faces = mesh.simplify(max_faces)
+        logger.info(f'simplified {mesh.name or mesh.mesh_path} from {num_faces} to {num_simplified_faces} faces '
+                    f'in {time.perf_counter() - start:.2f}s')
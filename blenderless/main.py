@@ -1,35 +1,118 @@
 import pathlib
 import tempfile
 import uuid
+from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
+
+from blenderless import poses
+from blenderless.cache import GeometryCache
+from blenderless.cache import RenderCache
+from blenderless.camera import cameras_from_poses
 from blenderless.camera import SphericalCoordinateCamera
 from blenderless.geometry import Mesh
+from blenderless.profiling import RenderProfile
+from blenderless.scene import RenderSession
 from blenderless.scene import Scene
 
 
+@dataclass
+class RenderOptions:
+    """Options of a Blenderless render that are not settings of the Scene."""
+    session: Optional[RenderSession] = None
+    """Keep blender alive between renders, see blenderless.scene.RenderSession."""
+    profile: Optional[RenderProfile] = None
+    """Record the time spent in every stage, see blenderless.profiling.RenderProfile."""
+    output: Optional[str] = None
+    """'array', 'png' or 'webp' to get the image in memory instead of a path, see Scene.render_to_memory."""
+    out: Optional[np.ndarray] = None
+    """Preallocated array to write the image into with output='array'."""
+    frames: int = 60
+    """Number of frames of Blenderless.gif, which make one full loop around the object."""
+    duration: float = 2
+    """Duration of the animation of Blenderless.gif in seconds."""
+
+
 class Blenderless():
     """Class to run render pipelines."""
 
     export_blend_path: Optional[str] = None
     """Path to export the generated .blend file to."""
     verbose: bool | None = None
+    cache: Optional[RenderCache] = None
+    """Optional render cache, see blenderless.cache.RenderCache."""
+    geometry_cache: Optional[GeometryCache] = None
+    """Optional cache of loaded mesh files, see blenderless.cache.GeometryCache."""
 
     @classmethod
-    def render(cls, mesh_path, dest_path=None, azimuth=45, elevation=30, theta=0, **kwargs):
-        """Render single frame as PNG."""
-        if dest_path is None:
-            dest_path = pathlib.PosixPath(tempfile.gettempdir()) / f'{uuid.uuid4().int}.png'
+    def render(cls,
+               mesh_path,
+               dest_path=None,
+               azimuth=45,
+               elevation=30,
+               theta=0,
+               options: Optional[RenderOptions] = None,
+               **kwargs):
+        """Render single frame as PNG.
 
+        Pass RenderOptions to render in a RenderSession, record a RenderProfile or get the image in memory instead of
+        a path, e.g. options=RenderOptions(output='array'). Other keyword arguments are passed to the Scene, e.g.
+        fast_preview=True for a quick Workbench render.
+        """
+        options = options or RenderOptions()
         kwargs['verbose'] = kwargs.get('verbose', cls.verbose)
+        kwargs['geometry_cache'] = kwargs.get('geometry_cache', cls.geometry_cache)
         scene = Scene(**kwargs)
         scene.add_object(Mesh(mesh_path=mesh_path))
         scene.add_object(SphericalCoordinateCamera(azimuth=azimuth, elevation=elevation, theta=theta))
-        render_paths = scene.render(dest_path, export_blend_path=cls.export_blend_path)
+
+        if options.output is not None:
+            images = scene.render_to_memory(options.output,
+                                            out=None if options.out is None else [options.out],
+                                            export_blend_path=cls.export_blend_path,
+                                            session=options.session,
+                                            cache=cls.cache,
+                                            profile=options.profile)
+            return images[0]
+
+        if dest_path is None:
+            dest_path = pathlib.PosixPath(tempfile.gettempdir()) / f'{uuid.uuid4().int}.png'
+
+        render_paths = scene.render(dest_path,
+                                    export_blend_path=cls.export_blend_path,
+                                    session=options.session,
+                                    cache=cls.cache,
+                                    profile=options.profile)
         return render_paths[0]
 
     @classmethod
-    def render_from_config(cls, config_path, dest_path=None):
+    def render_many(cls,
+                    mesh_paths,
+                    output_template,
+                    azimuth=45,
+                    elevation=30,
+                    theta=0,
+                    options: Optional[RenderOptions] = None,
+                    **kwargs):
+        """Render every mesh like render, building the scene once, see Scene.render_many.
+
+        Yields (mesh path, render path) as soon as each mesh is rendered, while the next mesh loads in the background.
+        The session and profile of options are used, renders are always written to files.
+        """
+        options = options or RenderOptions()
+        kwargs['verbose'] = kwargs.get('verbose', cls.verbose)
+        kwargs['geometry_cache'] = kwargs.get('geometry_cache', cls.geometry_cache)
+        scene = Scene(**kwargs)
+        scene.add_object(SphericalCoordinateCamera(azimuth=azimuth, elevation=elevation, theta=theta))
+        for mesh_path, render_paths in scene.render_many(mesh_paths,
+                                                         output_template,
+                                                         session=options.session,
+                                                         profile=options.profile):
+            yield mesh_path, render_paths[0]
+
+    @classmethod
+    def render_from_config(cls, config_path, dest_path=None, profile=None):
         """Render from config file."""
         if dest_path is None:
             dest_path = pathlib.PosixPath(tempfile.gettempdir()) / f'{uuid.uuid4().int}.png'
@@ -37,22 +120,32 @@ class Blenderless():
         scene = Scene.from_config(config_path)
         if scene.verbose is None:  # Verbose is not present in scene's yaml config.
             scene.verbose = cls.verbose
-        render_paths = scene.render(dest_path, export_blend_path=cls.export_blend_path)
+        render_paths = scene.render(dest_path,
+                                    export_blend_path=cls.export_blend_path,
+                                    cache=cls.cache,
+                                    profile=profile)
         return render_paths[0]
 
     @classmethod
-    def gif(cls, mesh_path, dest_path=None, elevation=30, theta=0, frames=60, duration=2, **kwargs):
+    def gif(cls, mesh_path, dest_path=None, elevation=30, theta=0, options: Optional[RenderOptions] = None, **kwargs):
         """Render a sequence of frames and export as GIF.
 
         The renderer will make one full loop around the object. The azimuth angles are thus
-        dependent on the number of frames.
+        dependent on the number of frames. The frames, duration, session and profile of options are used.
         """
+        options = options or RenderOptions()
         if dest_path is None:
             dest_path = pathlib.PosixPath(tempfile.gettempdir()) / f'{uuid.uuid4().int}.gif'
 
         kwargs['verbose'] = kwargs.get('verbose', cls.verbose)
+        kwargs['geometry_cache'] = kwargs.get('geometry_cache', cls.geometry_cache)
         scene = Scene(**kwargs)
         scene.add_object(Mesh(mesh_path=mesh_path))
-        for angle in range(0, 360, int(360 / frames)):
-            scene.add_object(SphericalCoordinateCamera(azimuth=angle, elevation=elevation, theta=theta))
-        return scene.render_gif(dest_path, duration=duration / frames, export_blend_path=cls.export_blend_path)
+        for camera in cameras_from_poses(*poses.turntable(options.frames, elevation=elevation, theta=theta)):
+            scene.add_object(camera)
+        return scene.render_gif(dest_path,
+                                duration=options.duration,
+                                export_blend_path=cls.export_blend_path,
+                                session=options.session,
+                                cache=cls.cache,
+                                profile=options.profile)
@@ -1,3 +1,4 @@
+import collections
 import pathlib
 from dataclasses import dataclass
 from typing import List
@@ -7,6 +8,8 @@ import bpy
 import numpy as np
 
 DEFAULT_MATERIAL_PATH = pathlib.Path(__file__).parent / 'data/materials.blend'
+MAX_REGISTRY_MATERIALS = 1024
+"""Default number of materials that MaterialRegistry keeps."""
 
 
 def load_default_materials():
@@ -40,39 +43,110 @@ def srgba_to_linearrgba(srgba):
     return [convert_to_linear_colorspace(c) for c in srgba[:3]] + [srgba[3]]
 
 
+def rgba_colors(colors) -> np.ndarray:
+    """Float32 RGBA colors in the range 0-1, with an alpha of 1 added to RGB colors.
+
+    Colors in the range 0-255 are recognized by a maximum above 1 and divided by 255.
+    """
+    colors = np.asarray(colors, dtype=np.float32)
+    if colors.max(initial=0) > 1:
+        colors = colors / 255
+    if colors.shape[1] == 3:
+        colors = np.concatenate((colors, np.ones((len(colors), 1), dtype=np.float32)), axis=1)
+    return np.clip(colors, 0, 1)
+
+
+def _rgba_key(rgba):
+    return None if rgba is None else tuple(float(c) for c in rgba)
+
+
+class MaterialRegistry:
+    """Shares one blender material between all materials with the same key, within and across renders.
+
+    A scene with many objects and the same colormap would otherwise create a datablock per color per object. Materials
+    that were removed from blender, e.g. by a factory reset, are created again on their next use.
+
+    Only the max_size most recently used materials are kept. Evicted materials are left in blender, where a
+    RenderSession removes them at the end of the job like any other datablock of the job.
+    """
+
+    def __init__(self, max_size=MAX_REGISTRY_MATERIALS):
+        self.max_size = max_size
+        self._blender_materials = collections.OrderedDict()
+
+    def get(self, key, create):
+        """Return the blender material of key, calling create() to make it if there is none."""
+        blender_material = self._blender_materials.get(key)
+        if blender_material is not None:
+            try:
+                blender_material.name  # pylint: disable=pointless-statement
+                self._blender_materials.move_to_end(key)
+                return blender_material
+            except ReferenceError:  # Removed from blender.
+                pass
+        blender_material = create()
+        self._blender_materials[key] = blender_material
+        self._blender_materials.move_to_end(key)
+        while len(self._blender_materials) > self.max_size:
+            self._blender_materials.popitem(last=False)
+        return blender_material
+
+    def blender_materials(self) -> list:
+        """Return the blender materials of the registry that still exist."""
+        blender_materials = []
+        for key, blender_material in list(self._blender_materials.items()):
+            try:
+                blender_material.name  # pylint: disable=pointless-statement
+                blender_materials.append(blender_material)
+            except ReferenceError:
+                del self._blender_materials[key]
+        return blender_materials
+
+    def clear(self):
+        self._blender_materials.clear()
+
+
+material_registry = MaterialRegistry()
+"""Registry shared by all materials in the process."""
+
+
 @dataclass
 class Material:
     """Material base class."""
     material_name: str = ''
     _blender_material = None
 
+    def registry_key(self):
+        """Materials with equal keys share their blender material, see MaterialRegistry."""
+        return type(self), self.material_name
+
 
 @dataclass
 class MaterialRGBA(Material):
     """Create diffuse single color material."""
     rgba: List[float] = (0.8, 0.8, 0.8, 1)  # default color white
 
+    def registry_key(self):
+        return type(self), _rgba_key(self.rgba), self.material_name
+
     def blender_material(self):
-        if self._blender_material is None:
-            self._blender_material = bpy.data.materials.new(name=self.material_name)
-            self._blender_material.diffuse_color = self.rgba
+        self._blender_material = material_registry.get(self.registry_key(), self._new_blender_material)
         return self._blender_material
 
+    def _new_blender_material(self):
+        blender_material = bpy.data.materials.new(name=self.material_name)
+        blender_material.diffuse_color = self.rgba
+        return blender_material
+
     @staticmethod
     def material_list_from_colormap(colormap: np.ndarray) -> List[Material]:
         """Create list of materials based on colormap.
 
         Args:
-            colormap (np.ndarray): row-wise colors, Shape (?, 3) or (?, 4)
+            colormap (np.ndarray): row-wise colors in the range 0-1 or 0-255, see rgba_colors. Shape (?, 3) or (?, 4)
         """
-        n, d = colormap.shape
-        if d == 3:
-            colormap = np.concatenate((colormap, np.ones((n, 1))), axis=1)
-
-        materials = [None] * n
-        for i in range(n):
-            materials[i] = MaterialRGBA(rgba=tuple(colormap[i, :]), material_name=f'label{i}')
-        return materials
+        colormap = rgba_colors(colormap)
+        return [MaterialRGBA(rgba=tuple(rgba), material_name=f'label{i}') for i, rgba in enumerate(colormap)]
 
 
 @dataclass
@@ -84,21 +158,78 @@ class MaterialFromName(Material):
     rgba: Optional[List[float]] = None
     _blender_material = None
 
+    def registry_key(self):
+        return type(self), _rgba_key(self.rgba), self.material_name
+
     def blender_material(self):
-        if self._blender_material is None:
+        if self.rgba is None:
             self._blender_material = bpy.data.materials[self.material_name]
-            if self.rgba is not None:
-                self._blender_material = self._blender_material.copy()
-                for node in self._blender_material.node_tree.nodes:
-                    if 'ColorRamp' in node.name:
-                        num_elements = len(node.color_ramp.elements)
-                        for n in range(num_elements):
-                            node.color_ramp.elements[n].color = srgba_to_linearrgba(self.rgba)
-                        node.color_ramp.elements[n].color = (0, 0, 0, 1)
+        else:
+            self._blender_material = material_registry.get(self.registry_key(), self._new_blender_material)
+        return self._blender_material
+
+    def _new_blender_material(self):
+        """Copy of the named material with the colors of its color ramps replaced by rgba."""
+        blender_material = bpy.data.materials[self.material_name].copy()
+        blender_material.diffuse_color = srgba_to_linearrgba(self.rgba)  # Used by Workbench.
+        for node in blender_material.node_tree.nodes:
+            if 'ColorRamp' in node.name:
+                num_elements = len(node.color_ramp.elements)
+                for n in range(num_elements):
+                    node.color_ramp.elements[n].color = srgba_to_linearrgba(self.rgba)
+                node.color_ramp.elements[n].color = (0, 0, 0, 1)
+        return blender_material
+
+
+@dataclass
+class MaterialFromAttribute(Material):
+    """Diffuse material which takes its color from a color attribute of the geometry.
+
+    Used to color many points or faces with a single material, see PointCloud.
+    """
+    attribute_name: str = 'rgba'
+
+    def registry_key(self):
+        return type(self), self.attribute_name, self.material_name
+
+    def blender_material(self):
+        self._blender_material = material_registry.get(self.registry_key(), self._new_blender_material)
         return self._blender_material
 
+    def _new_blender_material(self):
+        blender_material = bpy.data.materials.new(name=self.material_name)
+        blender_material.use_nodes = True
+        nodes = blender_material.node_tree.nodes
+        nodes.clear()
+        attribute = nodes.new('ShaderNodeAttribute')
+        attribute.attribute_name = self.attribute_name
+        bsdf = nodes.new('ShaderNodeBsdfDiffuse')
+        output = nodes.new('ShaderNodeOutputMaterial')
+        links = blender_material.node_tree.links
+        links.new(attribute.outputs['Color'], bsdf.inputs['Color'])
+        links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
+        return blender_material
+
 
 def add_material(blender_object, blender_material):
     """Add material to blender object."""
-    blender_object.data.materials.clear()
-    blender_object.data.materials.append(blender_material)
+    add_materials(blender_object, [blender_material])
+
+
+def add_materials(blender_object, blender_materials, link='DATA'):
+    """Replace the materials of a blender object, one material slot per material.
+
+    With link='OBJECT' the materials are linked to the object instead of its data, so objects sharing the same data can
+    have different materials. The data keeps its slots if their number already matches.
+    """
+    data_materials = blender_object.data.materials
+    if link == 'DATA' or len(data_materials) != len(blender_materials):
+        if len(data_materials) > 0:  # Clearing also resets the face material indices.
+            data_materials.clear()
+        for blender_material in blender_materials:
+            data_materials.append(blender_material)
+
+    if link == 'OBJECT':
+        for slot, blender_material in zip(blender_object.material_slots, blender_materials):
+            slot.link = 'OBJECT'
+            slot.material = blender_material
@@ -0,0 +1,91 @@
+import numpy as np
+
+GOLDEN_ANGLE = 180 * (3 - np.sqrt(5))
+"""Azimuth increment in degrees between consecutive views of fibonacci_sphere."""
+
+
+def spherical_to_cartesian(distance, azimuth, elevation) -> np.ndarray:
+    """Vectorized utils.spherical_to_cartesian, angles in degrees, returns Shape (N, 3)."""
+    phi = np.radians(elevation)
+    theta = np.radians(azimuth)
+    return np.stack(
+        (distance * np.cos(theta) * np.cos(phi), distance * np.sin(theta) * np.cos(phi), distance * np.sin(phi)),
+        axis=-1)
+
+
+def quaternion_products(qx: np.ndarray, qy: np.ndarray) -> np.ndarray:
+    """Vectorized utils.quaternionProduct of Shape (N, 4) quaternions."""
+    a, b, c, d = qx.T
+    e, f, g, h = qy.T
+    return np.stack((a * e - b * f - c * g - d * h, a * f + b * e + c * h - d * g, a * g - b * h + c * e + d * f,
+                     a * h + b * g - c * f + d * e),
+                    axis=-1)
+
+
+def look_at_quaternions(positions: np.ndarray, theta=0) -> np.ndarray:
+    """Rotations of cameras at positions that look at the origin, rolled by theta degrees around the view axis.
+
+    Vectorized equivalent of utils.camPosToQuaternion and utils.camRotQuaternion as used by SphericalCoordinateCamera.
+    Cameras straight above or below the origin face the y axis.
+
+    Args:
+        positions (np.ndarray): Shape (N, 3)
+        theta: roll in degrees, a scalar or Shape (N,)
+
+    Returns:
+        quaternions (w, x, y, z), Shape (N, 4)
+    """
+    directions = positions / np.linalg.norm(positions, axis=1, keepdims=True)
+    cx, cy, cz = directions.T
+    t = np.hypot(cx, cy)
+    on_axis = t == 0
+    t[on_axis] = 1
+    tx = np.where(on_axis, 0, cx / t)
+    ty = np.where(on_axis, 1, cy / t)
+    yaw = np.arccos(ty)
+    yaw = np.where(tx > 0, 2 * np.pi - yaw, yaw)
+    roll = np.arccos(np.clip(tx * cx + ty * cy, -1, 1))
+    roll = np.where(cz < 0, -roll, roll)
+
+    # utils.quaternionFromYawPitchRoll with a pitch of 0, applied after pointing the camera along the y axis.
+    c1, s1 = np.cos(yaw / 2), np.sin(yaw / 2)
+    c3, s3 = np.cos(roll / 2), np.sin(roll / 2)
+    yaw_roll = np.stack((c1 * c3, c1 * s3, s1 * s3, s1 * c3), axis=-1)
+    align = np.array([[0, 0, np.sqrt(2) / 2, np.sqrt(2) / 2]])
+    look_at = quaternion_products(yaw_roll, align)
+
+    half_theta = np.radians(np.broadcast_to(theta, len(positions))) / 2
+    rotation = np.concatenate((np.cos(half_theta)[:, None], directions * np.sin(half_theta)[:, None]), axis=1)
+    return quaternion_products(rotation, look_at)
+
+
+def spherical_poses(azimuth, elevation, distance=1, theta=0):
+    """Poses of cameras at spherical coordinates looking at the origin, like SphericalCoordinateCamera.
+
+    All arguments are scalars or Shape (N,) arrays in degrees, which are broadcast against each other.
+
+    Returns:
+        (positions Shape (N, 3), quaternions Shape (N, 4)), see camera.cameras_from_poses.
+    """
+    azimuth, elevation, distance, theta = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (azimuth, elevation, distance, theta)))
+    positions = spherical_to_cartesian(distance, azimuth, elevation)
+    return positions, look_at_quaternions(positions, theta)
+
+
+def turntable(num_frames: int, elevation=30, distance=1, theta=0):
+    """Poses of num_frames cameras evenly spaced on one full loop around the z axis, starting at azimuth 0."""
+    return spherical_poses(np.arange(num_frames) * 360 / num_frames, elevation, distance, theta)
+
+
+def fibonacci_sphere(num_views: int, distance=1, theta=0):
+    """Poses of num_views cameras spread about uniformly over the sphere, on a Fibonacci spiral from top to bottom."""
+    offsets = np.arange(num_views) + 0.5
+    elevation = np.degrees(np.arcsin(1 - 2 * offsets / num_views))
+    return spherical_poses((offsets * GOLDEN_ANGLE) % 360, elevation, distance, theta)
+
+
+def grid(azimuths, elevations, distance=1, theta=0):
+    """Poses of cameras at every combination of azimuths and elevations, all azimuths of the first elevation first."""
+    azimuth, elevation = np.meshgrid(np.asarray(azimuths, dtype=float), np.asarray(elevations, dtype=float))
+    return spherical_poses(azimuth.ravel(), elevation.ravel(), distance, theta)
@@ -0,0 +1,141 @@
+import contextlib
+import json
+import os
+import resource
+import sys
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Optional
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB, the high-water mark since the process started."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (1 << 20) if sys.platform == 'darwin' else peak_rss / (1 << 10)
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB, None if /proc is not available."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+@dataclass
+class Stage:
+    """A timed part of a render."""
+    name: str
+    start: float
+    """Seconds since the start of the profile."""
+    seconds: float
+    rss_start_mb: Optional[float]
+    """Resident set size when the stage started, None if it cannot be measured on this platform."""
+    rss_end_mb: Optional[float]
+    """Resident set size when the stage ended, None if it cannot be measured on this platform."""
+    peak_rss_mb: float
+    """Peak resident set size of the process so far, not of this stage, when the stage ended."""
+    args: dict = field(default_factory=dict)
+
+
+class RenderProfile:
+    """Records the wall time and memory of every stage of a render.
+
+    Example:
+        profile = RenderProfile()
+        scene.render('out.png', profile=profile)
+        profile.report()  # {'stages': [{'name': 'factory_reset', 'seconds': 0.1, ...}, ...], 'totals': {...}, ...}
+        profile.save_chrome_trace('trace.json')  # Open in chrome://tracing or https://ui.perfetto.dev
+    """
+
+    def __init__(self, name: str = 'render'):
+        self.name = name
+        self.stages = []
+        self.info = {}
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **args):
+        """Time the code in this context as a stage, args are stored with the stage."""
+        rss_start = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages.append(
+                Stage(name, start - self._start, seconds, _round(rss_start), _round(rss_mb()), _round(peak_rss_mb()),
+                      args))
+
+    def report(self) -> dict:
+        """JSON serializable summary with all stages, the total time per stage name and the recorded info."""
+        totals = {}
+        for stage in self.stages:
+            totals[stage.name] = totals.get(stage.name, 0) + stage.seconds
+        return {
+            'name': self.name,
+            'pid': os.getpid(),
+            'start_time': self.start_time,
+            'seconds': max((stage.start + stage.seconds for stage in self.stages), default=0),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'info': self.info,
+            'totals': totals,
+            'stages': [asdict(stage) for stage in sorted(self.stages, key=lambda stage: stage.start)],
+        }
+
+    def save_chrome_trace(self, filepath):
+        save_chrome_trace(filepath, [self.report()])
+
+
+def chrome_trace(reports: list) -> dict:
+    """Convert RenderProfile reports, e.g. of multiple processes, into a single Chrome trace.
+
+    The reports and the total time per stage name over all reports are stored under otherData.
+    """
+    totals = {}
+    for report in reports:
+        for name, seconds in report['totals'].items():
+            totals[name] = totals.get(name, 0) + seconds
+    start_time = min((report['start_time'] for report in reports), default=0)
+    events = []
+    for report in reports:
+        offset = (report['start_time'] - start_time) * 1e6
+        events.append({
+            'name': report['name'],
+            'ph': 'X',
+            'ts': offset,
+            'dur': report['seconds'] * 1e6,
+            'pid': report['pid'],
+            'tid': 0,
+            'args': report['info'],
+        })
+        for stage in report['stages']:
+            memory = {
+                'rss_start_mb': stage['rss_start_mb'],
+                'rss_end_mb': stage['rss_end_mb'],
+                'process_peak_rss_mb': stage['peak_rss_mb'],
+            }
+            events.append({
+                'name': stage['name'],
+                'ph': 'X',
+                'ts': offset + stage['start'] * 1e6,
+                'dur': stage['seconds'] * 1e6,
+                'pid': report['pid'],
+                'tid': 0,
+                'args': dict(stage['args'], **memory),
+            })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'totals': totals, 'reports': reports}}
+
+
+def save_chrome_trace(filepath, reports: list):
+    with open(filepath, 'w', encoding='utf-8') as file:
+        json.dump(chrome_trace(reports), file, indent=1, default=str)
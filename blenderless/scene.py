@@ -1,25 +1,123 @@
 import concurrent.futures
+import contextlib
+import io
+import itertools
 import logging
-import multiprocessing
 import pathlib
+import shutil
 import tempfile
 
 import bpy
 import hydra
 import imageio.v2 as imageio
+import numpy as np
+import trimesh
 from omegaconf import OmegaConf
+from PIL import Image
 
+from blenderless import lod
 from blenderless import utils
 from blenderless.blender_object import BlenderObject
 from blenderless.camera import BlenderCamera
 from blenderless.geometry import HorizontalPlane
+from blenderless.geometry import link_mesh_instances
 from blenderless.geometry import Mesh
+from blenderless.geometry import points_node_radius
+from blenderless.loader import mesh_loader
 from blenderless.material import load_materials
-
-
-def preload_mesh(mesh):
-    mesh.load()
-    return mesh.mesh
+from blenderless.material import material_registry
+
+# Image settings of the intermediate files for in-memory outputs. Arrays skip compression since they are decoded again.
+# WebP is encoded with Pillow from the array, because blender 3.3 cannot write WebP images.
+MEMORY_OUTPUTS = {
+    'array': {
+        'file_format': 'PNG',
+        'color_depth': '8',
+        'compression': 0
+    },
+    'png': {
+        'file_format': 'PNG',
+        'color_depth': '8'
+    },
+    'webp': {
+        'file_format': 'PNG',
+        'color_depth': '8',
+        'compression': 0
+    },
+}
+
+# Cycles settings of the quality presets, from fast previews to production renders. All presets denoise on the CPU
+# with OpenImageDenoise, which lets adaptive sampling stop early on flat shaded surfaces. Settings that the running
+# Blender version does not have are skipped.
+QUALITY_PRESETS = {
+    'draft': {
+        'samples': 16,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.1,
+        'max_bounces': 2,
+        'diffuse_bounces': 1,
+        'glossy_bounces': 1,
+        'transmission_bounces': 2,
+        'volume_bounces': 0,
+        'transparent_max_bounces': 4,
+        'caustics_reflective': False,
+        'caustics_refractive': False,
+        'use_denoising': True,
+        'denoiser': 'OPENIMAGEDENOISE',
+        'denoising_use_gpu': False,
+        'denoising_prefilter': 'FAST',
+        'denoising_quality': 'FAST',
+        'tile_size': 2048,
+    },
+    'thumbnail': {
+        'samples': 64,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.05,
+        'max_bounces': 4,
+        'diffuse_bounces': 2,
+        'glossy_bounces': 2,
+        'transmission_bounces': 4,
+        'volume_bounces': 0,
+        'transparent_max_bounces': 8,
+        'caustics_reflective': False,
+        'caustics_refractive': False,
+        'use_denoising': True,
+        'denoiser': 'OPENIMAGEDENOISE',
+        'denoising_use_gpu': False,
+        'denoising_prefilter': 'ACCURATE',
+        'denoising_quality': 'BALANCED',
+        'tile_size': 2048,
+    },
+    'final': {
+        'samples': 512,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.01,
+        'max_bounces': 12,
+        'diffuse_bounces': 4,
+        'glossy_bounces': 4,
+        'transmission_bounces': 12,
+        'volume_bounces': 0,
+        'transparent_max_bounces': 8,
+        'caustics_reflective': True,
+        'caustics_refractive': True,
+        'use_denoising': True,
+        'denoiser': 'OPENIMAGEDENOISE',
+        'denoising_use_gpu': False,
+        'denoising_prefilter': 'ACCURATE',
+        'denoising_quality': 'HIGH',
+        'tile_size': 2048,
+    },
+}
+
+# Workbench shading of fast previews: studio lighting with the viewport display color of the materials.
+WORKBENCH_SHADING = {
+    'light': 'STUDIO',
+    'color_type': 'MATERIAL',
+    'show_shadows': False,
+    'show_cavity': False,
+    'show_object_outline': False,
+    'show_specular_highlight': True,
+}
 
 
 class Scene:
@@ -35,7 +133,33 @@ class Scene:
                  resolution=(512, 512),
                  shadow_plane=False,
                  num_threads=0,
-                 verbose: bool | None = None):
+                 verbose: bool | None = None,
+                 lod_faces_per_pixel: float | None = None,
+                 multiview: bool = False,
+                 quality: str | None = None,
+                 fast_preview: bool = False,
+                 geometry_cache=None):
+        """Scene to render.
+
+        Args:
+            num_samples: number of render samples, overrides the samples of the quality preset.
+            lod_faces_per_pixel: if set, simplify meshes to this many faces per pixel they are estimated to cover,
+                see blenderless.lod. Meshes can opt out with use_lod=False, or set their own max_faces.
+            multiview: render all cameras in a single animation render, in which the render engine syncs the
+                objects once instead of for every camera. Off by default, which renders every camera separately.
+            quality: Cycles quality preset, one of QUALITY_PRESETS ('draft', 'thumbnail' or 'final'), which sets the
+                samples, adaptive sampling, light bounces, denoising and tile size together. The settings of the
+                preset scene are kept if omitted.
+            fast_preview: render with the Workbench engine instead of path tracing, for bulk previews. Objects are
+                shaded with studio lighting in the viewport display color of their materials, which MaterialRGBA and
+                MaterialFromName with rgba set, so labels and colormaps keep their colors. Lights of the scene and
+                shader nodes, e.g. MaterialFromAttribute, are not used. Workbench has no shadow catchers, so no shadow
+                plane is added.
+            geometry_cache: optional blenderless.cache.GeometryCache, which memory maps the vertices and faces of
+                mesh files that were loaded before instead of parsing them again.
+        """
+        if quality is not None and quality not in QUALITY_PRESETS:
+            raise ValueError(f'quality must be one of {list(QUALITY_PRESETS)}, not {quality}')
 
         self._objects = []
         self._root_dir = root_dir
@@ -43,14 +167,20 @@ class Scene:
             self._root_dir = pathlib.Path()
         self._preset_path = preset_path
         self._preset_scene = preset_scene
-        self._render_engine = render_engine
+        self._render_engine = 'BLENDER_WORKBENCH' if fast_preview else render_engine
         self._num_samples = num_samples
         self._transparant = transparant
         self._color_mode = color_mode
-        self._shadow_plane = shadow_plane
+        # Workbench renders a shadow catcher as an opaque plane, which would cover the transparent background.
+        self._shadow_plane = shadow_plane and self._render_engine != 'BLENDER_WORKBENCH'
         self._resolution = resolution
         self._num_threads = num_threads
         self._verbose = verbose
+        self._lod_faces_per_pixel = lod_faces_per_pixel
+        self._multiview = multiview
+        self._quality = quality
+        self._geometry_cache = geometry_cache
+        self._profile = None
 
     @classmethod
     def from_config(cls, config_path, root_dir=None):
@@ -71,12 +201,33 @@ class Scene:
 
         return scene
 
-    def render_gif(self, filepath, duration=2, **kwargs):
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            render_path = pathlib.Path(tmpdirname) / 'out.png'
-            render_filepaths = self.render(render_path, **kwargs)
-            images = [imageio.imread(filename) for filename in render_filepaths]
-        imageio.mimsave(filepath, images, format='GIF', duration=duration / len(images))
+    def render_gif(self, filepath, duration=2, cache=None, export_blend_path=None, session=None, profile=None):
+        """Render the scene for all cameras and encode the frames into an animation.
+
+        Frames are read back one at a time from an uncompressed intermediate file and streamed into the encoder.
+
+        Args:
+            filepath: output path, the animation format is derived from its suffix, e.g. .gif, .png, .webp or .mp4.
+            duration (float): total duration of the animation in seconds.
+            profile (RenderProfile): see render.
+        """
+        self._profile = profile
+        use_cache = cache is not None and export_blend_path is None
+        if use_cache:
+            key = self._cache_key(cache, 'gif', duration, pathlib.Path(filepath).suffix.lower())
+            with self._stage('cache_load'):
+                cached_filepath = cache.read(key, lambda cached_files: shutil.copyfile(cached_files[0], filepath))
+            if cached_filepath is not None:
+                return filepath
+
+        with self._prepared_scene(export_blend_path, session) as (blender_scene, cameras), \
+                tempfile.TemporaryDirectory() as tmpdirname:
+            frames = self._render_frames(pathlib.Path(tmpdirname) / 'frame.png', blender_scene, cameras)
+            utils.write_animation(filepath, frames, frame_duration=duration / len(cameras))
+
+        if use_cache:
+            with self._stage('cache_store'):
+                cache.store(key, [filepath])
         return filepath
 
     def _load_scene(self) -> bpy.types.Scene:
@@ -94,18 +245,25 @@ class Scene:
     def _preload_meshes(self):
         for obj in self._objects:
             obj.root_dir = self._root_dir
-        blender_meshes = [obj for obj in self._objects if isinstance(obj, Mesh)]
-
-        if self._num_threads > 1:
-            use_thread_pool = len(blender_meshes) <= 3
-            executor_cls = (concurrent.futures.ThreadPoolExecutor if use_thread_pool else multiprocessing.Pool)
-            with executor_cls(self._num_threads) as executor:
-                meshes = executor.map(preload_mesh, blender_meshes)
-        else:
-            meshes = [preload_mesh(m) for m in blender_meshes]
+        meshes = [obj for obj in self._objects if isinstance(obj, Mesh)]
+        unique_meshes = link_mesh_instances(meshes)
+        with self._stage('load_meshes', num_meshes=len(unique_meshes)):
+            mesh_loader.load(unique_meshes, self._num_threads, cache=self._geometry_cache)
+            for mesh in meshes:  # Instances take the trimesh of the mesh they link to.
+                mesh.load()
+        with self._stage('lod'):
+            lod.simplify_meshes(meshes, self._resolution, self._lod_faces_per_pixel)
+        if self._profile is not None:
+            self._profile.info['meshes'] = [self._mesh_info(mesh) for mesh in meshes]
 
-        for mesh, blender_mesh in zip(meshes, blender_meshes):
-            blender_mesh.mesh = mesh
+    @staticmethod
+    def _mesh_info(mesh: Mesh) -> dict:
+        info = {'name': mesh.name or str(mesh.mesh_path), 'instance': mesh._instance_of is not None}
+        if hasattr(mesh.mesh, 'faces'):
+            info.update(num_vertices=len(mesh.mesh.vertices), num_faces=len(mesh.mesh.faces))
+        if mesh._lod is not None:
+            info['num_lod_faces'] = len(mesh._lod[1])
+        return info
 
     def _add_objects(self, blender_scene: bpy.types.Scene):
         for obj in self._objects:  # Add objects to blender.
@@ -117,6 +275,15 @@ class Scene:
         blender_scene.render.engine = self._render_engine
         blender_scene.render.film_transparent = self._transparant
         blender_scene.render.image_settings.color_mode = self._color_mode
+        if self._render_engine == 'BLENDER_WORKBENCH':
+            for name, value in WORKBENCH_SHADING.items():
+                setattr(blender_scene.display.shading, name, value)
+            # Multisampling redraws all objects for every sample, FXAA is a single post process pass.
+            blender_scene.display.render_aa = 'FXAA'
+        if self._quality is not None and self._render_engine == 'CYCLES':
+            for name, value in QUALITY_PRESETS[self._quality].items():
+                if hasattr(blender_scene.cycles, name):  # denoising_use_gpu and denoising_quality: Blender >= 4.1
+                    setattr(blender_scene.cycles, name, value)
         if self._num_samples is not None:
             bpy.context.scene.cycles.samples = self._num_samples
         if self._num_threads > 0:
@@ -136,10 +303,8 @@ class Scene:
             raise RuntimeError('No cameras set, fallback default camera did not work.')
 
         # Set zoom for all cameras.
-        for camera in cameras:
-            if 'zoomToAll' in camera.data.name:
-                blender_scene.camera = camera
-                self._zoom_to_all()
+        with self._stage('zoom_to_all'):
+            self._zoom_to_all(blender_scene, [camera for camera in cameras if 'zoomToAll' in camera.data.name])
 
         return cameras
 
@@ -148,108 +313,512 @@ class Scene:
                 ret_val[0] != 'FINISHED'):
             print(output)
 
+    @staticmethod
+    def _render_filepaths(filepath: pathlib.Path, num_cameras: int) -> list[pathlib.Path]:
+        if num_cameras == 1:
+            return [filepath]
+        return [filepath.parent / f'{n:03d}_{filepath.name}' for n in range(num_cameras)]
+
+    def _cache_key(self, cache, *extra) -> str:
+        # Everything but the objects, which are hashed separately, and settings that do not change the image.
+        settings = {
+            name: value
+            for name, value in vars(self).items()
+            if name not in ('_objects', '_root_dir', '_num_threads', '_verbose', '_profile', '_multiview',
+                            '_geometry_cache')
+        }
+        return cache.key(settings, self._objects, *extra, root_dir=self._root_dir)
+
+    def _stage(self, name: str, **args):
+        """Context that times a stage of the render when profiling."""
+        if self._profile is None:
+            return contextlib.nullcontext()
+        return self._profile.stage(name, **args)
+
+    @staticmethod
+    def _num_samples_of(blender_scene: bpy.types.Scene):
+        if blender_scene.render.engine == 'CYCLES':
+            return blender_scene.cycles.samples
+        if blender_scene.render.engine.startswith('BLENDER_EEVEE'):
+            return blender_scene.eevee.taa_render_samples
+        return None
+
+    def _run_render(self, blender_scene: bpy.types.Scene, description: str, **kwargs):
+        """Run the blender render operator with its output captured, see _print_blender_output."""
+        with tempfile.TemporaryFile() as fp, utils.stdout_redirected(fp):
+            caught_exception = None
+            try:
+                ret_val = list(bpy.ops.render.render(**kwargs))
+            except Exception as exc:
+                ret_val = ['EXCEPTION']
+                caught_exception = exc
+            finally:
+                fp.seek(0)
+                output = fp.read().decode('utf-8')
+
+        self._print_blender_output(output, ret_val)
+        if caught_exception:
+            raise caught_exception
+
+        if ret_val[0] != 'FINISHED':
+            raise RuntimeError(
+                f'Expected blenderpy render return value to be "FINISHED" not {ret_val[0]} for {description}')
+
+    def _render_camera(self, blender_scene: bpy.types.Scene, camera: bpy.types.Camera, render_file: pathlib.Path):
+        blender_scene.render.filepath = str(render_file)
+        blender_scene.camera = camera
+
+        # The render stage includes writing the image, which blender does as part of the render operator.
+        with self._stage('render', camera=camera.name, samples=self._num_samples_of(blender_scene)):
+            self._run_render(blender_scene, f'camera {camera.name}', write_still=True)
+
+    def _render_multiview(self, blender_scene: bpy.types.Scene, cameras: list[bpy.types.Camera],
+                          render_files: list[pathlib.Path]):
+        """Render all cameras in a single animation render, with a frame per camera.
+
+        Timeline markers switch the camera on every frame and persistent data keeps the synced scene and BVH in the
+        render engine between frames, so the objects are only synced once instead of for every camera.
+        """
+        render = blender_scene.render
+        frame_settings = (blender_scene.frame_start, blender_scene.frame_end, blender_scene.frame_step,
+                          blender_scene.frame_current, render.filepath, render.use_persistent_data)
+        # Start after existing markers of the preset, which would otherwise switch cameras as well.
+        frame_start = max((marker.frame for marker in blender_scene.timeline_markers), default=0) + 1
+        markers = []
+        for frame, camera in enumerate(cameras, frame_start):
+            markers.append(blender_scene.timeline_markers.new(f'blenderless_{camera.name}', frame=frame))
+            markers[-1].camera = camera
+
+        render_files[0].parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=render_files[0].parent) as tmpdirname:
+            blender_scene.camera = cameras[0]
+            blender_scene.frame_start = frame_start
+            blender_scene.frame_end = frame_start + len(cameras) - 1
+            blender_scene.frame_step = 1
+            render.filepath = str(pathlib.Path(tmpdirname) / 'frame_')
+            render.use_persistent_data = True
+            try:
+                with self._stage('render', cameras=len(cameras), samples=self._num_samples_of(blender_scene)):
+                    self._run_render(blender_scene, f'{len(cameras)} cameras', animation=True)
+                for frame, render_file in enumerate(render_files, frame_start):
+                    shutil.move(render.frame_path(frame=frame), render_file)
+            finally:
+                for marker in markers:
+                    blender_scene.timeline_markers.remove(marker)
+                # Unless the scene kept persistent data before, disabling it frees the data kept by the render engine.
+                (blender_scene.frame_start, blender_scene.frame_end, blender_scene.frame_step,
+                 blender_scene.frame_current, render.filepath, render.use_persistent_data) = frame_settings
+
     def _render_scene(self, filepath: pathlib.Path, blender_scene: bpy.types.Scene,
                       cameras: list[bpy.types.Camera]) -> list[pathlib.Path]:
-        render_files = []
-        for n, camera in enumerate(cameras):
-            if len(cameras) != 1:
-                render_file = filepath.parent / f'{n:03d}_{filepath.name}'
-            else:
-                render_file = filepath
-            blender_scene.render.filepath = str(render_file)
-            blender_scene.camera = camera
-
-            with tempfile.TemporaryFile() as fp, utils.stdout_redirected(fp):
-                caught_exception = None
-                try:
-                    ret_val = list(bpy.ops.render.render(write_still=True))
-                except Exception as exc:
-                    ret_val = ['EXCEPTION']
-                    caught_exception = exc
-                finally:
-                    fp.seek(0)
-                    output = fp.read().decode('utf-8')
-
-            self._print_blender_output(output, ret_val)
-            if caught_exception:
-                raise caught_exception
-
-            if ret_val[0] != 'FINISHED':
-                raise RuntimeError(
-                    f'Expected blenderpy render return value to be "FINISHED" not {ret_val[0]} for camera {n}')
-            render_files.append(pathlib.Path(bpy.context.scene.render.filepath))
-
+        render_files = self._render_filepaths(filepath, len(cameras))
+        if self._multiview and len(cameras) > 1:
+            self._render_multiview(blender_scene, cameras, render_files)
+        else:
+            for camera, render_file in zip(cameras, render_files):
+                self._render_camera(blender_scene, camera, render_file)
         return render_files
 
-    def render(self, filepath, export_blend_path=None):
-        bpy.ops.wm.read_factory_settings(use_empty=True)
+    def _render_frames(self, frame_file: pathlib.Path, blender_scene: bpy.types.Scene, cameras: list[bpy.types.Camera]):
+        """Yield the render of every camera as a uint8 array, read back one at a time from uncompressed files.
 
-        if self._preset_path is not None:
-            bpy.ops.wm.open_mainfile(filepath=str((self._root_dir / self._preset_path).absolute()))
+        Without multiview every camera is rendered when its frame is requested, reusing a single frame file.
+        """
+        self._set_image_settings(blender_scene, 'array')
+        render_all = self._multiview and len(cameras) > 1
+        if render_all:
+            frame_files = self._render_filepaths(frame_file, len(cameras))
+            self._render_multiview(blender_scene, cameras, frame_files)
+        else:
+            frame_files = [frame_file] * len(cameras)
 
-        blender_scene = self._load_scene()
+        for camera, frame_file in zip(cameras, frame_files):
+            if not render_all:
+                self._render_camera(blender_scene, camera, frame_file)
+            with self._stage('read_image', camera=camera.name):
+                frame = imageio.imread(frame_file)
+            yield frame
 
-        if self._preset_path is not None:
-            load_materials(self._root_dir / self._preset_path)
+    @staticmethod
+    def _set_image_settings(blender_scene: bpy.types.Scene, output: str):
+        for name, value in MEMORY_OUTPUTS[output].items():
+            setattr(blender_scene.render.image_settings, name, value)
 
-        self._preload_meshes()
+    @staticmethod
+    def _read_renders(render_files: list[pathlib.Path], output: str, out=None) -> list:
+        if output == 'png':
+            return [pathlib.Path(render_file).read_bytes() for render_file in render_files]
+
+        images = []
+        for n, render_file in enumerate(render_files):
+            image = imageio.imread(render_file)
+            if output == 'webp':
+                encoded = io.BytesIO()
+                Image.fromarray(image).save(encoded, format='WEBP')
+                image = encoded.getvalue()
+            elif out is not None:
+                np.copyto(out[n], image)
+                image = out[n]
+            images.append(image)
+        return images
+
+    def _open_preset(self) -> bpy.types.Scene:
+        """Reset blender and load the preset file, preset scene and preset materials."""
+        RenderSession.active_session = None
+        with self._stage('factory_reset'):
+            bpy.ops.wm.read_factory_settings(use_empty=True)
+
+        with self._stage('open_preset'):
+            if self._preset_path is not None:
+                bpy.ops.wm.open_mainfile(filepath=str((self._root_dir / self._preset_path).absolute()))
+
+            blender_scene = self._load_scene()
 
-        self._add_objects(blender_scene)
+        if self._preset_path is not None:
+            with self._stage('load_materials'):
+                load_materials(self._root_dir / self._preset_path)
+
+        return blender_scene
 
-        self._set_rendering_props(blender_scene)
+    @contextlib.contextmanager
+    def _prepared_scene(self, export_blend_path=None, session=None, shadow_plane=True):
+        """Build the blender scene with all objects and cameras, and export it after rendering.
 
-        cameras = self._set_cameras(blender_scene)
+        With shadow_plane=False no shadow plane is added, even if the scene has one.
+        """
+        if session is None:
+            blender_scene = self._open_preset()
+        else:
+            with self._stage('begin_job'):
+                blender_scene = session.begin_job(self)
+
+        try:
+            self._preload_meshes()
+
+            with self._stage('add_objects', num_objects=len(self._objects)):
+                self._add_objects(blender_scene)
+
+            self._set_rendering_props(blender_scene)
+
+            with self._stage('set_cameras'):
+                cameras = self._set_cameras(blender_scene)
+
+            if self._shadow_plane and shadow_plane:  # Add shadow plane when all objects are in the scene.
+                with self._stage('shadow_plane'):
+                    self.add_shadow_plane(blender_scene)
+
+            if self._profile is not None:
+                self._profile.info.update(engine=blender_scene.render.engine,
+                                          samples=self._num_samples_of(blender_scene),
+                                          resolution=list(self._resolution),
+                                          num_cameras=len(cameras))
+
+            yield blender_scene, cameras
+
+            if export_blend_path:
+                with self._stage('export_blend'):
+                    self.export_blend_file(export_blend_path)
+        finally:
+            if session is not None:
+                with self._stage('end_job'):
+                    session.end_job()
+
+    def render(self, filepath, export_blend_path=None, session=None, cache=None, profile=None):
+        """Render the scene for all cameras.
+
+        Args:
+            filepath: output path, prefixed with the camera index when rendering multiple cameras.
+            export_blend_path: optional path to export the generated .blend file to.
+            session (RenderSession): optional long-lived blender session to render in, which avoids reloading the
+                factory settings, preset and materials on every call.
+            cache (RenderCache): optional render cache, on a hit the stored images are returned without
+                starting blender. Not used when exporting a .blend file.
+            profile (RenderProfile): optional profile to record the wall time and peak memory of every stage in,
+                see blenderless.profiling.
+        """
+        self._profile = profile
+        use_cache = cache is not None and export_blend_path is None
+        if use_cache:
+            key = self._cache_key(cache)
+
+            def copy_cached_files(cached_files):
+                render_files = self._render_filepaths(pathlib.Path(filepath), len(cached_files))
+                for cached_file, render_file in zip(cached_files, render_files):
+                    shutil.copyfile(cached_file, render_file)
+                return render_files
+
+            with self._stage('cache_load'):
+                render_files = cache.read(key, copy_cached_files)
+            if render_files is not None:
+                return render_files
+
+        with self._prepared_scene(export_blend_path, session) as (blender_scene, cameras):
+            render_files = self._render_scene(pathlib.Path(filepath), blender_scene, cameras)
+
+        if use_cache:
+            with self._stage('cache_store'):
+                cache.store(key, render_files)
+        return render_files
 
-        if self._shadow_plane:  # Add shadow plane when all objects are in the scene.
-            self.add_shadow_plane(blender_scene)
+    def render_to_memory(self,
+                         output='array',
+                         out=None,
+                         export_blend_path=None,
+                         session=None,
+                         cache=None,
+                         profile=None) -> list:
+        """Render the scene for all cameras and return the images instead of writing them to a given path.
+
+        Args:
+            output: 'array' for (H, W, C) uint8 arrays, or 'png' / 'webp' for encoded image bytes.
+            out: optional sequence with a preallocated array per camera to write 'array' output into, e.g. an array
+                of shape (num_cameras, H, W, C).
+            export_blend_path, session, cache, profile: see render.
+
+        Returns:
+            list with an array or bytes object per camera.
+        """
+        if output not in MEMORY_OUTPUTS:
+            raise ValueError(f'output must be one of {list(MEMORY_OUTPUTS)}, not {output}')
+        if out is not None and output != 'array':
+            raise ValueError('out is only supported for array output')
+
+        self._profile = profile
+        use_cache = cache is not None and export_blend_path is None
+        if use_cache:
+            key = self._cache_key(cache, 'memory', output)
+            with self._stage('cache_load'):
+                images = cache.read(key, lambda cached_files: self._read_renders(cached_files, output, out))
+            if images is not None:
+                return images
 
-        render_files = self._render_scene(pathlib.Path(filepath), blender_scene, cameras)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            filepath = pathlib.Path(tmpdirname) / f'out.{MEMORY_OUTPUTS[output]["file_format"].lower()}'
+            with self._prepared_scene(export_blend_path, session) as (blender_scene, cameras):
+                self._set_image_settings(blender_scene, output)
+                render_files = self._render_scene(filepath, blender_scene, cameras)
+
+            if use_cache:
+                with self._stage('cache_store'):
+                    cache.store(key, render_files)
+            with self._stage('read_images'):
+                return self._read_renders(render_files, output, out)
+
+    def render_many(self, mesh_sources, output_template, mesh_kwargs=None, session=None, profile=None):
+        """Render every mesh in mesh_sources in this scene, building the scene only once.
+
+        The preset, lights, cameras and other objects of the scene are built once. For every mesh only the mesh data of
+        a single object is replaced, after which the cameras are framed and the shadow plane is fitted again. The next
+        mesh is loaded and simplified on a background thread while the current one renders.
+
+        Example:
+            scene = Scene(preset_path='preset.blend')
+            scene.add_object(SphericalCoordinateCamera(azimuth=45, elevation=30))
+            for mesh_path, render_files in scene.render_many(mesh_paths, 'renders/{stem}.png'):
+                ...
+
+        Args:
+            mesh_sources: iterable of mesh file paths, trimesh.Trimesh objects or Mesh objects, read lazily.
+            output_template: output path, formatted with the index of the mesh and the stem of its path (the index for
+                meshes without a path), e.g. 'renders/{index:05d}_{stem}.png'. Prefixed with the camera index when
+                rendering multiple cameras.
+            mesh_kwargs (dict): arguments of the Mesh that is created for every path or trimesh, e.g. a material.
+            session, profile: see render.
+
+        Yields:
+            (mesh source, list of render paths) as soon as the mesh is rendered.
+        """
+        self._profile = profile
+        mesh_kwargs = mesh_kwargs or {}
+        num_objects = len(self._objects)
+        with concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='blenderless_prefetch') as executor:
+
+            def prefetch(source):
+                return source, executor.submit(self._prefetch_mesh, source, mesh_kwargs)
+
+            # Holds the next source and the future of its mesh, the first mesh loads while the scene is built.
+            sources = iter(mesh_sources)
+            pending = [prefetch(source) for source in itertools.islice(sources, 1)]
+            try:
+                with self._prepared_scene(session=session, shadow_plane=False) as (blender_scene, cameras):
+                    zoom_cameras = [camera for camera in cameras if 'zoomToAll' in camera.data.name]
+                    current, plane, index = None, None, 0
+                    while pending:
+                        source, future = pending.pop()
+                        with self._stage('wait_for_mesh', index=index):
+                            mesh = future.result()
+                        pending.extend(prefetch(next_source) for next_source in itertools.islice(sources, 1))
+
+                        with self._stage('swap_mesh', index=index):
+                            current = self._swap_mesh(blender_scene, current, mesh)
+                            if plane is not None:  # Framed without the shadow plane, like in render.
+                                self._remove_object(plane)
+                        with self._stage('zoom_to_all', index=index):
+                            self._zoom_to_all(blender_scene, zoom_cameras)
+                        if self._shadow_plane:
+                            with self._stage('shadow_plane'):
+                                plane = self.add_shadow_plane(blender_scene)
+
+                        stem = pathlib.Path(mesh.mesh_path).stem if mesh.mesh_path is not None else str(index)
+                        filepath = pathlib.Path(str(output_template).format(index=index, stem=stem))
+                        filepath.parent.mkdir(parents=True, exist_ok=True)
+                        yield source, self._render_scene(filepath, blender_scene, cameras)
+                        index += 1
+            finally:
+                for _, future in pending:
+                    future.cancel()
+                del self._objects[num_objects:]
+
+    def _prefetch_mesh(self, source, mesh_kwargs) -> Mesh:
+        """Load and simplify the mesh of a render_many source, without touching blender."""
+        if isinstance(source, Mesh):
+            mesh = source
+        elif isinstance(source, trimesh.Trimesh):
+            mesh = Mesh(mesh=source, **mesh_kwargs)
+        else:
+            mesh = Mesh(mesh_path=str(source), **mesh_kwargs)
+        mesh.root_dir = self._root_dir
+        mesh.load(self._geometry_cache)
+        lod.simplify_meshes([mesh], self._resolution, self._lod_faces_per_pixel)
+        return mesh
 
-        if export_blend_path:
-            self.export_blend_file(export_blend_path)
+    def _swap_mesh(self, blender_scene: bpy.types.Scene, current: Mesh | None, mesh: Mesh) -> Mesh:
+        """Show mesh instead of current, by replacing the mesh data of the blender object of current.
 
-        return render_files
+        The pose, materials, modifiers and shadow catcher setting of the object are set to those of mesh.
+        """
+        if current is None:
+            self.add_object(mesh)
+            blender_scene.collection.children.link(mesh.blender_collection())
+            return mesh
+
+        blender_object = current._blender_object
+        previous_data = blender_object.data
+        blender_object.data = mesh.object_data()
+        bpy.data.meshes.remove(previous_data)
+        mesh._blender_object, mesh._blender_collection = blender_object, current._blender_collection
+        mesh.blender_object()
+        self._objects = [mesh if obj is current else obj for obj in self._objects]
+        return mesh
+
+    def _remove_object(self, obj: BlenderObject):
+        """Remove an object that was added while building the blender scene from the scene and from blender."""
+        self._objects = [other for other in self._objects if other is not obj]
+        blender_collection = obj.blender_collection()
+        data = [blender_object.data for blender_object in blender_collection.objects]
+        bpy.data.batch_remove([*blender_collection.objects, *data, blender_collection])
 
     def add_object(self, blender_object: BlenderObject):
         self._objects.append(blender_object)
 
-    def add_shadow_plane(self, blender_scene):
-        # Find lowest point.
-        lowest_points = []
-        for object in self.get_all_objects(['MESH']):
-            lowest_points.append(min([v.co.z for v in object.data.vertices]))
-        plane = HorizontalPlane(height=min(lowest_points), is_shadow_catcher=True)
+    def add_shadow_plane(self, blender_scene) -> HorizontalPlane:
+        """Add a shadow catching plane below all meshes, sized to the footprint of the scene, and return it."""
+        points = self.get_world_points(['MESH'])
+        if len(points) == 0:
+            plane = HorizontalPlane(is_shadow_catcher=True)
+        else:
+            lower, upper = points.min(axis=0), points.max(axis=0)
+            center = (lower + upper) / 2
+            plane = HorizontalPlane(xyz=(center[0], center[1], 0),
+                                    height=lower[2],
+                                    size=max(float((upper - lower).max()), 1e-3),
+                                    is_shadow_catcher=True)
         self.add_object(plane)
         blender_scene.collection.children.link(plane.blender_collection())
+        return plane
 
     @staticmethod
     def cameras(blender_scene):
         return [obj for obj in blender_scene.objects if obj.type == 'CAMERA']
 
     @staticmethod
-    def _zoom_to_all(max_iter=10, delta_min=5e-3):
-        """Zoom to view all objects."""
-        bpy.ops.object.select_all(action='DESELECT')
-        for obj in bpy.context.scene.objects:
-            if obj.type in ['MESH', 'FONT']:
-                obj.select_set(True)
-
-        cam = bpy.context.scene.camera
-        prev_ortho_scale = cam.data.ortho_scale
-
-        # Work-around for camera_to_view_selected() not including entire scene in frame.
-        for _ in range(max_iter):
-            bpy.ops.view3d.camera_to_view_selected()
-            ortho_scale = cam.data.ortho_scale
-            delta = abs(ortho_scale - prev_ortho_scale) / prev_ortho_scale
-            if delta < delta_min:  # Stop early if the ortho scale doesn't change.
-                break
-            prev_ortho_scale = ortho_scale
+    def _zoom_to_all(blender_scene, cameras):
+        """Zoom to view all objects.
+
+        Closed form equivalent of bpy.ops.view3d.camera_to_view_selected() for all cameras at once: cameras keep
+        their orientation and are moved (and orthographic cameras scaled) to tightly frame all MESH and FONT objects.
+        """
+        points = Scene.get_world_points(['MESH', 'FONT'])
+        if not cameras or len(points) == 0:
+            return
+
+        render = blender_scene.render
+        aspect = (render.resolution_x * render.pixel_aspect_x) / (render.resolution_y * render.pixel_aspect_y)
+        cameras_data = [camera.data for camera in cameras]
+        is_ortho = np.array([data.type == 'ORTHO' for data in cameras_data])
+        fit = np.array([data.sensor_fit for data in cameras_data])
+        horizontal = (fit == 'HORIZONTAL') | ((fit == 'AUTO') & (aspect >= 1))
+
+        # Slopes of the frustum planes, zero for orthographic cameras.
+        sensor = np.where(fit == 'VERTICAL', [data.sensor_height for data in cameras_data],
+                          [data.sensor_width for data in cameras_data])
+        tan = sensor / (2 * np.array([data.lens for data in cameras_data]))
+        tan_x = np.where(is_ortho, 0, np.where(horizontal, tan, tan * aspect))
+        tan_y = np.where(is_ortho, 0, np.where(horizontal, tan / aspect, tan))
+
+        matrices = np.array([camera.matrix_world for camera in cameras])
+        axes = matrices[:, :3, :3] / np.linalg.norm(matrices[:, :3, :3], axis=1, keepdims=True)
+        axis_x, axis_y, axis_z = axes[:, :, 0], axes[:, :, 1], axes[:, :, 2]
+        locations = matrices[:, :3, 3]
+
+        # Maximum distance of the points beyond the right, left, top, bottom and near planes of each camera.
+        directions = np.stack((axis_x + tan_x[:, None] * axis_z, -axis_x + tan_x[:, None] * axis_z,
+                               axis_y + tan_y[:, None] * axis_z, -axis_y + tan_y[:, None] * axis_z, axis_z),
+                              axis=1)
+        max_dists = utils.max_projections(points, directions.reshape(-1, 3)).reshape(len(cameras), 5)
+        right, left, top, bottom, near = (max_dists - np.einsum('kjd,kd->kj', directions, locations)).T
+
+        clip_start = np.array([data.clip_start for data in cameras_data])
+        width, height = right + left, top + bottom
+        with np.errstate(divide='ignore', invalid='ignore'):
+            offset_z = np.where(is_ortho, near + 1 + clip_start,
+                                np.maximum(np.maximum(width / (2 * tan_x), height / (2 * tan_y)), near + clip_start))
+        offsets = np.stack(((right - left) / 2, (top - bottom) / 2, offset_z), axis=1)
+        new_locations = locations + np.einsum('kdj,kj->kd', axes, offsets)
+        ortho_scales = np.where(horizontal, np.maximum(width, height * aspect), np.maximum(height, width / aspect))
+
+        for camera, location, ortho_scale, ortho in zip(cameras, new_locations, ortho_scales, is_ortho):
+            camera.location = location
+            if ortho:
+                camera.data.ortho_scale = ortho_scale
 
     @staticmethod
     def export_blend_file(filepath):
         bpy.ops.wm.save_as_mainfile(filepath=str(filepath))
 
+    @staticmethod
+    def get_world_points(object_types):
+        """World space points that bound all objects of the given types, read from blender in bulk.
+
+        Uses the vertices of the evaluated objects, i.e. including modifiers and text geometry. Vertices that are
+        rendered as spheres, see PointCloud with mode='points', are replaced by the corners of the cube around the
+        sphere, which contains it.
+        """
+        bpy.context.view_layer.update()
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        points = [np.empty((0, 3), dtype=np.float32)]
+        for obj in Scene.get_all_objects(object_types):
+            obj_eval = obj.evaluated_get(depsgraph)
+            if obj.type == 'MESH':
+                mesh = obj_eval.data if obj.modifiers else obj.data
+                if len(mesh.vertices) == 0:  # E.g. geometry nodes that output a point cloud.
+                    mesh = obj.data
+            else:
+                mesh = obj_eval.to_mesh()
+            coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', coords)
+            if obj.type != 'MESH':
+                obj_eval.to_mesh_clear()
+            matrix = np.array(obj.matrix_world, dtype=np.float32)
+            world_points = coords.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+            radius = points_node_radius(obj) if obj.type == 'MESH' else 0
+            if radius > 0:
+                radius *= np.linalg.norm(matrix[:3, :3], axis=0).max()
+                offsets = np.array(list(itertools.product((-radius, radius), repeat=3)), dtype=np.float32)
+                world_points = (world_points[:, None, :] + offsets).reshape(-1, 3)
+            points.append(world_points)
+        return np.concatenate(points)
+
     @staticmethod
     def get_all_objects(object_types):
         # Select all objects in the scene to be deleted:
@@ -277,3 +846,61 @@ class Scene:
     @verbose.setter
     def verbose(self, verbose: bool):
         self._verbose = verbose
+
+    @property
+    def preset_key(self):
+        """Identifies the blender state that _open_preset() produces for this scene."""
+        preset_path = None if self._preset_path is None else (self._root_dir / self._preset_path).absolute()
+        return preset_path, self._preset_scene
+
+
+class RenderSession:
+    """Blender session that is kept alive across Scene.render calls.
+
+    The factory reset, preset file and material libraries are only loaded when the preset changes. Every job renders
+    in a fresh copy of the preset scene, so render settings do not carry over between jobs, and all datablocks that
+    were created by a job (objects, meshes, cameras, lights, materials, ...) are removed when the job ends. Materials of
+    blenderless.material.material_registry are kept, so later jobs reuse them. The registry only holds its most
+    recently used materials, which bounds the materials a session keeps across jobs with different colors.
+
+    Example:
+        session = RenderSession()
+        for mesh_path in mesh_paths:
+            scene = Scene(preset_path='preset.blend')
+            scene.add_object(Mesh(mesh_path=mesh_path))
+            scene.render(f'{mesh_path.stem}.png', session=session)
+    """
+
+    # Datablock types that are cleaned up after each job. Fonts and images (e.g. the render result) are reused.
+    JOB_DATA_TYPES = ('objects', 'meshes', 'curves', 'cameras', 'lights', 'materials', 'textures', 'node_groups',
+                      'collections', 'scenes')
+
+    active_session = None
+    """Session that owns the current blender state, reset by every factory reset."""
+
+    def __init__(self):
+        self._preset_key = None
+        self._template_scene = None
+        self._persistent_data = set()
+
+    def begin_job(self, scene: Scene) -> bpy.types.Scene:
+        """Prepare blender for rendering scene and return the blender scene to render in."""
+        if RenderSession.active_session is not self or self._preset_key != scene.preset_key:
+            self._template_scene = scene._open_preset()
+            self._preset_key = scene.preset_key
+            self._persistent_data = {data.as_pointer() for data in self._job_data()}
+            RenderSession.active_session = self
+
+        blender_scene = self._template_scene.copy()
+        bpy.context.window.scene = blender_scene
+        return blender_scene
+
+    def end_job(self):
+        """Remove all datablocks created since begin_job(), except the materials of the material registry."""
+        bpy.context.window.scene = self._template_scene
+        keep = self._persistent_data | {material.as_pointer() for material in material_registry.blender_materials()}
+        bpy.data.batch_remove([data for data in self._job_data() if data.as_pointer() not in keep])
+
+    def _job_data(self):
+        for data_type in self.JOB_DATA_TYPES:
+            yield from getattr(bpy.data, data_type)
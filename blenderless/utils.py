@@ -1,10 +1,16 @@
 import contextlib
 import io
+import itertools
 import logging
 import math
 import os
+import pathlib
 import sys
 
+import imageio.v2 as imageio
+import imageio_ffmpeg
+import numpy as np
+
 logger = logging.getLogger()
 
 
@@ -90,6 +96,83 @@ def spherical_to_cartesian(dist, azimuth_deg, elevation_deg):
     return (x, y, z)
 
 
+def max_projections(points, directions, max_chunk_elements=1 << 22):
+    """Return the maximum of points @ directions.T per direction, computed in chunks to bound memory.
+
+    Args:
+        points (np.ndarray): Shape (?, 3)
+        directions (np.ndarray): Shape (?, 3)
+    """
+    directions = np.asarray(directions, dtype=points.dtype)
+    chunk_size = max(1, max_chunk_elements // max(1, len(directions)))
+    result = np.full(len(directions), -np.inf)
+    for start in range(0, len(points), chunk_size):
+        np.maximum(result, (points[start:start + chunk_size] @ directions.T).max(axis=0), out=result)
+    return result
+
+
+# ffmpeg settings of the animation formats that are streamed into imageio-ffmpeg, as imageio only writes video formats
+# with ffmpeg. Every GIF frame gets a palette of its own.
+GIF_PALETTE_FILTER = 'split[a][b];[a]palettegen=stats_mode=single[p];[b][p]paletteuse=new=1'
+APNG_SETTINGS = {'codec': 'apng', 'pix_fmt_out': 'rgba', 'output_params': ['-f', 'apng', '-plays', '0']}
+ANIMATION_FORMATS = {
+    '.gif': {
+        'codec': 'gif',
+        'pix_fmt_out': 'pal8',
+        'output_params': ['-filter_complex', GIF_PALETTE_FILTER, '-loop', '0']
+    },
+    '.png': APNG_SETTINGS,
+    '.apng': APNG_SETTINGS,
+    '.webp': {
+        'codec': 'libwebp_anim',
+        'pix_fmt_out': 'yuva420p',
+        'output_params': ['-loop', '0']
+    },
+}
+FFMPEG_PIXEL_FORMATS = {1: 'gray', 3: 'rgb24', 4: 'rgba'}
+
+
+def write_animation(filepath, frames, frame_duration):
+    """Stream frames into an animation encoded by ffmpeg, consuming them one at a time.
+
+    GIF, APNG (.png, .apng) and WebP frames are piped into ffmpeg with imageio-ffmpeg, all remaining formats (e.g. MP4)
+    are written with the imageio ffmpeg writer. Only the frame that is being sent to ffmpeg is kept in memory.
+
+    Args:
+        filepath: output path, the format is derived from its suffix.
+        frames: iterable of (H, W, C) or (H, W) uint8 arrays.
+        frame_duration (float): display time of each frame in seconds.
+    """
+    filepath = pathlib.Path(filepath)
+    settings = ANIMATION_FORMATS.get(filepath.suffix.lower())
+    if settings is None:
+        with imageio.get_writer(filepath, mode='I', fps=1 / frame_duration) as writer:
+            for frame in frames:
+                writer.append_data(frame)
+        return
+
+    frames = iter(frames)
+    first_frame = next(frames, None)
+    if first_frame is None:
+        raise ValueError('an animation needs at least one frame')
+    height, width = first_frame.shape[:2]
+    channels = first_frame.shape[2] if first_frame.ndim == 3 else 1
+    writer = imageio_ffmpeg.write_frames(str(filepath), (width, height),
+                                         fps=1 / frame_duration,
+                                         pix_fmt_in=FFMPEG_PIXEL_FORMATS[channels],
+                                         macro_block_size=1,
+                                         ffmpeg_log_level='error',
+                                         **settings)
+    writer.send(None)  # Start ffmpeg.
+    try:
+        for frame in itertools.chain([first_frame], frames):
+            if frame.shape != first_frame.shape:
+                raise ValueError('all frames of an animation must have the same size')
+            writer.send(np.ascontiguousarray(frame, dtype=np.uint8))
+    finally:
+        writer.close()
+
+
 @contextlib.contextmanager
 def stdout_redirected(to=os.devnull, stdout=None):
     # Credit to https://stackoverflow.com/a/22434262.
@@ -0,0 +1,239 @@
+import concurrent.futures
+import os
+import pathlib
+import shutil
+import time
+
+import numpy as np
+import numpy.testing as npt
+import trimesh
+from PIL import Image
+
+from blenderless.cache import GeometryCache
+from blenderless.cache import RenderCache
+from blenderless.cache import STALE_TMP_SECONDS
+from blenderless.camera import SphericalCoordinateCamera
+from blenderless.geometry import Mesh
+from blenderless.io import FileHandlerFactory
+from blenderless.loader import mesh_loader
+from blenderless.scene import Scene
+
+
+def test_key_uses_mesh_contents(mesh_paths, tmp_path):
+    cache = RenderCache(tmp_path / 'cache')
+    mesh_path = mesh_paths[0]
+    copied_path = tmp_path / mesh_path.name
+    shutil.copyfile(mesh_path, copied_path)
+
+    key = cache.key(Mesh(mesh_path=str(mesh_path)))
+    assert key == cache.key(Mesh(mesh_path=copied_path.name), root_dir=tmp_path)
+    assert key != cache.key(Mesh(mesh_path=str(mesh_path), xyz=(1, 0, 0)))
+
+    copied_path.write_bytes(b'other contents')
+    assert key != cache.key(Mesh(mesh_path=copied_path.name), root_dir=tmp_path)
+
+
+def test_key_uses_in_memory_meshes(tmp_path):
+    cache = RenderCache(tmp_path)
+    key = cache.key(Mesh(mesh=trimesh.creation.box()))
+    assert key == cache.key(Mesh(mesh=trimesh.creation.box()))
+    assert key != cache.key(Mesh(mesh=trimesh.creation.box(extents=(1, 2, 3))))
+
+
+def test_lru_eviction(tmp_path):
+    cache = RenderCache(tmp_path / 'cache', max_size=25)
+    image_path = tmp_path / 'image.png'
+    image_path.write_bytes(b'0123456789')
+
+    cache.store('a', [image_path])
+    cache.store('b', [image_path])
+    assert cache.load('a') is not None  # Makes 'b' the least recently used entry.
+    cache.store('c', [image_path])
+
+    assert cache.load('b') is None
+    assert cache.load('a') is not None
+    assert cache.load('c') is not None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_scene_render_cache(mesh_paths, tmp_path, num_rendering_threads):
+    cache = RenderCache(tmp_path / 'cache')
+
+    def new_scene(resolution):
+        scene = Scene(num_threads=num_rendering_threads, resolution=resolution)
+        scene.add_object(Mesh(mesh_path=str(mesh_paths[0].absolute())))
+        for azimuth in (0, 90):
+            scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+        return scene
+
+    first_paths = new_scene((32, 32)).render(tmp_path / 'first.png', cache=cache)
+    second_paths = new_scene((32, 32)).render(tmp_path / 'second.png', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    for first_path, second_path in zip(first_paths, second_paths):
+        assert first_path.read_bytes() == second_path.read_bytes()
+
+    new_scene((64, 32)).render(tmp_path / 'third.png', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    first_images = new_scene((32, 32)).render_to_memory('array', cache=cache)
+    second_images = new_scene((32, 32)).render_to_memory('array', cache=cache)
+    assert (cache.hits, cache.misses) == (2, 3)
+    for first_image, second_image in zip(first_images, second_images):
+        npt.assert_array_equal(first_image, second_image)
+
+
+def test_scene_render_cache_entry_evicted(tmp_path, num_rendering_threads, monkeypatch):
+    cache = RenderCache(tmp_path / 'cache')
+
+    def new_scene():
+        scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16))
+        scene.add_object(Mesh(mesh=trimesh.creation.box()))
+        return scene
+
+    first_path = new_scene().render(tmp_path / 'first.png', cache=cache)[0]
+    new_scene().render_to_memory('png', cache=cache)
+    entry_files = cache._entry_files
+
+    def evicted_entry_files(key):
+        files = entry_files(key)
+        shutil.rmtree(cache.cache_dir / key)  # Evicted by another process after listing its files.
+        return files
+
+    monkeypatch.setattr(cache, '_entry_files', evicted_entry_files)
+    second_path = new_scene().render(tmp_path / 'second.png', cache=cache)[0]
+    png = new_scene().render_to_memory('png', cache=cache)[0]
+    assert (cache.hits, cache.misses) == (0, 4)
+    assert second_path.read_bytes() == first_path.read_bytes()
+    assert png.startswith(b'\x89PNG')
+
+
+def test_animation_cache_key_uses_format(tmp_path, num_rendering_threads):
+    cache = RenderCache(tmp_path / 'cache')
+
+    def new_scene():
+        scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16))
+        scene.add_object(Mesh(mesh=trimesh.creation.box()))
+        for azimuth in (0, 90):
+            scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+        return scene
+
+    new_scene().render_gif(tmp_path / 'first.gif', cache=cache)
+    new_scene().render_gif(tmp_path / 'second.webp', cache=cache)
+    new_scene().render_gif(tmp_path / 'third.gif', cache=cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+    with Image.open(tmp_path / 'second.webp') as im:
+        assert im.format == 'WEBP'
+    assert (tmp_path / 'first.gif').read_bytes() == (tmp_path / 'third.gif').read_bytes()
+
+
+def test_geometry_cache_memory_maps_meshes(mesh_paths, tmp_path):
+    cache = GeometryCache(tmp_path / 'cache')
+    mesh_path = mesh_paths[0]
+    expected = FileHandlerFactory.get_loader(mesh_path).load(mesh_path)
+
+    assert cache.get_mesh(mesh_path) is None
+    loaded = cache.load_mesh(mesh_path)
+    cached = cache.load_mesh(mesh_path)
+    assert (cache.hits, cache.misses) == (1, 2)
+    for mesh in (loaded, cached):
+        npt.assert_array_equal(mesh.vertices, expected.vertices)
+        npt.assert_array_equal(mesh.faces, expected.faces)
+    assert not cached.vertices.flags.owndata and not cached.vertices.flags.writeable  # Read only file mapping.
+
+
+def test_geometry_cache_key(mesh_paths, tmp_path):
+    cache = GeometryCache(tmp_path)
+    copied_path = tmp_path / mesh_paths[0].name
+    shutil.copyfile(mesh_paths[0], copied_path)
+    handler = FileHandlerFactory.get_loader(copied_path)
+
+    class NewHandler(handler):
+        version = handler.version + 1
+
+    key = cache.key(copied_path)
+    assert key == cache.key(mesh_paths[0], handler)
+    assert key != cache.key(copied_path, NewHandler)
+    copied_path.write_bytes(b'other contents')
+    assert key != cache.key(copied_path)
+
+
+def load_cached_vertices(cache_dir, mesh_path):
+    return np.array(GeometryCache(cache_dir, max_size=1).load_mesh(mesh_path).vertices)
+
+
+def test_geometry_cache_in_processes(mesh_paths, tmp_path):
+    # Every store evicts all other entries, while the other processes load them.
+    jobs = [mesh_path for mesh_path in mesh_paths for _ in range(4)]
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        vertices = list(executor.map(load_cached_vertices, [tmp_path] * len(jobs), jobs))
+
+    for mesh_path, mesh_vertices in zip(jobs, vertices):
+        npt.assert_array_equal(mesh_vertices, FileHandlerFactory.get_loader(mesh_path).load(mesh_path).vertices)
+    assert len([entry for entry in tmp_path.iterdir() if not entry.name.startswith('.')]) <= 1
+
+
+def test_load_meshes_with_geometry_cache(mesh_paths, tmp_path):
+    cache = GeometryCache(tmp_path)
+    for num_hits in (0, len(mesh_paths)):
+        meshes = [Mesh(mesh_path=str(mesh_path)) for mesh_path in mesh_paths]
+        for mesh in meshes:
+            mesh.root_dir = pathlib.Path()
+        mesh_loader.load(meshes, num_threads=2, cache=cache)
+        assert cache.hits == num_hits
+        for mesh, mesh_path in zip(meshes, mesh_paths):
+            npt.assert_array_equal(mesh.mesh.faces, FileHandlerFactory.get_loader(mesh_path).load(mesh_path).faces)
+
+
+def test_scene_geometry_cache(mesh_paths, tmp_path):
+    geometry_cache = GeometryCache(tmp_path / 'geometry')
+
+    def new_scene(**kwargs):
+        scene = Scene(resolution=(16, 16), **kwargs)
+        scene.add_object(Mesh(mesh_path=str(mesh_paths[0].absolute())))
+        scene.add_object(SphericalCoordinateCamera())
+        return scene
+
+    for n in range(2):
+        new_scene(geometry_cache=geometry_cache).render(tmp_path / f'{n}.png')
+    assert (geometry_cache.hits, geometry_cache.misses) == (1, 2)
+    npt.assert_array_equal(np.asarray(Image.open(tmp_path / '0.png')), np.asarray(Image.open(tmp_path / '1.png')))
+
+    render_cache = RenderCache(tmp_path / 'renders')
+    key = new_scene()._cache_key(render_cache)
+    assert key == new_scene(geometry_cache=geometry_cache)._cache_key(render_cache)
+
+
+def test_store_scans_cache_only_when_needed(tmp_path, monkeypatch):
+    cache = RenderCache(tmp_path / 'cache', max_size=1000)
+    image_path = tmp_path / 'image.png'
+    image_path.write_bytes(b'0123456789')
+    num_scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda: num_scans.append(1) or evict())
+
+    for n in range(6):
+        cache.store(str(n), [image_path])
+    assert len(num_scans) == 1  # The first store scans the cache, later stores keep a running total.
+    for n in range(6, 100):
+        cache.store(str(n), [image_path])
+    assert len(num_scans) < 20
+    assert sum(1 for _ in (tmp_path / 'cache').iterdir()) == 100
+    cache.evict()
+    assert sum(1 for _ in (tmp_path / 'cache').iterdir()) == 100
+
+    cache.max_size = 500
+    cache.store('100', [image_path])
+    assert sum(1 for _ in (tmp_path / 'cache').iterdir()) == 50
+
+
+def test_evict_removes_stale_directories(tmp_path):
+    cache = RenderCache(tmp_path)
+    removed, stale, staging = tmp_path / '.removed-0', tmp_path / '.stale', tmp_path / '.staging'
+    for path in (removed, stale, staging):
+        path.mkdir()
+        (path / 'file').write_bytes(b'0')
+    stale_time = time.time() - 2 * STALE_TMP_SECONDS
+    os.utime(stale, (stale_time, stale_time))
+
+    cache.evict()
+    assert sorted(tmp_path.iterdir()) == [staging]
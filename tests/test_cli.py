@@ -1,8 +1,15 @@
+import json
+import logging
+import os
 from shutil import copyfile
 
 from click.testing import CliRunner
 
 import blenderless.cli
+from blenderless import batch
+from blenderless.io import FileHandler
+from blenderless.io import FileHandlerFactory
+from blenderless.scene import RenderSession
 
 
 def test_file_rendering(tmp_path, mesh_paths):
@@ -15,6 +22,21 @@ def test_file_rendering(tmp_path, mesh_paths):
     assert (tmp_path / f'{mesh_path.stem}.png').exists()
 
 
+def test_parallel_file_rendering(tmp_path, mesh_paths):
+    for mesh_path in mesh_paths:
+        copyfile(mesh_path, tmp_path / mesh_path.name)
+    (tmp_path / 'broken.stl').write_text('not a mesh')
+
+    runner = CliRunner()
+    result = runner.invoke(blenderless.cli.image, ['*.stl', str(tmp_path), '--jobs', '2'])
+
+    # A failing file is reported, but does not abort the other renders.
+    assert result.exit_code == 1
+    for mesh_path in mesh_paths:
+        assert (tmp_path / f'{mesh_path.stem}.png').exists()
+    assert not (tmp_path / 'broken.png').exists()
+
+
 def test_config_rendering(example_config_path, tmp_path):
     runner = CliRunner()
     output_file = tmp_path / 'render.png'
@@ -36,3 +58,71 @@ def test_export_blender_path(example_config_path, tmp_path):
     assert result.exit_code == 0
     assert output_file.exists()
     assert blender_file.exists()
+
+
+def test_profile(tmp_path, mesh_paths):
+    for mesh_path in mesh_paths:
+        copyfile(mesh_path, tmp_path / mesh_path.name)
+    profile_path = tmp_path / 'profile.json'
+
+    runner = CliRunner()
+    result = runner.invoke(blenderless.cli.main, ['--profile', str(profile_path), 'image', '*.stl', str(tmp_path)])
+    assert result.exit_code == 0
+
+    trace = json.loads(profile_path.read_text())
+    assert len(trace['otherData']['reports']) == len(mesh_paths)
+    assert 'render' in trace['otherData']['totals']
+
+
+class CrashingFileHandler(FileHandler):
+
+    @staticmethod
+    def load(path):
+        os._exit(1)  # Like a segfault in blender, the worker process dies without raising.
+
+
+def test_parallel_rendering_survives_worker_crash(tmp_path, mesh_paths, monkeypatch):
+    monkeypatch.setitem(FileHandlerFactory._loaders, '.crash', CrashingFileHandler)
+    geometry_files = []
+    for n in range(2):
+        for mesh_path in mesh_paths:
+            geometry_files.append(tmp_path / f'{n}_{mesh_path.name}')
+            copyfile(mesh_path, geometry_files[-1])
+    geometry_files.insert(1, tmp_path / 'crash.crash')
+    geometry_files[1].write_text('crashes the worker')
+
+    results = {result.geometry_file: result for result in batch.render_files(geometry_files, jobs=2)}
+    assert sorted(results) == sorted(geometry_files)
+    assert not results.pop(geometry_files[1]).ok
+    for result in results.values():
+        assert result.ok and result.output_file.exists()
+
+
+def test_sequential_batch_uses_own_session(tmp_path, mesh_paths):
+    copyfile(mesh_paths[0], tmp_path / mesh_paths[0].name)
+    geometry_files = [tmp_path / mesh_paths[0].name]
+
+    # Importing the module does not create a session, and every batch renders in a session of its own.
+    assert 'session' not in batch._worker_state
+    sessions = []
+    for _ in range(2):
+        assert all(result.ok for result in batch.render_files(geometry_files))
+        sessions.append(RenderSession.active_session)
+    assert sessions[0] is not None and sessions[0] is not sessions[1]
+
+
+def test_batch_logs_cache_stats(tmp_path, mesh_paths, caplog):
+    copyfile(mesh_paths[0], tmp_path / mesh_paths[0].name)
+    cache_dir = tmp_path / 'cache'
+    caplog.set_level(logging.INFO)
+
+    runner = CliRunner()
+    args = ['--cache-dir', str(cache_dir), 'image', '*.stl', str(tmp_path)]
+    try:
+        for _ in range(2):
+            result = runner.invoke(blenderless.cli.main, args)
+            assert result.exit_code == 0
+    finally:
+        blenderless.cli.Blenderless.cache = None
+    assert 'render cache: 0 hits, 1 misses' in caplog.text
+    assert 'render cache: 1 hits, 0 misses' in caplog.text
@@ -2,14 +2,20 @@ import pathlib
 import tempfile
 from unittest.mock import MagicMock
 
+import bpy
 import numpy as np
 import numpy.testing as npt
+import pytest
 import trimesh
+from PIL import Image
 
+from blenderless.camera import SphericalCoordinateCamera
 from blenderless.geometry import BlenderLabel
 from blenderless.geometry import Geometry
 from blenderless.geometry import Mesh
 from blenderless.geometry import PointCloud
+from blenderless.geometry import set_mesh_data
+from blenderless.light import SphericalCoordinateLight
 from blenderless.material import MaterialRGBA
 from blenderless.scene import Scene
 
@@ -26,27 +32,35 @@ def test_render_mesh(mesh_paths, num_rendering_threads):
             assert render_path.exists()
 
 
-# TODO(axelvlaminck) Please fix this.
-# def test_render_transformation():
-#     verts = np.eye(3, dtype=np.float32)
-#     faces = np.array([[0, 1, 2]])
-#     transformation = np.diag([2., 3., 4., 1.])
-#     transformation[0, 3] = 1.
+def test_render_transformation():
+    verts = np.eye(3, dtype=np.float32)
+    faces = np.array([[0, 1, 2]])
+    transformation = np.diag([2., 3., 4., 1.])
+    transformation[0, 3] = 1.
 
-#     t_mesh = trimesh.Trimesh(vertices=verts, faces=faces)
+    t_mesh = trimesh.Trimesh(vertices=verts, faces=faces)
+    b_mesh = Mesh(mesh=t_mesh, transformation=transformation)
+    mesh_data = b_mesh.object_data()
 
-#     # Use MagicMock to avoid loading bpy, makes test slightly overcomplicated
-#     bpy = MagicMock()
-#     bpy.data.meshes.new.ret_val = None
-#     b_mesh = Mesh(mesh=t_mesh, transformation=transformation)
-#     b_mesh.object_data()
+    gt_verts = np.array([[3., 0., 0.], [1., 3., 0.], [1., 0., 4.]])
 
-#     gt_verts = np.array([[3., 0., 0.], [1., 3., 0.], [1., 0., 4.]])
+    called_verts = np.zeros(len(mesh_data.vertices) * 3)
+    mesh_data.vertices.foreach_get('co', called_verts)
 
-#     # Instrument how the vertices are passed to bpy
-#     called_verts = b_mesh._object_data.from_pydata.call_args[0][0]
+    npt.assert_allclose(gt_verts, called_verts.reshape(-1, 3))
 
-#     npt.assert_allclose(gt_verts, called_verts)
+
+def test_set_mesh_data():
+    verts = np.array([[0., 0., 0.], [1., 0., 0.], [1., 1., 0.], [0., 1., 0.]])
+    faces = np.array([[0, 1, 2], [0, 2, 3]])
+
+    mesh_data = set_mesh_data(bpy.data.meshes.new(name='foo_mesh'), verts, faces)
+
+    assert len(mesh_data.vertices) == 4
+    assert len(mesh_data.edges) == 5
+    assert [tuple(p.vertices) for p in mesh_data.polygons] == [(0, 1, 2), (0, 2, 3)]
+    assert not any(p.use_smooth for p in mesh_data.polygons)
+    assert not mesh_data.validate()
 
 
 def test_render_label(num_rendering_threads):
@@ -86,15 +100,111 @@ def test_convert_points_to_octahedrons():
 
 def test_set_face_material_indices():
     obj = MagicMock()
-    obj.labels = [0, 1, 0, 1, 0]
-    obj._object_data = MagicMock()
-    obj._object_data.polygons = []
-    for i in range(5):
-        m = MagicMock()
-        m.index = i
-        obj._object_data.polygons.append(m)
+    obj.labels = [0, 1, 0, 3, -1]
+    obj._num_materials.return_value = 3
+    obj._labels_as_attribute.return_value = False
 
     Geometry._set_face_material_indices(obj)
 
-    for i in range(5):
-        assert obj._object_data.polygons[i].material_index == obj.labels[i]
+    # Labels are clamped to the available material slots.
+    name, material_indices = obj._object_data.polygons.foreach_set.call_args[0]
+    assert name == 'material_index'
+    npt.assert_array_equal(material_indices, [0, 1, 0, 2, 0])
+
+
+def test_render_labeled_mesh(num_rendering_threads, tmp_path):
+    mesh = trimesh.creation.box()
+    labels = np.arange(len(mesh.faces)) % 3
+    colormap = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255]])
+    blender_mesh = Mesh(mesh=mesh, labels=labels, colormap=colormap)
+
+    scene = Scene(num_threads=num_rendering_threads, resolution=(32, 32))
+    scene.add_object(blender_mesh)
+    scene.render(tmp_path / 'render.png')
+
+    assert len(blender_mesh._blender_object.material_slots) == 3
+    material_indices = np.zeros(len(mesh.faces), dtype=np.int32)
+    blender_mesh._object_data.polygons.foreach_get('material_index', material_indices)
+    npt.assert_array_equal(material_indices, labels)
+
+
+def test_render_point_cloud_points_mode(num_rendering_threads, tmp_path):
+    points = np.array([[-0.5, 0., 0.], [0.5, 0., 0.]])
+    point_cloud = PointCloud(points=points,
+                             point_size=0.5,
+                             mode='points',
+                             labels=np.array([0, 1]),
+                             colormap=np.array([[1., 0., 0.], [0., 0., 1.]]))
+
+    scene = Scene(num_threads=num_rendering_threads, resolution=(64, 64))
+    scene.add_object(point_cloud)
+    scene.add_object(SphericalCoordinateLight(type='SUN', energy=2, elevation=90, theta=-90, distance=2))
+    scene.add_object(SphericalCoordinateCamera(elevation=90, theta=-90, zoom_to_all=False, distance=5))
+    render_path = tmp_path / 'render.png'
+    scene.render(render_path)
+
+    # One vertex per point, spheres are created at render time.
+    assert len(point_cloud.object_data().vertices) == 2
+    assert len(point_cloud.object_data().polygons) == 0
+
+    image = np.asarray(Image.open(render_path)).astype(int)
+    opaque = image[..., 3] > 0
+    left, right = image[:, :32][opaque[:, :32]].sum(axis=0), image[:, 32:][opaque[:, 32:]].sum(axis=0)
+    assert left[0] > left[2] and right[2] > right[0]
+
+
+def test_point_cloud_points_bounds(num_rendering_threads, tmp_path):
+    point_cloud = PointCloud(points=np.array([[-1., 0., 0.], [1., 0., 0.]]), point_size=1., mode='points')
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), shadow_plane=True)
+    scene.add_object(point_cloud)
+    scene.add_object(SphericalCoordinateCamera())
+    scene.render(tmp_path / 'render.png')
+
+    # The shadow plane fits the spheres around the points, instead of only their centers.
+    plane = Scene.get_all_objects(['MESH'])[-1]
+    vertices = np.array([plane.matrix_world @ v.co for v in plane.data.vertices])
+    npt.assert_allclose(vertices[:, 2], -0.5, atol=1e-5)
+    npt.assert_allclose(vertices[:, 0].min(), -1.5, atol=1e-5)
+    npt.assert_allclose(vertices[:, 0].max(), 1.5, atol=1e-5)
+
+
+@pytest.mark.parametrize('scale', [1, 255])
+def test_render_labeled_mesh_attribute_mode(num_rendering_threads, tmp_path, scale):
+    mesh = trimesh.creation.box()
+    labels = np.arange(len(mesh.faces)) % 3
+    colormap = np.array([[1., 0., 0.], [0., 1., 0.], [0., 0., 1.]])
+
+    # Both modes read colormaps in the range 0-1 and 0-255 the same way.
+    images = {}
+    for label_mode in ('materials', 'attribute'):
+        blender_mesh = Mesh(mesh=mesh, labels=labels, colormap=colormap * scale, label_mode=label_mode)
+        scene = Scene(num_threads=num_rendering_threads, num_samples=16, resolution=(32, 32))
+        scene.add_object(blender_mesh)
+        scene.add_object(SphericalCoordinateLight(type='SUN', energy=2, azimuth=30, elevation=60))
+        scene.render(tmp_path / f'{label_mode}.png')
+        images[label_mode] = np.asarray(Image.open(tmp_path / f'{label_mode}.png'))
+
+    # A single material reads the face colors.
+    assert len(blender_mesh._blender_object.material_slots) == 1
+    attribute = blender_mesh._object_data.attributes['rgba']
+    assert attribute.domain == 'FACE'
+    colors = np.zeros(len(mesh.faces) * 4, dtype=np.float32)
+    attribute.data.foreach_get('color', colors)
+    npt.assert_allclose(colors.reshape(-1, 4)[:, :3], colormap[labels])
+    npt.assert_array_equal(images['attribute'], images['materials'])
+
+
+def test_point_cloud_octahedron_attribute_mode():
+    point_cloud = PointCloud(points=np.array([[0., 0., 0.], [1., 0., 0.]]),
+                             labels=np.array([1, 0]),
+                             colormap=np.array([[1., 0., 0.], [0., 0., 1.]]),
+                             label_mode='attribute')
+    point_cloud.blender_object()
+
+    assert len(point_cloud._blender_object.material_slots) == 1
+    colors = np.zeros(12 * 4, dtype=np.float32)
+    point_cloud._object_data.attributes['rgba'].data.foreach_get('color', colors)
+    npt.assert_allclose(colors.reshape(12, 4), np.repeat([[0., 0., 1., 1.], [1., 0., 0., 1.]], 6, axis=0))
+
+    with pytest.raises(ValueError):
+        Mesh(mesh=trimesh.creation.box(), labels=[0], colormap=np.ones((1, 3)), label_mode='slots')._num_materials()
@@ -0,0 +1,118 @@
+import importlib.metadata
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+import trimesh
+
+from blenderless import io
+from blenderless.geometry import Mesh
+from blenderless.io import FileHandler
+from blenderless.io import FileHandlerFactory
+
+
+@pytest.fixture
+def mesh():
+    return trimesh.creation.icosphere(subdivisions=2)
+
+
+def corners(mesh):
+    return np.asarray(mesh.vertices)[np.asarray(mesh.faces)]
+
+
+@pytest.mark.parametrize('suffix', ['.stl', '.ply'])
+def test_memory_mapped_load(tmp_path, mesh, suffix):
+    path = tmp_path / f'mesh{suffix}'
+    mesh.export(path)
+    loaded = FileHandlerFactory.get_loader(path).load(path)
+    assert loaded.vertices.dtype == np.float64 and loaded.faces.dtype == np.int64
+    assert len(loaded.vertices) == len(mesh.vertices)
+    npt.assert_allclose(corners(loaded), corners(mesh), atol=1e-6)
+
+
+def test_binary_stl_chunks(tmp_path, mesh):
+    path = tmp_path / 'mesh.stl'
+    mesh.export(path)
+    vertices, faces = io.load_binary_stl(path)
+    chunked_vertices, chunked_faces = io.load_binary_stl(path, chunk_size=7)
+    npt.assert_array_equal(chunked_vertices, vertices)
+    npt.assert_array_equal(chunked_faces, faces)
+
+
+def test_weld_negative_zero():
+    vertices = np.array([[0, 0, 0], [-0.0, 0, -0.0], [1, 0, 0]], dtype=np.float32) + np.float32(0)
+    unique, inverse = io.weld_vertices(vertices)
+    npt.assert_array_equal(unique, [[0, 0, 0], [1, 0, 0]])
+    npt.assert_array_equal(inverse, [0, 0, 1])
+
+
+def test_ascii_fallback(mesh_paths):
+    for path in mesh_paths:
+        if path.suffix == '.stl' and io.load_binary_stl(path) is None:
+            loaded = FileHandlerFactory.get_loader(path).load(path)
+            reference = trimesh.load(path, process=False)
+            assert len(loaded.vertices) < len(reference.vertices)  # Welded.
+            npt.assert_allclose(corners(loaded), corners(reference), atol=1e-6)
+            return
+    pytest.fail('No ASCII STL test mesh')
+
+
+def test_ascii_and_binary_stl_load_the_same_mesh(tmp_path, mesh):
+    mesh.export(tmp_path / 'binary.stl')
+    mesh.export(tmp_path / 'ascii.stl', file_type='stl_ascii')
+    binary_mesh = FileHandlerFactory.get_loader('binary.stl').load(tmp_path / 'binary.stl')
+    ascii_mesh = FileHandlerFactory.get_loader('ascii.stl').load(tmp_path / 'ascii.stl')
+    assert len(ascii_mesh.vertices) == len(mesh.vertices)
+    npt.assert_array_equal(ascii_mesh.vertices, binary_mesh.vertices)
+    npt.assert_array_equal(ascii_mesh.faces, binary_mesh.faces)
+
+
+class OffsetFileHandler(FileHandler):
+
+    @staticmethod
+    def load(path):
+        mesh = trimesh.load(path, file_type='stl', process=False)
+        return mesh.apply_translation([1, 0, 0])
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(FileHandlerFactory, '_loaders', dict(FileHandlerFactory._loaders))
+    monkeypatch.setattr(FileHandlerFactory, '_entry_points_loaded', False)
+
+
+def test_register_file_handler(tmp_path, mesh, registry):
+    path = tmp_path / 'mesh.custom'
+    mesh.export(path, file_type='stl')
+    FileHandlerFactory.register('custom', OffsetFileHandler)
+    assert FileHandlerFactory.get_loader(path) is OffsetFileHandler
+
+    loaded = Mesh(mesh_path=path.name)
+    loaded.root_dir = tmp_path
+    loaded.load()
+    npt.assert_allclose(loaded.mesh.bounds, mesh.bounds + [1, 0, 0], atol=1e-6)
+
+    with pytest.raises(TypeError):
+        FileHandlerFactory.register('.custom', trimesh.load)
+
+
+def test_entry_point_file_handler(registry, monkeypatch):
+    entry_point = importlib.metadata.EntryPoint(name='CUSTOM',
+                                                value=f'{__name__}:OffsetFileHandler',
+                                                group=FileHandlerFactory.ENTRY_POINT_GROUP)
+    broken = importlib.metadata.EntryPoint(name='broken', value='missing_module:Handler', group=entry_point.group)
+    # Not a FileHandler, it would otherwise replace the built-in STL handler.
+    invalid = importlib.metadata.EntryPoint(name='stl', value='trimesh:load', group=entry_point.group)
+    monkeypatch.setattr(importlib.metadata, 'entry_points', lambda group: [entry_point, broken, invalid])
+    assert FileHandlerFactory.get_loader('mesh.custom') is OffsetFileHandler
+    assert FileHandlerFactory.get_loader('mesh.broken').__name__ == 'TrimeshFileHandler'
+    assert FileHandlerFactory.get_loader('mesh.stl').__name__ == 'StlFileHandler'
+
+
+def test_scene_formats(tmp_path):
+    scene = trimesh.Scene([trimesh.creation.box(), trimesh.creation.icosphere().apply_translation([3, 0, 0])])
+    path = tmp_path / 'scene.glb'
+    scene.export(path)
+    loaded = FileHandlerFactory.get_loader(path).load(path)
+    assert isinstance(loaded, trimesh.Trimesh)
+    assert len(loaded.faces) == sum(len(geometry.faces) for geometry in scene.geometry.values())
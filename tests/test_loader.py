@@ -0,0 +1,87 @@
+import gc
+import pathlib
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+import trimesh
+
+from blenderless import loader
+from blenderless.geometry import Mesh
+from blenderless.io import FileHandlerFactory
+from blenderless.io import StlFileHandler
+from blenderless.loader import MeshLoader
+
+
+def new_meshes(mesh_paths, copies=3):
+    meshes = [Mesh(mesh_path=str(mesh_path.absolute())) for mesh_path in mesh_paths for _ in range(copies)]
+    for mesh in meshes:
+        mesh.root_dir = pathlib.Path()
+    return meshes
+
+
+def test_load_in_threads(mesh_paths):
+    mesh_loader = MeshLoader()
+    meshes = new_meshes(mesh_paths)
+    mesh_loader.load(meshes, num_threads=4)
+    assert mesh_loader._process_pool is None
+    for mesh in meshes:
+        assert isinstance(mesh.mesh, trimesh.Trimesh) and len(mesh.mesh.faces) > 0
+
+
+def test_load_in_shared_memory(mesh_paths, monkeypatch):
+    monkeypatch.setattr(loader, 'PROCESS_POOL_MIN_BYTES', 0)
+    monkeypatch.setattr(StlFileHandler, 'releases_gil', False)
+    mesh_loader = MeshLoader()
+    try:
+        meshes = new_meshes(mesh_paths)
+        mesh_loader.load(meshes, num_threads=2)
+        process_pool = mesh_loader._process_pool
+        assert process_pool is not None
+
+        for mesh in meshes:
+            expected = FileHandlerFactory.get_loader(mesh.mesh_path).load(mesh.mesh_path)
+            npt.assert_array_equal(mesh.mesh.vertices, expected.vertices)
+            npt.assert_array_equal(mesh.mesh.faces, expected.faces)
+            # The arrays view the shared memory block instead of owning a copy.
+            assert not np.asarray(mesh.mesh.vertices).flags.owndata
+
+        # Workers are reused by the next load.
+        mesh_loader.load(new_meshes(mesh_paths), num_threads=2)
+        assert mesh_loader._process_pool is process_pool
+    finally:
+        mesh_loader.shutdown()
+
+
+def test_not_thread_safe_loaders_use_processes(mesh_paths, monkeypatch):
+    monkeypatch.setattr(StlFileHandler, 'thread_safe', False)
+    mesh_loader = MeshLoader()
+    try:
+        meshes = new_meshes(mesh_paths, copies=1)
+        mesh_loader.load(meshes, num_threads=2)
+        assert mesh_loader._process_pool is not None
+        for mesh in meshes:
+            assert not np.asarray(mesh.mesh.vertices).flags.owndata
+    finally:
+        mesh_loader.shutdown()
+
+
+def test_failed_load_releases_shared_memory(mesh_paths, tmp_path, monkeypatch):
+    monkeypatch.setattr(StlFileHandler, 'thread_safe', False)
+    shared_memory_dir = pathlib.Path('/dev/shm')
+    blocks = set(shared_memory_dir.iterdir())
+    mesh_loader = MeshLoader()
+    try:
+        meshes = new_meshes(mesh_paths, copies=2)
+        meshes.insert(1, Mesh(mesh_path=str(tmp_path / 'missing.stl')))
+        meshes[1].root_dir = pathlib.Path()
+
+        with pytest.raises(FileNotFoundError):
+            mesh_loader.load(meshes, num_threads=2)
+        for mesh in meshes[:1] + meshes[2:]:
+            assert isinstance(mesh.mesh, trimesh.Trimesh)
+        del meshes, mesh
+        gc.collect()
+        assert set(shared_memory_dir.iterdir()) == blocks
+    finally:
+        mesh_loader.shutdown()
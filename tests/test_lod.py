@@ -0,0 +1,130 @@
+import logging
+
+import numpy as np
+import numpy.testing as npt
+import pytest
+import trimesh
+
+from blenderless import lod
+from blenderless.geometry import link_mesh_instances
+from blenderless.geometry import Mesh
+from blenderless.scene import Scene
+
+
+@pytest.mark.parametrize('max_faces', [100, 1000, 5000])
+def test_simplify(max_faces):
+    mesh = trimesh.creation.icosphere(subdivisions=6)
+    vertices, faces, face_index = lod.simplify(mesh.vertices, mesh.faces, max_faces)
+
+    assert 0 < len(faces) <= max_faces
+    assert len(face_index) == len(faces)
+    assert faces.max() == len(vertices) - 1
+    simplified = trimesh.Trimesh(vertices, faces, process=False)
+    npt.assert_allclose(simplified.bounds, mesh.bounds, atol=0.05)
+
+
+def test_simplify_keeps_corners():
+    mesh = trimesh.creation.box(extents=(1, 2, 3)).subdivide().subdivide().subdivide().subdivide()
+    vertices, faces, _ = lod.simplify(mesh.vertices, mesh.faces, 500)
+
+    assert len(faces) <= 500
+    # Quadrics place clusters on the intersection of the box faces.
+    npt.assert_allclose(trimesh.Trimesh(vertices, faces).volume, 6, rtol=1e-3)
+
+
+def test_simplify_keeps_open_borders():
+    # Flat grid of 2 * 200 * 200 faces with an open border.
+    vertices = np.stack(np.meshgrid(np.linspace(0, 1, 201), np.linspace(0, 1, 201), [0], indexing='ij'), axis=-1)
+    grid = np.arange(201 * 201).reshape(201, 201)
+    corners = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+    faces = np.concatenate([np.stack(corners[:3], axis=-1), np.stack(corners[::2] + corners[3:], axis=-1)])
+    vertices, faces, _ = lod.simplify(vertices.reshape(-1, 3), faces.reshape(-1, 3), 1000)
+
+    assert len(faces) <= 1000
+    npt.assert_allclose(trimesh.Trimesh(vertices, faces).bounds, [[0, 0, 0], [1, 1, 0]], atol=1e-3)
+
+
+def test_simplify_within_budget():
+    mesh = trimesh.creation.icosphere(subdivisions=2)
+    vertices, faces, face_index = lod.simplify(mesh.vertices, mesh.faces, 10000)
+    npt.assert_array_equal(vertices, mesh.vertices)
+    npt.assert_array_equal(faces, mesh.faces)
+    npt.assert_array_equal(face_index, np.arange(len(mesh.faces)))
+
+
+def test_simplify_does_not_drop_faces(monkeypatch):
+    cluster_faces = lod._cluster_faces
+    results = []
+
+    def slowly_growing_cluster_faces(vertices, faces, cell_size):
+        # Shrink the first cells, which takes more steps to reach the budget.
+        results.append(cluster_faces(vertices, faces, cell_size * (1e-4 if len(results) < 10 else 1)))
+        return results[-1]
+
+    monkeypatch.setattr(lod, '_cluster_faces', slowly_growing_cluster_faces)
+    mesh = trimesh.creation.icosphere(subdivisions=4)
+    _, faces, face_index = lod.simplify(mesh.vertices, mesh.faces, 300)
+    assert len(faces) <= 300
+    npt.assert_array_equal(face_index, results[-1][3])  # All faces of the last clustering are kept.
+
+
+def test_mesh_instance_key():
+    box = trimesh.creation.box()
+    key = Mesh(mesh=box).instance_key()
+    assert key == Mesh(mesh=box).instance_key()
+    assert key != Mesh(mesh=box, max_faces=5).instance_key()
+    assert key != Mesh(mesh=box, use_lod=False).instance_key()
+
+
+def test_face_budgets():
+    meshes = [
+        Mesh(mesh=trimesh.creation.box(extents=(10, 10, 10))),
+        Mesh(mesh=trimesh.creation.box(), xyz=(20, 0, 0)),
+        Mesh(mesh=trimesh.creation.box(), xyz=(-20, 0, 0), use_lod=False),
+        Mesh(mesh=trimesh.creation.box(), max_faces=5),
+    ]
+    assert lod.face_budgets(meshes, (100, 100)) == [None, None, None, 5]
+
+    budgets = lod.face_budgets(meshes, (100, 100), faces_per_pixel=2)
+    assert budgets[0] > budgets[1] > 5
+    assert budgets[2] is None
+    assert budgets[3] == 5
+
+
+def test_instance_budgets(monkeypatch):
+    bar = trimesh.creation.box(extents=(10, 1, 1)).subdivide().subdivide().subdivide()
+    rotation = (np.cos(np.pi / 8), 0, 0, np.sin(np.pi / 8))
+    meshes = [Mesh(mesh=bar), Mesh(mesh=bar, xyz=(0, 20, 0), quaternion=rotation)]
+    unique_meshes = link_mesh_instances(meshes)
+    assert len(unique_meshes) == 1 and unique_meshes[0] is meshes[0]
+
+    budgets = lod.face_budgets(meshes, (16, 16), faces_per_pixel=1)
+    assert budgets[1] > budgets[0]
+    simplified = []
+    monkeypatch.setattr(Mesh, 'simplify', lambda mesh, max_faces: simplified.append((mesh, max_faces)) or max_faces)
+    lod.simplify_meshes(meshes, (16, 16), faces_per_pixel=1)
+    # The mesh is simplified once, with the budget of the placement that covers most of the image.
+    assert len(simplified) == 1
+    assert simplified[0][0] is meshes[0] and simplified[0][1] == budgets[1]
+
+
+def test_scene_lod(num_rendering_threads, tmp_path, caplog):
+    sphere = trimesh.creation.icosphere(subdivisions=6)
+    labels = (sphere.triangles_center[:, 2] > 0).astype(int)
+    mesh = Mesh(mesh=sphere, labels=labels, colormap=np.array([[1, 0, 0], [0, 0, 1]]))
+    scene = Scene(num_threads=num_rendering_threads, resolution=(32, 32), lod_faces_per_pixel=1)
+    scene.add_object(mesh)
+
+    with caplog.at_level(logging.INFO, logger='blenderless.lod'):
+        scene.render(tmp_path / 'out.png')
+    assert f'from {len(sphere.faces)} to' in caplog.text
+
+    data = mesh._object_data
+    assert len(data.polygons) <= 32 * 32
+    material_indices = np.zeros(len(data.polygons), dtype=np.int32)
+    data.polygons.foreach_get('material_index', material_indices)
+    centers = np.zeros((len(data.polygons), 3))
+    data.polygons.foreach_get('center', centers.reshape(-1))
+    # Faces keep the label of the face they originate from.
+    away_from_boundary = np.abs(centers[:, 2]) > 0.2
+    npt.assert_array_equal(material_indices[away_from_boundary], centers[away_from_boundary, 2] > 0)
@@ -1,8 +1,14 @@
+import bpy
 import numpy as np
 import numpy.testing as npt
+import trimesh
 
+from blenderless.geometry import Mesh
+from blenderless.material import material_registry
 from blenderless.material import MaterialFromName
 from blenderless.material import MaterialRGBA
+from blenderless.scene import RenderSession
+from blenderless.scene import Scene
 
 
 def test_create_material_from_name():
@@ -24,7 +30,7 @@ def test_material_from_colormap():
 
     for i, rgbamat in enumerate(matlist):
         assert isinstance(rgbamat, MaterialRGBA)
-        npt.assert_allclose(rgbamat.rgba[:3], colormap[i, :])
+        npt.assert_allclose(rgbamat.rgba, np.append(colormap[i, :] / 255, 1))
         assert rgbamat.material_name == f'label{i}'
 
     # With alphas
@@ -33,4 +39,53 @@ def test_material_from_colormap():
 
     for i, rgbamat in enumerate(matlist):
         assert isinstance(rgbamat, MaterialRGBA)
-        npt.assert_allclose(rgbamat.rgba, colormap[i, :])
+        npt.assert_allclose(rgbamat.rgba, colormap[i, :] / 255)
+
+    # Colormaps in the range 0-1 are kept.
+    colormap = np.array([[0.5, 0, 0], [0, 0.5, 0]])
+    matlist = MaterialRGBA.material_list_from_colormap(colormap)
+    npt.assert_allclose([rgbamat.rgba for rgbamat in matlist], [[0.5, 0, 0, 1], [0, 0.5, 0, 1]])
+
+
+def test_material_registry():
+    blender_materials = [MaterialRGBA(rgba=(1, 0, 0, 1), material_name='red').blender_material() for _ in range(3)]
+    assert blender_materials[0] == blender_materials[1] == blender_materials[2]
+    assert MaterialRGBA(rgba=(0, 1, 0, 1), material_name='red').blender_material() != blender_materials[0]
+
+    bpy.data.materials.new('base').use_nodes = True
+    copies = [MaterialFromName(material_name='base', rgba=(0, 0, 255, 1)).blender_material() for _ in range(2)]
+    assert copies[0] == copies[1] != bpy.data.materials['base']
+    assert MaterialFromName(material_name='base').blender_material() == bpy.data.materials['base']
+
+    # Removed materials are created again.
+    bpy.data.batch_remove(blender_materials[:1])
+    blender_material = MaterialRGBA(rgba=(1, 0, 0, 1), material_name='red').blender_material()
+    npt.assert_allclose(blender_material.diffuse_color, (1, 0, 0, 1))
+
+
+def test_colormap_materials_are_shared(num_rendering_threads, tmp_path):
+    session = RenderSession()
+    colormap = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255]])
+    for n in range(2):
+        scene = Scene(num_threads=num_rendering_threads, num_samples=1, resolution=(16, 16))
+        for offset in range(4):
+            box = trimesh.creation.box().apply_translation([2 * offset, 0, 0])
+            scene.add_object(Mesh(mesh=box, labels=np.arange(12) % 3, colormap=colormap))
+        scene.render(tmp_path / f'{n}.png', session=session)
+        # One material per color for all objects and renders.
+        assert len([material for material in bpy.data.materials if material.name.startswith('label')]) == 3
+
+
+def test_material_registry_is_bounded(num_rendering_threads, tmp_path, monkeypatch):
+    monkeypatch.setattr(material_registry, 'max_size', 4)
+    session = RenderSession()
+    num_materials = []
+    for n in range(8):
+        scene = Scene(num_threads=num_rendering_threads, num_samples=1, resolution=(16, 16))
+        scene.add_object(Mesh(mesh=trimesh.creation.box(), material=MaterialRGBA(rgba=(n / 8, 0, 0, 1))))
+        scene.render(tmp_path / f'{n}.png', session=session)
+        num_materials.append(len(bpy.data.materials))
+
+    # Materials of the evicted colors are removed with their job.
+    assert len(material_registry.blender_materials()) <= 4
+    assert num_materials[4:] == [num_materials[3]] * 4
@@ -0,0 +1,56 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from blenderless import poses
+from blenderless.camera import cameras_from_poses
+from blenderless.camera import SphericalCoordinateCamera
+
+
+def test_spherical_poses_match_cameras():
+    rng = np.random.default_rng(0)
+    azimuth, elevation = rng.uniform(-360, 360, 100), rng.uniform(-89, 89, 100)
+    distance, theta = rng.uniform(0.5, 10, 100), rng.uniform(-180, 180, 100)
+    positions, quaternions = poses.spherical_poses(azimuth, elevation, distance, theta)
+    assert positions.shape == (100, 3) and quaternions.shape == (100, 4)
+
+    for n in range(100):
+        camera = SphericalCoordinateCamera(azimuth=azimuth[n],
+                                           elevation=elevation[n],
+                                           distance=distance[n],
+                                           theta=theta[n])
+        npt.assert_allclose(positions[n], camera.xyz, atol=1e-12)
+        npt.assert_allclose(quaternions[n], camera.quaternion, atol=1e-12)
+
+
+@pytest.mark.parametrize('num_frames', [1, 5, 7, 60])
+def test_turntable(num_frames):
+    positions, quaternions = poses.turntable(num_frames, elevation=20, distance=2)
+    assert len(positions) == len(quaternions) == num_frames
+    azimuth = np.degrees(np.arctan2(positions[:, 1], positions[:, 0])) % 360
+    npt.assert_allclose(azimuth, np.arange(num_frames) * 360 / num_frames, atol=1e-9)
+    npt.assert_allclose(positions[:, 2], 2 * np.sin(np.radians(20)))
+
+
+def test_fibonacci_sphere():
+    positions, quaternions = poses.fibonacci_sphere(1000, distance=3)
+    npt.assert_allclose(np.linalg.norm(positions, axis=1), 3)
+    npt.assert_allclose(np.linalg.norm(quaternions, axis=1), 1)
+    # About uniform: every octant has about an eighth of the views.
+    octants = np.unique((positions > 0) @ [1, 2, 4], return_counts=True)[1]
+    assert len(octants) == 8 and np.all(np.abs(octants - 125) < 10)
+
+
+def test_grid():
+    positions, _ = poses.grid(azimuths=[0, 90, 180, 270], elevations=[0, 45])
+    assert positions.shape == (8, 3)
+    npt.assert_allclose(positions[:4, 2], 0, atol=1e-12)
+    npt.assert_allclose(positions[1], [0, 1, 0], atol=1e-12)
+
+
+def test_cameras_from_poses():
+    cameras = cameras_from_poses(*poses.turntable(3), camera_type='PERSP')
+    assert len(cameras) == 3 and cameras[0].camera_type == 'PERSP'
+    reference = SphericalCoordinateCamera(azimuth=120, elevation=30)
+    npt.assert_allclose(cameras[1].xyz, reference.xyz)
+    npt.assert_allclose(cameras[1].quaternion, reference.quaternion, atol=1e-12)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from PIL import Image
+
+from blenderless.camera import BlenderCamera
+from blenderless.geometry import Mesh
+from blenderless.profiling import chrome_trace
+from blenderless.profiling import RenderProfile
+from blenderless.scene import RenderSession
+from blenderless.scene import Scene
+
+
+def test_profile_stages():
+    profile = RenderProfile('test')
+    with profile.stage('a', value=1):
+        pass
+    with profile.stage('a'):
+        pass
+    with profile.stage('b'):
+        pass
+
+    report = profile.report()
+    assert [stage['name'] for stage in report['stages']] == ['a', 'a', 'b']
+    assert report['stages'][0]['args'] == {'value': 1}
+    assert set(report['totals']) == {'a', 'b'}
+    assert report['peak_rss_mb'] > 0
+    assert all(stage['rss_start_mb'] > 0 and stage['rss_end_mb'] > 0 for stage in report['stages'])
+    json.dumps(report)
+
+    trace = chrome_trace([report, report])
+    assert len(trace['traceEvents']) == 8
+    assert trace['traceEvents'][1]['args']['rss_start_mb'] == report['stages'][0]['rss_start_mb']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in trace['traceEvents'])
+    assert trace['otherData']['totals']['b'] == 2 * report['totals']['b']
+
+
+@pytest.mark.parametrize('multiview', [False, True])
+def test_profile_render(mesh_paths, tmp_path, multiview):
+    scene = Scene(num_threads=2, num_samples=4, multiview=multiview)
+    scene.add_object(Mesh(mesh_path=mesh_paths[0]))
+    scene.add_object(BlenderCamera())
+    scene.add_object(BlenderCamera())
+
+    profile = RenderProfile()
+    render_files = scene.render(tmp_path / 'out.png', profile=profile)
+    report = profile.report()
+
+    for stage in ('factory_reset', 'open_preset', 'load_meshes', 'add_objects', 'set_cameras', 'render'):
+        assert stage in report['totals']
+    renders = [stage for stage in report['stages'] if stage['name'] == 'render']
+    # With multiview both cameras are rendered, and their images written, in a single render.
+    assert len(renders) == (1 if multiview else 2)
+    assert renders[0]['args']['samples'] == 4
+    assert report['info']['num_cameras'] == 2
+    assert report['info']['meshes'][0]['num_faces'] > 0
+    for render_file in render_files:
+        assert Image.open(render_file).size == (512, 512)
+
+    trace_path = tmp_path / 'trace.json'
+    profile.save_chrome_trace(trace_path)
+    trace = json.loads(trace_path.read_text())
+    assert len(trace['traceEvents']) == len(report['stages']) + 1
+
+
+def test_profile_session(mesh_paths, tmp_path):
+    session = RenderSession()
+    for n in range(2):
+        scene = Scene(num_threads=2)
+        scene.add_object(Mesh(mesh_path=mesh_paths[0]))
+        profile = RenderProfile()
+        scene.render(tmp_path / f'out_{n}.png', session=session, profile=profile)
+        assert {'begin_job', 'end_job', 'render'} <= set(profile.report()['totals'])
+
+
+def test_profile_stage_memory():
+    profile = RenderProfile()
+    with profile.stage('allocate'):
+        data = bytearray(256 << 20)
+    del data
+    with profile.stage('after'):
+        pass
+
+    allocate, after = profile.report()['stages']
+    # The current RSS drops again after the allocation is freed, the process peak does not.
+    assert allocate['rss_end_mb'] - allocate['rss_start_mb'] > 200
+    assert after['rss_start_mb'] < allocate['rss_end_mb'] - 200
+    assert after['peak_rss_mb'] - after['rss_start_mb'] > 200
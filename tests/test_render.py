@@ -1,4 +1,7 @@
+import numpy as np
+
 from blenderless import Blenderless
+from blenderless import RenderOptions
 
 
 def test_render(mesh_paths, tmp_path, num_rendering_threads):
@@ -8,8 +11,39 @@ def test_render(mesh_paths, tmp_path, num_rendering_threads):
     assert render_path == dest_path
 
 
+def test_render_to_memory(mesh_paths, num_rendering_threads):
+    out = np.zeros((16, 16, 4), dtype=np.uint8)
+    image = Blenderless.render(mesh_paths[0],
+                               options=RenderOptions(output='array', out=out),
+                               resolution=(16, 16),
+                               num_threads=num_rendering_threads)
+    assert image.shape == (16, 16, 4) and image.dtype == np.uint8
+    assert np.shares_memory(image, out) and out.any()
+
+    png = Blenderless.render(mesh_paths[0],
+                             options=RenderOptions(output='png'),
+                             resolution=(16, 16),
+                             num_threads=num_rendering_threads)
+    assert png.startswith(b'\x89PNG')
+
+
 def test_gif(mesh_paths, tmp_path, num_rendering_threads):
     dest_path = tmp_path / 'out.gif'
-    gif_path = Blenderless.gif(mesh_paths[0], dest_path, frames=5, num_threads=num_rendering_threads)
+    gif_path = Blenderless.gif(mesh_paths[0],
+                               dest_path,
+                               options=RenderOptions(frames=5),
+                               num_threads=num_rendering_threads)
     assert dest_path.exists()
     assert gif_path == dest_path
+
+
+def test_render_many(mesh_paths, tmp_path, num_rendering_threads):
+    results = dict(
+        Blenderless.render_many(mesh_paths,
+                                str(tmp_path / '{stem}.png'),
+                                resolution=(16, 16),
+                                num_samples=1,
+                                num_threads=num_rendering_threads))
+    assert list(results) == mesh_paths
+    for mesh_path, render_path in results.items():
+        assert render_path == tmp_path / f'{mesh_path.stem}.png' and render_path.exists()
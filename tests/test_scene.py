@@ -1,7 +1,25 @@
+import gc
+import io
+import weakref
+
+import bpy
+import numpy as np
+import numpy.testing as npt
 import pytest
+import trimesh
+from bpy_extras.object_utils import world_to_camera_view
+from mathutils import Vector
 from PIL import Image
+from PIL import ImageSequence
 
+from blenderless import utils
 from blenderless.camera import BlenderCamera
+from blenderless.camera import SphericalCoordinateCamera
+from blenderless.geometry import Mesh
+from blenderless.light import SphericalCoordinateLight
+from blenderless.material import MaterialRGBA
+from blenderless.scene import QUALITY_PRESETS
+from blenderless.scene import RenderSession
 from blenderless.scene import Scene
 
 
@@ -41,6 +59,146 @@ def test_set_resolution(num_rendering_threads, tmp_path):
     assert y == height
 
 
+def test_render_to_memory(num_rendering_threads, tmp_path):
+    num_cameras = 2
+
+    def box_scene():
+        scene = Scene(num_threads=num_rendering_threads, resolution=(16, 8))
+        scene.add_object(Mesh(mesh=trimesh.creation.box()))
+        for azimuth in range(0, 360, 360 // num_cameras):
+            scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+        return scene
+
+    out = np.zeros((num_cameras, 8, 16, 4), dtype=np.uint8)
+    images = box_scene().render_to_memory('array', out=out)
+    assert len(images) == num_cameras
+    assert all(np.shares_memory(image, out) for image in images)
+    assert out[:, :, :, 3].max() == 255
+
+    render_paths = box_scene().render(tmp_path / 'out.png')
+    for image, render_path in zip(images, render_paths):
+        npt.assert_array_equal(image, np.asarray(Image.open(render_path)))
+
+    for png in box_scene().render_to_memory('png'):
+        assert png.startswith(b'\x89PNG')
+    for webp in box_scene().render_to_memory('webp'):
+        assert webp.startswith(b'RIFF') and webp[8:12] == b'WEBP'
+        with Image.open(io.BytesIO(webp)) as im:
+            assert im.size == (16, 8)
+
+    with pytest.raises(ValueError):
+        box_scene().render_to_memory('jpeg')
+
+
+@pytest.mark.parametrize('preset', [False, True])
+def test_multiview(num_rendering_threads, test_data_path, tmp_path, preset):
+    num_cameras = 3
+
+    def box_scene(multiview):
+        scene = Scene(num_threads=num_rendering_threads,
+                      resolution=(32, 32),
+                      num_samples=4,
+                      preset_path=(test_data_path / 'preset.blend').absolute() if preset else None,
+                      multiview=multiview)
+        scene.add_object(Mesh(mesh=trimesh.creation.box()))
+        for azimuth in range(0, 360, 360 // num_cameras):
+            scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+        return scene
+
+    render_paths = box_scene(multiview=True).render(tmp_path / 'multiview.png')
+    assert len(render_paths) == num_cameras
+    assert sorted(tmp_path.iterdir()) == sorted(render_paths)
+    assert len(bpy.context.scene.timeline_markers) == 0
+
+    images = box_scene(multiview=False).render_to_memory('array')
+    for image, render_path in zip(images, render_paths):
+        npt.assert_array_equal(image, np.asarray(Image.open(render_path)))
+    assert not np.array_equal(images[0], images[1])
+
+
+def test_multiview_into_new_directory(num_rendering_threads, tmp_path):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), num_samples=1, multiview=True)
+    scene.add_object(Mesh(mesh=trimesh.creation.box()))
+    for azimuth in (0, 90):
+        scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+
+    render_paths = scene.render(tmp_path / 'new' / 'sub' / 'out.png')
+    assert len(render_paths) == 2
+    assert sorted((tmp_path / 'new' / 'sub').iterdir()) == sorted(render_paths)
+
+
+@pytest.mark.parametrize('use_persistent_data', [False, True])
+def test_multiview_keeps_persistent_data(num_rendering_threads, tmp_path, monkeypatch, use_persistent_data):
+    set_rendering_props = Scene._set_rendering_props
+
+    def set_persistent_data(self, blender_scene):
+        set_rendering_props(self, blender_scene)
+        blender_scene.render.use_persistent_data = use_persistent_data
+
+    monkeypatch.setattr(Scene, '_set_rendering_props', set_persistent_data)
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), num_samples=1, multiview=True)
+    scene.add_object(Mesh(mesh=trimesh.creation.box()))
+    for azimuth in (0, 90):
+        scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+
+    scene.render(tmp_path / 'out.png')
+    assert bpy.context.scene.render.use_persistent_data == use_persistent_data
+
+
+@pytest.mark.parametrize('quality', ['draft', 'thumbnail'])
+def test_quality_presets(num_rendering_threads, tmp_path, quality):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), quality=quality)
+    scene.add_object(Mesh(mesh=trimesh.creation.box()))
+    assert scene.render(tmp_path / 'out.png')[0].exists()
+    for name, value in QUALITY_PRESETS[quality].items():
+        if hasattr(bpy.context.scene.cycles, name):
+            assert getattr(bpy.context.scene.cycles, name) == pytest.approx(value)
+
+    # Explicit samples take precedence over the preset.
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), quality=quality, num_samples=2)
+    scene.render(tmp_path / 'out.png')
+    assert bpy.context.scene.cycles.samples == 2
+
+    with pytest.raises(ValueError):
+        Scene(quality='unknown')
+
+
+def test_quality_preset_skips_missing_settings(num_rendering_threads, tmp_path, monkeypatch):
+    # Stands in for settings of newer Blender versions, e.g. denoising_quality which needs Blender 4.1.
+    preset = {'samples': 3, 'denoising_setting_of_a_future_blender': True}
+    monkeypatch.setitem(QUALITY_PRESETS, 'draft', preset)
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), quality='draft')
+    scene.add_object(Mesh(mesh=trimesh.creation.box()))
+    assert scene.render(tmp_path / 'out.png')[0].exists()
+    assert bpy.context.scene.cycles.samples == 3
+
+
+def test_fast_preview(num_rendering_threads, tmp_path):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(64, 64), fast_preview=True)
+    box = trimesh.creation.box()
+    scene.add_object(Mesh(mesh=box, labels=np.arange(len(box.faces)) % 2, colormap=np.array([[1, 0, 0], [0, 1, 0]])))
+    scene.add_object(SphericalCoordinateCamera(azimuth=30, elevation=40))
+    image = np.asarray(Image.open(scene.render(tmp_path / 'out.png')[0])).astype(int)
+
+    assert bpy.context.scene.render.engine == 'BLENDER_WORKBENCH'
+    foreground = image[image[:, :, 3] == 255]
+    red = (foreground[:, 0] > 2 * foreground[:, 1]) & (foreground[:, 0] > 2 * foreground[:, 2])
+    green = (foreground[:, 1] > 2 * foreground[:, 0]) & (foreground[:, 1] > 2 * foreground[:, 2])
+    assert red.sum() > 100 and green.sum() > 100
+    assert image[0, 0, 3] == 0
+
+
+def test_fast_preview_without_shadow_plane(num_rendering_threads, tmp_path):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(32, 32), fast_preview=True, shadow_plane=True)
+    scene.add_object(Mesh(mesh=trimesh.creation.box()))
+    scene.add_object(SphericalCoordinateCamera(azimuth=30, elevation=40))
+    image = np.asarray(Image.open(scene.render(tmp_path / 'out.png')[0]))
+
+    assert len(Scene.get_all_objects(['MESH'])) == 1
+    # The corners stay transparent, where a shadow plane that is larger than the box would be visible.
+    assert image[[0, 0, -1, -1], [0, -1, 0, -1], 3].max() == 0
+
+
 def test_load_scene_from_config(example_config_path, tmp_path):
     scene = Scene.from_config(example_config_path)
     render_path = tmp_path / 'out.png'
@@ -57,3 +215,228 @@ def test_render_gif(new_scene, tmp_path):
     gif_path = tmp_path / 'out.gif'
     new_scene.render_gif(gif_path)
     gif_path.exists()
+
+
+@pytest.mark.parametrize('suffix', ['.gif', '.png', '.webp'])
+def test_render_animation_formats(num_rendering_threads, tmp_path, suffix):
+    num_cameras = 3
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 8))
+    scene.add_object(Mesh(mesh=trimesh.creation.box(extents=(3, 1, 1))))
+    for azimuth in range(0, 360, 360 // num_cameras):
+        scene.add_object(SphericalCoordinateCamera(azimuth=azimuth))
+
+    animation_path = scene.render_gif(tmp_path / f'out{suffix}', duration=1.5)
+
+    with Image.open(animation_path) as im:
+        assert im.size == (16, 8)
+        assert im.n_frames == num_cameras
+        im.seek(1)
+        im.load()
+        assert im.info['duration'] == 500
+
+
+@pytest.mark.parametrize('suffix', ['.gif', '.png', '.webp'])
+def test_write_animation_streams_frames(tmp_path, suffix):
+    num_frames = 6
+    filepath = tmp_path / f'out{suffix}'
+    rng = np.random.default_rng(0)
+    frame_refs = []
+
+    def frame_iterator():
+        for _ in range(num_frames):
+            # At most the first frame and the frame that is being encoded are kept alive.
+            gc.collect()
+            assert sum(ref() is not None for ref in frame_refs) <= 2
+            frame = rng.integers(0, 255, (8, 16, 4), dtype=np.uint8)
+            frame_refs.append(weakref.ref(frame))
+            yield frame
+
+    utils.write_animation(filepath, frame_iterator(), frame_duration=0.25)
+    with Image.open(filepath) as im:
+        assert im.n_frames == num_frames
+        im.seek(1)
+        im.load()
+        assert im.info['duration'] == 250
+
+
+@pytest.mark.parametrize('suffix', ['.png', '.webp'])
+def test_write_animation(tmp_path, suffix):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (8, 16, 4), dtype=np.uint8) for _ in range(6)]
+    # Transparent pixels must not show the previous frame.
+    frames[1][:, :, 3] = 0
+    utils.write_animation(tmp_path / f'out{suffix}', iter(frames), frame_duration=0.25)
+    with Image.open(tmp_path / f'out{suffix}') as im:
+        assert im.n_frames == len(frames)
+        if suffix == '.png':  # Lossless.
+            for n, frame in enumerate(ImageSequence.Iterator(im)):
+                npt.assert_array_equal(np.asarray(frame.convert('RGBA')), frames[n])
+
+    with pytest.raises(ValueError):
+        utils.write_animation(tmp_path / f'empty{suffix}', iter([]), frame_duration=0.25)
+    with pytest.raises(ValueError):
+        utils.write_animation(tmp_path / f'sizes{suffix}', iter([frames[0], frames[0][:4]]), frame_duration=0.25)
+
+
+def test_write_animation_gif(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (8, 16, 3), dtype=np.uint8) for _ in range(6)]
+    utils.write_animation(tmp_path / 'out.gif', iter(frames), frame_duration=0.25)
+    with Image.open(tmp_path / 'out.gif') as im:
+        assert im.info['loop'] == 0
+        # Frames with at most 256 colors keep their colors, up to the rounding of ffmpeg's palette generation.
+        for n, frame in enumerate(ImageSequence.Iterator(im)):
+            npt.assert_allclose(np.asarray(frame.convert('RGB')), frames[n], atol=1)
+
+    with pytest.raises(ValueError):
+        utils.write_animation(tmp_path / 'empty.gif', iter([]), frame_duration=0.25)
+
+
+def test_render_session(num_rendering_threads, test_data_path, tmp_path):
+    session = RenderSession()
+    num_datablocks = []
+    for n in range(3):
+        scene = Scene(num_threads=num_rendering_threads,
+                      num_samples=1,
+                      resolution=(32, 32),
+                      preset_path=test_data_path / 'preset.blend',
+                      preset_scene='dark')
+        scene.add_object(Mesh(mesh=trimesh.creation.box()))
+        render_path = tmp_path / f'{n}.png'
+        scene.render(render_path, session=session)
+        assert render_path.exists()
+        num_datablocks.append(sum(len(getattr(bpy.data, data_type)) for data_type in RenderSession.JOB_DATA_TYPES))
+
+    # Nothing should leak between jobs and the preset is only loaded once.
+    assert num_datablocks[0] == num_datablocks[1] == num_datablocks[2]
+    assert RenderSession.active_session is session
+
+
+def test_zoom_to_all_orthographic(num_rendering_threads, tmp_path):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(20, 10))
+    box = trimesh.creation.box(extents=(2, 1, 1))
+    box.apply_translation((3, 0, -5))
+    scene.add_object(Mesh(mesh=box))
+    camera = BlenderCamera()
+    scene.add_object(camera)
+    scene.render(tmp_path / 'out.png')
+
+    # Camera looks along -z, is centered on the box and its width fits the box.
+    npt.assert_allclose(camera._blender_object.data.ortho_scale, 2, rtol=1e-5)
+    npt.assert_allclose(camera._blender_object.location[:2], (3, 0), atol=1e-5)
+
+
+@pytest.mark.parametrize('azimuth', [0, 30, 135])
+def test_zoom_to_all_perspective(num_rendering_threads, tmp_path, azimuth):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(20, 16))
+    box = trimesh.creation.box(extents=(1, 2, 3))
+    scene.add_object(Mesh(mesh=box))
+    camera = SphericalCoordinateCamera(azimuth=azimuth, elevation=30, camera_type='PERSP')
+    scene.add_object(camera)
+    scene.render(tmp_path / 'out.png')
+
+    blender_scene = bpy.context.scene
+    coords = np.array([world_to_camera_view(blender_scene, camera._blender_object, Vector(v)) for v in box.vertices])
+
+    # All corners are in view and touch the border of the frame on at least one side.
+    assert np.all(coords[:, 2] > 0)
+    assert np.all(coords[:, :2] > -1e-4) and np.all(coords[:, :2] < 1 + 1e-4)
+    assert np.isclose(coords[:, :2].min(), 0, atol=1e-4) or np.isclose(coords[:, :2].max(), 1, atol=1e-4)
+
+
+def test_shadow_plane(num_rendering_threads, tmp_path):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16), shadow_plane=True)
+    box = trimesh.creation.box(extents=(2, 1, 1))
+    scene.add_object(Mesh(mesh=box, xyz=(10, 5, 3), quaternion=(np.cos(np.pi / 4), np.sin(np.pi / 4), 0, 0)))
+    scene.render(tmp_path / 'out.png')
+
+    # The box is rotated by 90 degrees around the x-axis before being moved up.
+    plane = Scene.get_all_objects(['MESH'])[-1]
+    vertices = np.array([plane.matrix_world @ v.co for v in plane.data.vertices])
+    npt.assert_allclose(vertices[:, 2], 2.5, atol=1e-5)
+    npt.assert_allclose(vertices[:, :2].min(axis=0), (8, 3), atol=1e-5)
+    npt.assert_allclose(vertices[:, :2].max(axis=0), (12, 7), atol=1e-5)
+
+
+def test_mesh_instances(num_rendering_threads, test_data_path, tmp_path):
+    scene = Scene(num_threads=num_rendering_threads, resolution=(16, 16))
+    mesh_path = str((test_data_path / 'mesh' / 'cube.stl').absolute())
+    colors = [(1, 0, 0, 1), (0, 1, 0, 1), (0, 0, 1, 1)]
+    instances = [
+        Mesh(mesh_path=mesh_path, xyz=(3 * n, 0, 0), material=MaterialRGBA(rgba=rgba)) for n, rgba in enumerate(colors)
+    ]
+    scaled = Mesh(mesh_path=mesh_path, transformation=np.diag([2, 2, 2, 1]))
+    for mesh in instances + [scaled]:
+        scene.add_object(mesh)
+    scene.render(tmp_path / 'out.png')
+
+    assert all(mesh.mesh is instances[0].mesh for mesh in instances)
+    assert scaled.mesh is not instances[0].mesh
+    blender_objects = [mesh.blender_object() for mesh in instances]
+    assert all(blender_object.data == blender_objects[0].data for blender_object in blender_objects)
+    assert scaled.blender_object().data != blender_objects[0].data
+    assert len(bpy.data.meshes) == 2
+
+    for blender_object, rgba in zip(blender_objects, colors):
+        assert blender_object.material_slots[0].link == 'OBJECT'
+        npt.assert_allclose(blender_object.material_slots[0].material.diffuse_color, rgba)
+
+
+def test_render_many(num_rendering_threads, test_data_path, tmp_path):
+    mesh_sources = [trimesh.creation.box(extents=(1, 2, 3)), test_data_path / 'mesh' / 'cube_ten.stl']
+
+    def new_scene():
+        scene = Scene(num_threads=num_rendering_threads, num_samples=4, resolution=(32, 32), shadow_plane=True)
+        scene.add_object(SphericalCoordinateCamera(azimuth=30, elevation=30))
+        scene.add_object(SphericalCoordinateCamera(azimuth=150, elevation=60))
+        scene.add_object(SphericalCoordinateLight(type='SUN', energy=2, azimuth=30, elevation=60))
+        return scene
+
+    scene = new_scene()
+    results = list(scene.render_many(mesh_sources, str(tmp_path / 'many' / '{index}_{stem}.png')))
+    assert all(source is mesh_source for (source, _), mesh_source in zip(results, mesh_sources))
+    assert [render_file.name for render_file in results[1][1]] == ['000_1_cube_ten.png', '001_1_cube_ten.png']
+    assert len(scene._objects) == 3
+
+    # Every mesh renders the same as in a scene of its own.
+    for n, (source, render_files) in enumerate(results):
+        scene = new_scene()
+        scene.add_object(Mesh(mesh=source) if n == 0 else Mesh(mesh_path=source))
+        for render_file, reference_file in zip(render_files, scene.render(tmp_path / f'reference_{n}.png')):
+            npt.assert_array_equal(np.asarray(Image.open(render_file)), np.asarray(Image.open(reference_file)))
+
+
+def test_render_many_mesh_settings(num_rendering_threads, tmp_path):
+
+    def new_meshes():
+        return [
+            Mesh(mesh=trimesh.creation.box(), is_shadow_catcher=True),
+            Mesh(mesh=trimesh.creation.box(extents=(1, 2, 3)),
+                 xyz=(1, 0, 0.5),
+                 quaternion=(np.cos(0.3), 0, 0, np.sin(0.3)),
+                 thickness=0.1),
+            Mesh(mesh=trimesh.creation.box(), xyz=(0, -1, 0)),
+        ]
+
+    def new_scene():
+        scene = Scene(num_threads=num_rendering_threads, num_samples=4, resolution=(32, 32))
+        scene.add_object(SphericalCoordinateCamera(azimuth=30, elevation=30))
+        return scene
+
+    scene = new_scene()
+    render_files = []
+    for mesh, (_, mesh_render_files) in zip(new_meshes(), scene.render_many(new_meshes(),
+                                                                            str(tmp_path / '{index}.png'))):
+        blender_object = scene._objects[-1]._blender_object
+        npt.assert_allclose(blender_object.location, mesh.xyz)
+        npt.assert_allclose(blender_object.rotation_quaternion, mesh.quaternion, atol=1e-7)
+        assert blender_object.is_shadow_catcher == mesh.is_shadow_catcher
+        assert ('Solidify' in blender_object.modifiers) == (mesh.thickness is not None)
+        render_files.extend(mesh_render_files)
+
+    # Every mesh renders the same as in a scene of its own.
+    for mesh, render_file in zip(new_meshes(), render_files):
+        reference_scene = new_scene()
+        reference_scene.add_object(mesh)
+        reference_file = reference_scene.render(tmp_path / 'reference.png')[0]
+        npt.assert_array_equal(np.asarray(Image.open(render_file)), np.asarray(Image.open(reference_file)))